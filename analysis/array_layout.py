@@ -0,0 +1,284 @@
+"""
+Multi-unit river array layout optimizer with an analytic wake model
+
+WHAT THIS SCRIPT DOES
+---------------------
+docs/environment_and_deployment.md plans modular, containerized deployment,
+so a site gets several treads side by side and / or in a row. Every unit
+takes momentum out of the flow and leaves a slower wake that recovers
+downstream. This script
+
+- evaluates the array power of many candidate layouts at once ((layouts,
+  units) arrays): ambient speed at every unit, wake deficits of all units
+  upstream of it, unit power from the portfolio.py unit model,
+- compares a few standard layouts (one row across, one column, staggered),
+- searches free unit positions in the reach with differential evolution
+  (the cam_optimizer.py DE/rand/1/bin), about 10⁵ layouts per second.
+
+WAKE MODEL
+----------
+Units are shallow compared with the reach, so wakes are modelled in plan
+view (depth-averaged). Behind a unit of width D with thrust coefficient CT
+the speed deficit is a Gaussian across the flow whose width grows linearly,
+
+    sigma(x) = sigma0 + k x,          k = 0.38 TI + 0.004,
+
+and whose depth is fixed by the momentum the unit removes (planar analogue
+of the Bastankhah / Porte-Agel wake, integrating (1 - u/U) u/U dy = CT D / 2):
+
+    C(x) = (1 - sqrt(1 - CT D / (sqrt(pi) sigma))) / sqrt(2),
+    du(x, y) = C(x) u_in exp(-(y - y_unit)² / (2 sigma²)),
+
+u_in being the speed the wake-shedding unit sees. Deficits of several
+upstream units combine as the root of the sum of squares. Each unit is
+sampled at WIDTH_SAMPLES points across its width and its power uses the
+mean of u³ there.
+
+Ambient flow: a 1/7 power-law profile from the banks with mean REACH_MEAN
+_SPEED_M_S, or a channel_flow.py field (FLOW_FIELD, its x / y / u / v grid)
+interpolated at the unit positions.
+
+Not modelled: bypass acceleration from channel blockage, wake meandering,
+depth changes. Layout constraints instead keep blockage at or below
+portfolio.MAX_BLOCKAGE in every cross-section, units at WALL_CLEARANCE_M from
+the banks and at least MIN_GAP_M apart along the flow when they overlap
+across it.
+
+HOW TO USE
+----------
+    python analysis/array_layout.py
+"""
+
+import math
+import time
+
+import numpy as np
+
+import portfolio as pf
+
+# =========================
+# SETTINGS
+# =========================
+REACH_LENGTH_M = 120.0
+REACH_WIDTH_M = 30.0
+REACH_MEAN_SPEED_M_S = 1.5
+FLOW_FIELD = None               # channel_flow.py .npz with x, y, u, v (instead of the profile)
+
+N_UNITS = 6
+UNIT_WIDTH_M = pf.UNIT_WIDTH_M
+UNIT_LENGTH_M = 6.06            # 20 ft container
+THRUST_COEFFICIENT = 0.8        # depth-averaged, on the unit width
+TURBULENCE_INTENSITY = 0.10
+SIGMA0_FRAC = 0.35              # initial wake width / unit width (raised if CT needs it)
+
+UNIT = {                        # portfolio.py unit power model
+    "capture_area_m2": 2.0,
+    "cp": 0.25,
+    "cut_in_m_s": pf.CUT_IN_M_S,
+    "rated_kw": pf.RATED_KW,
+}
+
+WALL_CLEARANCE_M = 1.0
+MIN_GAP_M = 2.0                 # clear distance between units in line
+WIDTH_SAMPLES = 5
+PENALTY_KW_PER_M = 5.0
+
+POP_SIZE = 256
+GENERATIONS = 300
+DE_F = 0.6
+DE_CR = 0.9
+SEED = 47
+# =========================
+
+
+def ambient_speed(x, y, field=None):
+    """Ambient streamwise speed at points (any shape)."""
+    if field is not None:
+        fx, fy, fu = field
+        i = np.clip(np.searchsorted(fx, x) - 1, 0, len(fx) - 2)
+        j = np.clip(np.searchsorted(fy, y) - 1, 0, len(fy) - 2)
+        tx = np.clip((x - fx[i]) / (fx[i + 1] - fx[i]), 0.0, 1.0)
+        ty = np.clip((y - fy[j]) / (fy[j + 1] - fy[j]), 0.0, 1.0)
+        return ((1 - tx) * (1 - ty) * fu[i, j] + tx * (1 - ty) * fu[i + 1, j]
+                + (1 - tx) * ty * fu[i, j + 1] + tx * ty * fu[i + 1, j + 1])
+    s = np.clip(1.0 - np.abs(2.0 * y / REACH_WIDTH_M - 1.0), 0.0, 1.0)
+    return REACH_MEAN_SPEED_M_S * (8.0 / 7.0) * s ** (1.0 / 7.0)
+
+
+def load_field(path):
+    """(x, y, |u|) of a channel_flow.py result, scaled to the reach size."""
+    with np.load(path) as f:
+        x, y = f["x"], f["y"]
+        speed = np.hypot(f["u"], f["v"])
+    sx = REACH_LENGTH_M / (x[-1] - x[0])
+    sy = REACH_WIDTH_M / (y[-1] - y[0])
+    return (x - x[0]) * sx, (y - y[0]) * sy, speed * (REACH_MEAN_SPEED_M_S / speed.mean())
+
+
+def wake_params(width=UNIT_WIDTH_M, ct=THRUST_COEFFICIENT, ti=TURBULENCE_INTENSITY):
+    k = 0.38 * ti + 0.004
+    sigma0 = max(SIGMA0_FRAC * width, ct * width / math.sqrt(math.pi))
+    return k, sigma0
+
+
+def wake_deficit(dx, dy, width=UNIT_WIDTH_M, ct=THRUST_COEFFICIENT, ti=TURBULENCE_INTENSITY):
+    """Relative speed deficit du / u_in at (dx, dy) from a unit (0 upstream of it)."""
+    k, sigma0 = wake_params(width, ct, ti)
+    sigma = sigma0 + k * np.maximum(dx, 0.0)
+    c = (1.0 - np.sqrt(np.maximum(1.0 - ct * width / (math.sqrt(math.pi) * sigma), 0.0))) / math.sqrt(2.0)
+    return np.where(dx > 0.0, c * np.exp(-0.5 * (dy / sigma) ** 2), 0.0)
+
+
+def unit_speeds(x, y, field=None, width=UNIT_WIDTH_M, samples=WIDTH_SAMPLES, wakes=True):
+    """(layouts, units, samples) waked speeds across every unit's width."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    order = np.argsort(x, axis=1)
+    xs = np.take_along_axis(x, order, axis=1)
+    ys = np.take_along_axis(y, order, axis=1)
+    yq = ys[..., None] + width * np.linspace(-0.5, 0.5, samples)
+    u = ambient_speed(np.broadcast_to(xs[..., None], yq.shape), yq, field)
+    u_in = np.empty(xs.shape)
+    for i in range(xs.shape[1]):
+        if i and wakes:
+            d = wake_deficit(xs[:, i, None, None] - xs[:, :i, None],
+                             yq[:, i, None, :] - ys[:, :i, None], width)
+            du = d * u_in[:, :i, None]
+            u[:, i] = np.maximum(u[:, i] - np.sqrt((du ** 2).sum(axis=1)), 0.0)
+        u_in[:, i] = u[:, i].mean(axis=1)
+    inverse = np.argsort(order, axis=1)
+    return np.take_along_axis(u, inverse[..., None], axis=1)
+
+
+def array_power_kw(x, y, field=None, unit=UNIT, wakes=True):
+    """(total kW per layout, (layouts, units) kW) for positions (layouts, units)."""
+    u = unit_speeds(x, y, field, wakes=wakes)
+    u_eq = np.cbrt((u ** 3).mean(axis=-1))
+    p = pf.unit_power_kw(u_eq, unit)
+    return p.sum(axis=1), p
+
+
+def violation_m(x, y, width=UNIT_WIDTH_M, length=UNIT_LENGTH_M):
+    """Summed constraint violation (m) per layout: spacing and blockage."""
+    dx = np.abs(x[:, :, None] - x[:, None, :])
+    dy = np.abs(y[:, :, None] - y[:, None, :])
+    n = x.shape[1]
+    off = ~np.eye(n, dtype=bool)
+    overlap = (dy < width) & off
+    spacing = np.where(overlap, np.maximum(length + MIN_GAP_M - dx, 0.0) * (width - dy) / width, 0.0).sum(axis=(1, 2))
+    same_section = (dx < length)
+    blocked = (same_section * width).sum(axis=2)
+    blockage = np.maximum(blocked - pf.MAX_BLOCKAGE * REACH_WIDTH_M, 0.0).sum(axis=1)
+    return 0.5 * spacing + blockage
+
+
+def bounds(width=UNIT_WIDTH_M, length=UNIT_LENGTH_M):
+    y_lo = 0.5 * width + WALL_CLEARANCE_M
+    return (0.0, REACH_LENGTH_M - length), (y_lo, REACH_WIDTH_M - y_lo)
+
+
+def fitness(pop, field=None):
+    n = pop.shape[1] // 2
+    x, y = pop[:, :n], pop[:, n:]
+    total, _ = array_power_kw(x, y, field)
+    return total - PENALTY_KW_PER_M * violation_m(x, y)
+
+
+def standard_layouts(n=N_UNITS):
+    """Named (x, y) layouts: one row across, one column, staggered rows."""
+    (x_lo, x_hi), (y_lo, y_hi) = bounds()
+    yc = 0.5 * REACH_WIDTH_M
+    per_row = max(1, int(pf.MAX_BLOCKAGE * REACH_WIDTH_M // UNIT_WIDTH_M))
+    out = {}
+    rows = math.ceil(n / per_row)
+    k = np.arange(n)
+    lateral = (k % per_row - 0.5 * (min(n, per_row) - 1)) * (REACH_WIDTH_M / per_row)
+    out["row across" if rows == 1 else f"{rows} rows across"] = (np.minimum((k // per_row) * 10 * UNIT_LENGTH_M, x_hi), yc + lateral)
+    out["single column"] = (np.linspace(x_lo, x_hi, n), np.full(n, yc))
+    two = max(1, math.ceil(n / 2))
+    stag = np.where(k % 2 == 0, -1.0, 1.0) * 2.0 * UNIT_WIDTH_M
+    out["staggered pairs"] = (np.minimum((k // 2) * x_hi / max(two - 1, 1), x_hi), yc + stag)
+    return {name: (np.clip(x, x_lo, x_hi), np.clip(y, y_lo, y_hi)) for name, (x, y) in out.items()}
+
+
+def differential_evolution(field=None, n=N_UNITS, generations=GENERATIONS, seed=SEED, seeds=()):
+    """DE/rand/1/bin over (x_1..x_n, y_1..y_n). Returns (best, best_fit, evals)."""
+    rng = np.random.default_rng(seed)
+    (x_lo, x_hi), (y_lo, y_hi) = bounds()
+    lo = np.r_[np.full(n, x_lo), np.full(n, y_lo)]
+    hi = np.r_[np.full(n, x_hi), np.full(n, y_hi)]
+    dim = 2 * n
+
+    pop = rng.uniform(lo, hi, (POP_SIZE, dim))
+    for i, (x, y) in enumerate(seeds):
+        pop[i] = np.r_[x, y]
+    fit = fitness(pop, field)
+    evals = POP_SIZE
+
+    idx = np.arange(POP_SIZE)
+    for _ in range(generations):
+        r1 = rng.integers(0, POP_SIZE, POP_SIZE)
+        r2 = (r1 + 1 + rng.integers(0, POP_SIZE - 1, POP_SIZE)) % POP_SIZE
+        r3 = (r2 + 1 + rng.integers(0, POP_SIZE - 1, POP_SIZE)) % POP_SIZE
+
+        mutant = np.clip(pop[r1] + DE_F * (pop[r2] - pop[r3]), lo, hi)
+        cross = rng.random((POP_SIZE, dim)) < DE_CR
+        cross[idx, rng.integers(0, dim, POP_SIZE)] = True
+        trial = np.where(cross, mutant, pop)
+
+        tfit = fitness(trial, field)
+        evals += POP_SIZE
+        better = tfit > fit
+        pop[better] = trial[better]
+        fit[better] = tfit[better]
+
+    best = int(np.argmax(fit))
+    return pop[best], float(fit[best]), evals
+
+
+def describe(name, x, y, field=None):
+    total, per = array_power_kw(x[None], y[None], field)
+    free = array_power_kw(x[None], y[None], field, wakes=False)[0][0]
+    v = violation_m(x[None], y[None])[0]
+    print(f"{name:<20} {total[0]:8.2f} {free:8.2f} {100 * total[0] / free:7.1f} {v:7.2f}  "
+          + " ".join(f"{p:5.2f}" for p in per[0][np.argsort(x)]))
+
+
+def main():
+    field = load_field(FLOW_FIELD) if FLOW_FIELD else None
+    k, sigma0 = wake_params()
+    print(f"reach {REACH_LENGTH_M:g} x {REACH_WIDTH_M:g} m, mean {REACH_MEAN_SPEED_M_S:g} m/s, "
+          f"{N_UNITS} units {UNIT_WIDTH_M:g} m wide, CT {THRUST_COEFFICIENT:g}, wake growth k {k:.3f}")
+    print("\nwake centreline deficit behind one unit")
+    for d in (1, 2, 5, 10, 20, 40):
+        print(f"  {d:3d} unit lengths: {100 * wake_deficit(d * UNIT_LENGTH_M, 0.0):5.1f} %")
+
+    rng = np.random.default_rng(SEED)
+    (x_lo, x_hi), (y_lo, y_hi) = bounds()
+    bench = 20000
+    xb = rng.uniform(x_lo, x_hi, (bench, N_UNITS))
+    yb = rng.uniform(y_lo, y_hi, (bench, N_UNITS))
+    t0 = time.perf_counter()
+    array_power_kw(xb, yb, field)
+    dt = time.perf_counter() - t0
+    print(f"\n{bench:,} random layouts in {1e3 * dt:.0f} ms ({bench / dt:,.0f} layouts/s)")
+
+    layouts = standard_layouts()
+    t0 = time.perf_counter()
+    best, fit, evals = differential_evolution(field, seeds=list(layouts.values()))
+    dt = time.perf_counter() - t0
+    print(f"DE: {evals:,} layouts in {dt:.1f} s ({evals / dt:,.0f} layouts/s)\n")
+
+    print(f"{'layout':<20} {'kW':>8} {'no wake':>8} {'eff %':>7} {'viol m':>7}  unit kW (upstream first)")
+    for name, (x, y) in layouts.items():
+        describe(name, x, y, field)
+    describe("optimized", best[:N_UNITS], best[N_UNITS:], field)
+
+    order = np.argsort(best[:N_UNITS])
+    print("\noptimized positions (x downstream, y across, m):")
+    for i in order:
+        print(f"  x {best[i]:7.1f}   y {best[N_UNITS + i]:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,482 @@
+"""
+Passive blade dynamics in the free-rotation transition phase
+
+WHAT THIS SCRIPT DOES
+---------------------
+docs/blade_motion_cycle.md: when the blade leaves the capture region the cam
+releases the follower and the blade turns freely until the return guide holds
+it in the low-drag state. create_moving_parts.py (WING_MAP,
+map_angle_from_points) and every analysis script prescribe the angle there
+anyway. This script simulates the free segment instead:
+
+- hinge dynamics of every blade on the loop, for every flow speed at once
+  (state arrays (speeds, blades)), fixed-step semi-implicit Euler
+- outside FREE_SEGMENT the blade follows WING_MAP exactly (cam engaged); at
+  release it keeps the cam's angle and rate, at re-engagement the cam takes
+  over again and the mismatch is reported
+- result per flow speed: the angle over the free segment, the loop position
+  from which the blade stays in the low-drag state (vs. WING_MAP), whether
+  the water gets it there without the guide pushing ("unaided"),
+  peak guide / chain contact moments, the mean tread power lost or gained in
+  the segment against WING_MAP, and WING_MAP knots that replace the segment
+
+HINGE MODEL
+-----------
+Angles use the WING_MAP convention (0 = broad-on, 270 = edge-on, unwrapped so
+that release -> guide is 10 -> -90). The plate normal is the chain tangent
+rotated by phi = ANGLE_SIGN x angle; the blade extends from the hinge away
+from the loop at angle 0 and trails its hinge when edge-on, as the baked
+Wing_#### nodes do (checked against the GLB before simulating).
+
+- hydrodynamic moment: the flat-plate force of cam_optimizer.py applied per
+  chord strip (CHORD_STRIPS), with the local relative velocity including the
+  blade's own rotation, so the centre of pressure and the rotational damping
+  come out of the same expression:
+      dM = r · 0.5 rho b dr (CN_MAX + CD_EDGE) |w_r| (w·n - omega r)
+- inertia: blade mesh (parts/blade/blade.stl, the GLB "Wing" mesh or the
+  README box, as in blade_immersion.py) at BLADE_DENSITY about the hinge
+  axis (mesh X through the origin), plus the added inertia of a flat plate
+  rotating about an axis off its mid-chord
+- weight minus buoyancy at the mesh centroid, and the hinge moving around
+  the gear (centripetal acceleration of the hinge, rotation of the link frame)
+- hinge friction (Coulomb, smoothed) and two contacts as stiff penalty
+  springs with damping for RESTITUTION: the chain (angle >= CHAIN_STOP_DEG,
+  the blade lying on the links) and the return guide, a wall in the link
+  frame (angle <= GUIDE_WALL(t)) that closes in over its lead-in
+
+Relative flow is the design one of cam_optimizer.py: uniform FLOW_DIR,
+tread speed TREAD_SPEED_RATIO x flow speed, smooth travel.
+
+HOW TO USE
+----------
+    python analysis/blade_free_rotation.py
+"""
+
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+import blade_immersion as bi
+import cam_optimizer as co
+import glb_reader as gr
+import tread_kinematics as tk
+
+# =========================
+# SETTINGS
+# =========================
+FLOW_SPEEDS_M_S = np.array([0.5, 0.75, 1.0, 1.25, 1.5])   # production range, as drivetrain_sim.py
+DESIGN_FLOW_M_S = 1.0           # speed whose replacement knots are printed
+
+FREE_SEGMENT = (0.00, 0.44)     # cam release -> cam re-engagement, loop fraction t
+CHAIN_STOP_DEG = -90.0          # blade lying on the links (edge-on, trailing)
+ANGLE_SIGN = -tk.CAM_ANGLE_SIGN # plate angle phi = ANGLE_SIGN x WING_MAP angle
+GUIDE_WALL = [                  # (t, max angle deg) in the link frame; open outside
+    (0.10, 120.0),              # lead-in catches the blade wherever it is
+    (0.16, -85.0),
+    (0.42, -85.0),
+    (0.44, 120.0),
+]
+LOW_DRAG_TOL_DEG = 10.0         # low-drag = within this of CHAIN_STOP_DEG
+GUIDE_CONTACT_NM = 1e-3         # guide moment below this counts as no push
+
+BLADE_DENSITY = 1240.0          # kg/m³, PLA
+ADDED_INERTIA = True
+CHORD_STRIPS = 12
+HINGE_FRICTION_NM = 2e-4        # Coulomb, smoothed over FRICTION_RATE_RAD_S
+FRICTION_RATE_RAD_S = 0.5
+GRAVITY = 9.81                  # loop v axis is up
+CONTACT_STIFFNESS = 20.0        # N m/rad
+RESTITUTION = 0.3
+
+DT_S = 2e-4
+RECORD_EVERY = 5
+LOOP_TABLE = 8192              # frame / curvature samples around the loop
+SEGMENT_SAMPLES = 221           # output grid over FREE_SEGMENT
+KNOT_TOL_DEG = 2.0              # replacement WING_MAP knots: max linear-interpolation error
+
+OUTPUT_JSON = None              # e.g. "wing_map_free.json": spliced WING_MAP per flow speed
+OUTPUT_NPZ = None               # e.g. "blade_free_rotation.npz": time histories of all blades
+# =========================
+
+
+# ---------- blade ----------
+def mass_properties(tris_mm, density=BLADE_DENSITY):
+    """
+    Closed-mesh volume, centroid (Y, Z) and second moment about the X axis
+    through the origin (the hinge). Returns SI: V m³, m kg, (y, z) m, I kg m².
+    """
+    a, b, c = (tris_mm[:, k] * 1e-3 for k in range(3))
+    det = np.einsum("ij,ij->i", a, np.cross(b, c))
+    vol = det.sum() / 6.0
+    if vol <= 0.0:
+        raise RuntimeError("blade mesh is not closed / outward oriented")
+    cen = (det[:, None] * (a + b + c)).sum(axis=0) / (24.0 * vol)
+
+    def second(k):
+        x0, x1, x2 = a[:, k], b[:, k], c[:, k]
+        return (det * (x0 * x0 + x1 * x1 + x2 * x2 + x0 * x1 + x0 * x2 + x1 * x2)).sum() / 60.0
+
+    m = density * vol
+    return vol, m, cen[1:], density * (second(1) + second(2))
+
+
+def blade_model():
+    glb = gr.Glb(bi.GLB_PATH) if os.path.exists(bi.GLB_PATH) else None
+    tris, source = bi.blade_triangles(glb)
+    vol, m, cg, i_blade = mass_properties(tris)
+
+    z = tris[..., 2].ravel() * 1e-3
+    z0, z1 = z.min(), z.max()
+    # projected plate area seen along the blade normal (mesh Y), the closed mesh covers it twice
+    area = 0.5 * np.abs(0.5 * np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])[:, 1]).sum() * 1e-6
+    span = area / (z1 - z0)
+
+    # chord strips (midpoints) from the hinge axis, signed along the blade
+    edges = np.linspace(z0, z1, CHORD_STRIPS + 1)
+    r = 0.5 * (edges[:-1] + edges[1:])
+    q = 0.5 * co.RHO_WATER * span * np.diff(edges)
+
+    chord = z1 - z0
+    x_h = 0.5 * (z0 + z1)
+    i_add = math.pi * co.RHO_WATER * span * (0.125 * (0.5 * chord) ** 4 + (0.5 * chord) ** 2 * x_h ** 2)
+    return {
+        "source": source, "volume": vol, "mass": m, "cg": cg, "area": area, "chord": chord,
+        "i_blade": i_blade, "i_added": i_add if ADDED_INERTIA else 0.0,
+        "r": r, "q": q,
+        "net_weight": (m - co.RHO_WATER * vol) * GRAVITY,
+    }
+
+
+def check_against_bake(glb):
+    """
+    Compare the angle convention with the baked Wing_#### nodes: edge-on the
+    chord (mesh Z) must point along or against the travel as ANGLE_SIGN says
+    at CHAIN_STOP_DEG, broad-on it must point away from the loop.
+    Returns (edge-on samples agreeing, total, broad-on agreeing, total).
+    """
+    _, M = bi.glb_node_poses(glb, bi.BLADE_NODE_PREFIX)
+    p = M[..., :3, 3]
+    v = p[1:] - p[:-1]
+    speed = np.linalg.norm(v, axis=-1)
+    chord = M[:-1, :, :3, 2] / np.linalg.norm(M[:-1, :, :3, 2], axis=-1, keepdims=True)
+    along = np.einsum("fbk,fbk->fb", chord, v) / np.maximum(speed, 1e-12)
+    moving = speed > 1e-6
+
+    edge = moving & (np.abs(along) > 0.9)
+    want = np.sign(np.sin(ANGLE_SIGN * math.radians(CHAIN_STOP_DEG)))  # e_c . tang at the chain stop
+    edge_ok = int((np.sign(along[edge]) == want).sum())
+
+    broad = moving & (np.abs(along) < 0.1)
+    out = p[:-1] - p.reshape(-1, 3).mean(axis=0)
+    broad_ok = int((np.einsum("fbk,fbk->fb", chord, out)[broad] > 0.0).sum())
+    return edge_ok, int(edge.sum()), broad_ok, int(broad.sum())
+
+
+# ---------- loop ----------
+def loop_model(samples=LOOP_TABLE):
+    """Tangent angle and curvature tabulated around the loop (smooth, unlike the polyline tangent)."""
+    pts2, seglen, cum, total = tk.polyline_table(tk.two_gear_loop())
+    d = np.diff(pts2, axis=0)
+    theta = np.unwrap(np.arctan2(d[:, 1], d[:, 0]))
+    mid = cum[:-1] + 0.5 * seglen
+    turns = theta[-1] - theta[0] + (np.arctan2(d[0, 1], d[0, 0]) - np.arctan2(d[-1, 1], d[-1, 0])) % (2.0 * math.pi)
+    s = np.arange(samples) * total / samples
+    th = np.interp(s, np.concatenate([mid - total, mid, mid + total]),
+                   np.concatenate([theta - turns, theta, theta + turns]))
+    ds = total / samples * 1e-3
+    kappa = (np.roll(th, -1) - np.roll(th, 1))
+    kappa[0] += turns
+    kappa[-1] += turns
+    return {"table": (pts2, seglen, cum, total), "total_m": total / 1000.0,
+            "tang": np.stack([np.cos(th), np.sin(th)], axis=1), "kappa": kappa / (2.0 * ds)}
+
+
+def frame_at(loop, t):
+    """Unit tangent, inward normal and curvature (1/m) at loop fractions t."""
+    n = len(loop["kappa"])
+    i = (np.asarray(t) % 1.0 * n).astype(np.intp) % n
+    tang = loop["tang"][i]
+    perp = np.stack([-tang[..., 1], tang[..., 0]], axis=-1)
+    return tang, perp, loop["kappa"][i]
+
+
+def guide_wall_deg(t):
+    """Maximum angle the return guide allows at loop fraction t (+inf where open)."""
+    kt = np.array([p[0] for p in GUIDE_WALL])
+    ka = np.array([p[1] for p in GUIDE_WALL])
+    t = np.asarray(t) % 1.0
+    return np.where((t >= kt[0]) & (t <= kt[-1]), np.interp(t, kt, ka), np.inf)
+
+
+def in_free(t):
+    t0, t1 = FREE_SEGMENT
+    return ((np.asarray(t) - t0) % 1.0) <= (t1 - t0)
+
+
+# ---------- dynamics ----------
+def hinge_moment(blade, phi, omega, w, tang, perp):
+    """
+    Hydrodynamic moment about the hinge (N m, + = +phi) and tread-direction
+    force (N) for plate angles phi, absolute blade rates omega and relative
+    flow w at the hinge. Leading shapes broadcast.
+    """
+    c, s = np.cos(phi), np.sin(phi)
+    n = c[..., None] * tang + s[..., None] * perp
+    e_c = s[..., None] * tang - c[..., None] * perp
+    wn = np.einsum("...k,...k->...", w, n)[..., None] - omega[..., None] * blade["r"]
+    wc = np.einsum("...k,...k->...", w, e_c)[..., None]
+    wmag = np.sqrt(wn * wn + wc * wc)
+    fn = blade["q"] * (co.CN_MAX + co.CD_EDGE) * wmag * wn
+    fc = blade["q"] * co.CD_EDGE * wmag * wc
+    moment = (fn * blade["r"]).sum(axis=-1)
+    force_t = c * fn.sum(axis=-1) + s * fc.sum(axis=-1)
+    return moment, force_t
+
+
+def body_moment(blade, phi, tang, perp, kappa, u):
+    """Weight - buoyancy and hinge-acceleration (gear turnaround) moment about the hinge."""
+    c, s = np.cos(phi), np.sin(phi)
+    n = c[..., None] * tang + s[..., None] * perp
+    e_c = s[..., None] * tang - c[..., None] * perp
+    r_cg = blade["cg"][0] * n + blade["cg"][1] * e_c
+    a_h = (u * u)[..., None] * kappa[..., None] * perp
+    m = blade["mass"]
+    return -r_cg[..., 0] * blade["net_weight"] - m * (r_cg[..., 0] * a_h[..., 1] - r_cg[..., 1] * a_h[..., 0])
+
+
+def cycle_tables(loop, knots):
+    """WING_MAP angle (rad), its rate (rad per cycle), guide wall (rad) and free flag on the loop table."""
+    n = len(loop["kappa"])
+    t = np.arange(n) / n
+    a = np.radians(tk.wing_angle(t, *knots))
+    # unwrapped map: the closing knot differs by 360° at most
+    da = (np.roll(a, -1) - a + math.pi) % (2.0 * math.pi) - math.pi
+    return a, da * n, np.radians(guide_wall_deg(t)), in_free(t)
+
+
+def simulate(blade, loop, speeds=None, wing_map=None, dt=DT_S):
+    """
+    Step every blade at every flow speed. Returns recorded histories
+    (time, loop position in cycles unwrapped, angle deg, guide / chain contact
+    moment N m, tread force N), each (records, speeds, blades).
+    """
+    speeds = FLOW_SPEEDS_M_S if speeds is None else speeds
+    wing_map = tk.WING_MAP if wing_map is None else wing_map
+    a_tab, rate_tab, wall_tab, free_tab = cycle_tables(loop, tk.prepare_wing_map(wing_map))
+    n_tab = len(a_tab)
+    sgn = ANGLE_SIGN
+    speeds = np.asarray(speeds, dtype=np.float64)
+    u = co.TREAD_SPEED_RATIO * speeds                         # (K,)
+    flow = np.asarray(co.FLOW_DIR, dtype=np.float64)
+    flow = flow / max(np.linalg.norm(flow), 1e-12)
+    cyc_per_s = u / loop["total_m"]                           # loop fraction per second
+
+    idx = tk.blade_link_indices(tk.LINK_COUNT)
+    x0 = idx * tk.LINK_PITCH / loop["table"][3]               # (B,)
+    K, B = len(speeds), len(idx)
+
+    inertia = blade["i_blade"] + blade["i_added"]
+    damp = 2.0 * -math.log(RESTITUTION) / math.sqrt(math.pi ** 2 + math.log(RESTITUTION) ** 2) \
+        * math.sqrt(CONTACT_STIFFNESS * inertia)
+    chain_stop = math.radians(CHAIN_STOP_DEG)
+
+    span = FREE_SEGMENT[1] - FREE_SEGMENT[0]
+    duration = (1.0 + span + 0.05) / cyc_per_s.min()
+    steps = int(math.ceil(duration / dt))
+
+    uk = u[:, None]
+    x = x0[None, :] + 0.0 * uk                                # unwrapped loop position, cycles
+    i = (x % 1.0 * n_tab).astype(np.intp) % n_tab
+    a = a_tab[i]
+    omega = uk * loop["kappa"][i] + sgn * rate_tab[i] * cyc_per_s[:, None]   # absolute blade rate
+
+    rec = {k: [] for k in ("time", "x", "angle", "guide", "chain", "force")}
+    for k in range(steps):
+        tang = loop["tang"][i]
+        perp = np.stack([-tang[..., 1], tang[..., 0]], axis=-1)
+        kappa = loop["kappa"][i]
+        free = free_tab[i]
+        w = speeds[:, None, None] * flow - u[:, None, None] * tang
+
+        phi = sgn * a
+        m_h, f_t = hinge_moment(blade, phi, omega, w, tang, perp)
+        m_b = body_moment(blade, phi, tang, perp, kappa, uk)
+
+        frame_rate = uk * kappa
+        a_dot = sgn * (omega - frame_rate)
+        pen_c = chain_stop - a
+        m_chain = np.where(pen_c > 0.0, np.maximum(CONTACT_STIFFNESS * pen_c - damp * a_dot, 0.0), 0.0)
+        pen_g = a - wall_tab[i]
+        m_guide = np.where(pen_g > 0.0, np.minimum(-CONTACT_STIFFNESS * pen_g - damp * a_dot, 0.0), 0.0)
+        m_fric = -HINGE_FRICTION_NM * np.tanh(a_dot / FRICTION_RATE_RAD_S)
+
+        if k % RECORD_EVERY == 0:
+            rec["time"].append(np.full((K, B), k * dt))
+            rec["x"].append(x.copy())
+            rec["angle"].append(np.degrees(a))
+            rec["guide"].append(np.where(free, -m_guide, 0.0))
+            rec["chain"].append(np.where(free, m_chain, 0.0))
+            rec["force"].append(f_t)
+
+        m_a = sgn * (m_h + m_b) + m_chain + m_guide + m_fric   # moment in angle direction
+        omega = omega + dt * sgn * m_a / inertia
+        a = a + dt * sgn * (omega - frame_rate)
+
+        x = x + dt * cyc_per_s[:, None]
+        i = (x % 1.0 * n_tab).astype(np.intp) % n_tab
+
+        # cam engaged: the blade is where WING_MAP puts it (unwrapped onto the free angle)
+        held = ~free_tab[i]
+        if held.any():
+            a_map = a_tab[i] + 2.0 * math.pi * np.round((a - a_tab[i]) / (2.0 * math.pi))
+            a = np.where(held, a_map, a)
+            omega = np.where(held, uk * loop["kappa"][i] + sgn * rate_tab[i] * cyc_per_s[:, None], omega)
+
+    out = {k: np.stack(v) for k, v in rec.items()}
+    out["steps"] = steps
+    return out
+
+
+# ---------- free segment ----------
+def segment_grid():
+    return np.linspace(0.0, FREE_SEGMENT[1] - FREE_SEGMENT[0], SEGMENT_SAMPLES)
+
+
+def last_pass(hist, key, k, b):
+    """Values of one blade over its last complete free pass, on segment_grid() (NaN if none)."""
+    t0, span = FREE_SEGMENT[0], FREE_SEGMENT[1] - FREE_SEGMENT[0]
+    x = hist["x"][:, k, b] - t0
+    p_first = math.ceil(x[0])
+    p_last = math.floor(x[-1] - span) if x[-1] - span >= 0.0 else -1
+    if p_last < p_first:
+        return np.full(SEGMENT_SAMPLES, np.nan)
+    sel = (x >= p_last) & (x <= p_last + span)
+    return np.interp(segment_grid(), x[sel] - p_last, hist[key][sel, k, b])
+
+
+def first_settled(s, angle, until):
+    """First segment position after which the angle stays in the low-drag band up to `until` (NaN if never)."""
+    ok = (angle <= CHAIN_STOP_DEG + LOW_DRAG_TOL_DEG) | (s > until)
+    if not ok[-1]:
+        return np.nan
+    bad = np.flatnonzero(~ok)
+    return s[0] if len(bad) == 0 else s[min(bad[-1] + 1, len(s) - 1)]
+
+
+def replacement_knots(s, angle, tol=KNOT_TOL_DEG):
+    """
+    WING_MAP knots (t, deg in [0, 360)) for the free segment: greedy, the
+    sample with the largest error under WING_MAP interpolation (eased if
+    WING_MAP_SMOOTHSTEP) is added until all are within tol.
+    """
+    keep = [0, len(s) - 1]
+    while True:
+        k = np.sort(keep)
+        err = np.abs(tk.wing_angle(s, s[k], angle[k]) - angle)
+        j = int(np.argmax(err))
+        if err[j] <= tol:
+            break
+        keep.append(j)
+    k = np.sort(keep)
+    return [(round(float(FREE_SEGMENT[0] + s[j]), 4), round(float(angle[j] % 360.0), 2)) for j in k]
+
+
+def spliced_wing_map(wing_map, knots):
+    """WING_MAP with the free segment replaced by knots (same format as WING_MAP)."""
+    t0, t1 = FREE_SEGMENT
+    keep = [(t, a) for t, a in wing_map if not (t0 <= t <= t1)]
+    out = sorted(keep + list(knots))
+    if out[0][0] > 1e-6:
+        out.insert(0, (0.0, out[-1][1] if out[-1][0] >= 1.0 - 1e-6 else knots[0][1]))
+    if out[-1][0] < 1.0 - 1e-6:
+        out.append((1.0, out[0][1]))
+    return out
+
+
+def main():
+    blade = blade_model()
+    loop = loop_model()
+    print(f"blade: {blade['source']}, {1e6 * blade['volume']:.2f} cm³, {1e3 * blade['mass']:.1f} g, "
+          f"chord {1e3 * blade['chord']:.1f} mm, area {1e4 * blade['area']:.1f} cm², "
+          f"centroid ({1e3 * blade['cg'][0]:.1f}, {1e3 * blade['cg'][1]:.1f}) mm")
+    print(f"hinge inertia: blade {blade['i_blade']:.2e} + added {blade['i_added']:.2e} kg m²; "
+          f"free segment t {FREE_SEGMENT[0]:.2f}..{FREE_SEGMENT[1]:.2f}, guide lead-in at t {GUIDE_WALL[0][0]:.2f}")
+
+    if os.path.exists(bi.GLB_PATH):
+        e_ok, e_n, b_ok, b_n = check_against_bake(gr.Glb(bi.GLB_PATH))
+        print(f"bake check ({os.path.relpath(bi.GLB_PATH, bi.REPO)}): edge-on chord direction "
+              f"{e_ok}/{e_n}, broad-on chord outward {b_ok}/{b_n}")
+        if e_ok < e_n or b_ok < b_n:
+            raise RuntimeError("blade angle convention disagrees with the baked Wing nodes (ANGLE_SIGN)")
+
+    t_start = time.perf_counter()
+    hist = simulate(blade, loop, FLOW_SPEEDS_M_S)
+    wall = time.perf_counter() - t_start
+    K, B = hist["x"].shape[1:]
+    print(f"{K} speeds x {B} blades x {hist['steps']:,} steps in {wall:.2f} s "
+          f"({1e9 * wall / (K * B * hist['steps']):.0f} ns per blade-step)\n")
+
+    knots = tk.prepare_wing_map(tk.WING_MAP)
+    s = segment_grid()
+    map_angle = tk.wing_angle(FREE_SEGMENT[0] + s, *knots)
+    guide_off = GUIDE_WALL[-2][0] - FREE_SEGMENT[0]
+    t_map = first_settled(s, map_angle, guide_off)
+    n_blades = B
+
+    print(f"{'flow m/s':>8} {'cycle s':>8} {'low-drag t':>10} {'map t':>6} {'lag ms':>7} {'unaided':>7} "
+          f"{'guide N m':>9} {'chain N m':>9} {'re-engage °':>11} {'P map W':>8} {'P free W':>8} {'spread °':>8}")
+    results = {}
+    for k, U in enumerate(FLOW_SPEEDS_M_S):
+        per_blade = np.stack([last_pass(hist, "angle", k, b) for b in range(B)])
+        force = np.stack([last_pass(hist, "force", k, b) for b in range(B)])
+        valid = ~np.isnan(per_blade).any(axis=1)
+        ang = per_blade[valid].mean(axis=0)
+        spread = np.ptp(per_blade[valid], axis=0).max()
+
+        u = co.TREAD_SPEED_RATIO * U
+        cycle_s = loop["total_m"] / u
+        t_sim = first_settled(s, ang, guide_off)
+        lag_ms = 1e3 * (t_sim - t_map) * cycle_s
+        guide = max(np.nanmax(last_pass(hist, "guide", k, b)) for b in np.flatnonzero(valid))
+        unaided = not np.isnan(t_sim) and guide < GUIDE_CONTACT_NM      # water alone, the guide never pushes
+        chain = max(np.nanmax(last_pass(hist, "chain", k, b)) for b in np.flatnonzero(valid))
+        re_engage = ang[-1] - map_angle[-1]
+
+        # mean tread power of the whole tread over a cycle from the free segment, map vs simulated
+        tang, perp, kappa = frame_at(loop, FREE_SEGMENT[0] + s)
+        w = U * np.asarray(co.FLOW_DIR, dtype=np.float64) - u * tang
+        a_map_r = np.radians(map_angle)
+        rate = np.gradient(a_map_r, s) * u / loop["total_m"]
+        _, f_map = hinge_moment(blade, ANGLE_SIGN * a_map_r, u * kappa + ANGLE_SIGN * rate,
+                                w, tang, perp)
+        frac = s[-1] - s[0]
+        p_map = n_blades * u * frac * f_map.mean()
+        p_sim = n_blades * u * frac * force[valid].mean(axis=0).mean()
+
+        print(f"{U:8.2f} {cycle_s:8.2f} {FREE_SEGMENT[0] + t_sim:10.3f} {FREE_SEGMENT[0] + t_map:6.3f} "
+              f"{lag_ms:7.1f} {'yes' if unaided else 'NO':>7} {guide:9.3f} {chain:9.3f} "
+              f"{re_engage:11.1f} {p_map:8.3f} {p_sim:8.3f} {spread:8.2f}")
+        results[float(U)] = {"angle": ang, "knots": replacement_knots(s, ang)}
+
+    design = min(results, key=lambda v: abs(v - DESIGN_FLOW_M_S))
+    print(f"\nWING_MAP knots for the free segment at {design:g} m/s:")
+    for tt, aa in results[design]["knots"]:
+        print(f"    ({tt:.4f}, {aa:6.1f}),")
+
+    if OUTPUT_JSON:
+        with open(OUTPUT_JSON, "w") as fh:
+            json.dump({str(U): {"free_segment": list(FREE_SEGMENT),
+                                "wing_map": spliced_wing_map(tk.WING_MAP, r["knots"])}
+                       for U, r in results.items()}, fh, indent=2)
+        print(f"\nspliced WING_MAPs: {OUTPUT_JSON}")
+    if OUTPUT_NPZ:
+        np.savez_compressed(OUTPUT_NPZ, flow_speeds=FLOW_SPEEDS_M_S, segment_t=FREE_SEGMENT[0] + s,
+                            **{k: v for k, v in hist.items() if k != "steps"})
+        print(f"histories: {OUTPUT_NPZ}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Submerged blade area over the cycle by batched mesh clipping (NumPy)
+
+WHAT THIS SCRIPT DOES
+---------------------
+Output depends on how much of each blade is under water, which changes with
+the water level and with the blade angle along the loop. For every water
+level in WATER_LEVELS, every blade and every baked frame this script clips
+the blade triangles against the horizontal water plane and returns:
+
+- wetted area            submerged surface area
+- projected area         submerged area seen along FLOW_AXIS (the closed
+                         blade mesh covers its silhouette twice, so this is
+                         0.5 × sum |A n·f| over the clipped triangles)
+- centroid depth         area-weighted depth of the wetted surface
+
+All triangles of all blades and frames are clipped at once (per level chunk),
+with the 0 / 1 / 2 / 3-vertices-submerged cases handled by masks.
+
+INPUTS
+------
+Blade mesh, first one available:
+1. parts/blade/blade.stl (binary or ASCII; skipped while it is a Git LFS pointer)
+2. the "Wing" mesh inside models/prototype/prototype_moving_parts.glb
+3. the 159 x 2 x 40 mm box from parts/blade/README.md, hinge 4 mm above
+   the lower edge
+
+Blade poses: the baked Wing_#### animation in the GLB (read with
+glb_reader.py), or, when DESCRIPTOR_PATH is set, poses computed from a pose
+descriptor (analysis/pose_descriptor.py). Coordinates are Blender world
+(Z up, mm).
+
+HOW TO USE
+----------
+    python analysis/blade_immersion.py
+"""
+
+import os
+import struct
+import time
+
+import numpy as np
+
+import glb_reader as gr
+
+# =========================
+# SETTINGS
+# =========================
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BLADE_STL = os.path.join(REPO, "parts", "blade", "blade.stl")
+GLB_PATH = os.path.join(REPO, "models", "prototype", "prototype_moving_parts.glb")
+BLADE_MESH_NAME = "Wing"
+BLADE_NODE_PREFIX = "Wing_"
+DESCRIPTOR_PATH = None          # e.g. "prototype_moving_parts.pose.json"
+
+FALLBACK_BOX_MM = (159.0, 2.0, 40.0)
+FALLBACK_BOX_Z0 = -4.0          # lower edge relative to the hinge axis
+
+FLOW_AXIS = (0.0, 1.0, 0.0)     # Blender world; the loop runs along Y
+WATER_LEVELS = 25               # int = evenly spaced over the blades' Z range, or a list of Z (mm)
+LEVEL_CHUNK = 4                 # water levels clipped per batch (memory vs. speed)
+# =========================
+
+
+# ---------- mesh sources ----------
+def read_stl(path):
+    """(T, 3, 3) float64 triangles, or None if missing / a Git LFS pointer."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as fh:
+        data = fh.read()
+    if data.startswith(b"version https://git-lfs"):
+        return None
+    if data[:5].lower() == b"solid" and b"facet" in data[:512]:
+        verts = [line.split()[1:4] for line in data.decode("ascii", "replace").splitlines()
+                 if line.strip().startswith("vertex")]
+        return np.asarray(verts, dtype=np.float64).reshape(-1, 3, 3)
+    n = struct.unpack("<I", data[80:84])[0]
+    rec = np.dtype([("normal", "<f4", 3), ("v", "<f4", (3, 3)), ("attr", "<u2")])
+    return np.frombuffer(data, dtype=rec, count=n, offset=84)["v"].astype(np.float64)
+
+
+def glb_mesh_triangles(glb, mesh_name):
+    """(T, 3, 3) triangles of a named mesh, in Blender local coordinates."""
+    for mesh in glb.gltf.get("meshes", []):
+        if mesh["name"] != mesh_name:
+            continue
+        tris = []
+        for prim in mesh["primitives"]:
+            pos = glb.accessor(prim["attributes"]["POSITION"]).astype(np.float64)
+            idx = glb.accessor(prim["indices"]).ravel() if "indices" in prim else np.arange(len(pos))
+            tris.append(pos[idx.reshape(-1, 3)] @ gr.GLTF_TO_BLENDER.T)
+        return np.concatenate(tris)
+    return None
+
+
+def box_triangles(size=FALLBACK_BOX_MM, z0=FALLBACK_BOX_Z0):
+    """Closed box (12 triangles) with X/Y centered on the hinge axis."""
+    sx, sy, sz = (0.5 * size[0], 0.5 * size[1], size[2])
+    c = np.array([[x, y, z] for x in (-sx, sx) for y in (-sy, sy) for z in (z0, z0 + sz)])
+    faces = [(0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5), (0, 4, 5), (0, 5, 1),
+             (2, 3, 7), (2, 7, 6), (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3)]
+    return c[np.asarray(faces)]
+
+
+def blade_triangles(glb=None):
+    """Blade mesh from the first available source. Returns (tris, source)."""
+    tris = read_stl(BLADE_STL)
+    if tris is not None:
+        return tris, os.path.relpath(BLADE_STL, REPO)
+    if glb is not None:
+        tris = glb_mesh_triangles(glb, BLADE_MESH_NAME)
+        if tris is not None:
+            return tris, f"{os.path.relpath(GLB_PATH, REPO)}:{BLADE_MESH_NAME}"
+    return box_triangles(), "README box"
+
+
+# ---------- poses ----------
+def glb_node_poses(glb, prefix):
+    """
+    Baked (F, B, 4, 4) Blender world matrices of the nodes whose name starts
+    with prefix, sampled at the animation keys.
+    """
+    names, M = glb.world_matrices(prefix=prefix)
+    return names, gr.to_blender(M)
+
+
+def descriptor_poses(path):
+    """Wing world matrices (F, B, 4, 4) for every frame of a pose descriptor."""
+    import pose_descriptor as pd
+    desc = pd.load_descriptor(path)
+    frames = np.arange(desc["frame_start"], desc["frame_end"] + 1)
+    wing = pd.rig_matrices(desc, frames)["wing"]
+    fmt = desc["rig"]["names"]["wing"]
+    return [fmt.format(int(i)) for i in pd.rig_link_indices(desc)], wing
+
+
+# ---------- clipping ----------
+def _edge_fraction(da, db):
+    """Where the water plane cuts the edge a -> b, as a fraction from a."""
+    den = da - db
+    return np.where(np.abs(den) < 1e-12, 0.0, da / np.where(np.abs(den) < 1e-12, 1.0, den))
+
+
+def immersion(tris_world, levels, flow_axis=FLOW_AXIS):
+    """
+    Clip (..., T, 3, 3) world triangles against Z = level for every level.
+    Returns dict of (len(levels), ...) arrays: wetted_area, projected_area,
+    centroid_depth (NaN where dry).
+    """
+    levels = np.asarray(levels, dtype=np.float64)
+    f = np.asarray(flow_axis, dtype=np.float64)
+    f = f / np.linalg.norm(f)
+
+    cross = np.cross(tris_world[..., 1, :] - tris_world[..., 0, :],
+                     tris_world[..., 2, :] - tris_world[..., 0, :])
+    area = 0.5 * np.linalg.norm(cross, axis=-1)
+    proj = 0.5 * np.abs(cross @ f)               # area × |n·f|
+    cen = tris_world.mean(axis=-2)
+
+    # vertex order by height does not depend on the level: sort once, lowest first
+    z0, z1, z2 = np.moveaxis(np.sort(tris_world[..., 2], axis=-1), -1, 0)
+
+    lv = levels.reshape((-1,) + (1,) * (tris_world.ndim - 2))
+    d0, d1, d2 = lv - z0, lv - z1, lv - z2       # (L, ..., T), > 0 = submerged
+
+    # one vertex under: triangle P0, Q01, Q02
+    a01, a02 = _edge_fraction(d0, d1), _edge_fraction(d0, d2)
+    one_frac = a01 * a02
+    one_z = z0 + ((z1 - z0) * a01 + (z2 - z0) * a02) / 3.0
+    # two under: full triangle minus P2, Q20, Q21
+    b20, b21 = _edge_fraction(d2, d0), _edge_fraction(d2, d1)
+    cut = b20 * b21
+    cut_z = z2 + ((z0 - z2) * b20 + (z1 - z2) * b21) / 3.0
+    two_frac = 1.0 - cut
+    two_z = (cen[..., 2] - cut * cut_z) / np.where(two_frac < 1e-12, 1.0, two_frac)
+
+    under = [d2 > 0, d1 > 0, d0 > 0]             # 3, 2, 1 vertices under
+    fraction = np.select(under, [1.0, two_frac, one_frac], 0.0)
+    sub_cen_z = np.select(under, [np.broadcast_to(cen[..., 2], d0.shape), two_z, one_z], 0.0)
+
+    wet = fraction * area
+    wetted = wet.sum(axis=-1)
+    depth_sum = (wet * (lv - sub_cen_z)).sum(axis=-1)
+    return {
+        "wetted_area": wetted,
+        "projected_area": 0.5 * (fraction * proj).sum(axis=-1),
+        "centroid_depth": np.where(wetted > 0, depth_sum / np.where(wetted > 0, wetted, 1.0), np.nan),
+    }
+
+
+def place(tris_local, poses):
+    """Blade triangles (T, 3, 3) under (F, B, 4, 4) poses -> (F, B, T, 3, 3) world."""
+    R, t = poses[..., :3, :3], poses[..., :3, 3]
+    return np.einsum("fbij,tvj->fbtvi", R, tris_local) + t[:, :, None, None, :]
+
+
+def sweep(world, levels, chunk=LEVEL_CHUNK):
+    """immersion() for every level, blade and frame; arrays (L, F, B)."""
+    parts = [immersion(world, levels[i:i + chunk]) for i in range(0, len(levels), chunk)]
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+
+def main():
+    glb = gr.Glb(GLB_PATH) if os.path.exists(GLB_PATH) else None
+    tris, source = blade_triangles(glb)
+
+    if DESCRIPTOR_PATH:
+        names, poses = descriptor_poses(DESCRIPTOR_PATH)
+        pose_source = DESCRIPTOR_PATH
+    else:
+        names, poses = glb_node_poses(glb, BLADE_NODE_PREFIX)
+        pose_source = os.path.relpath(GLB_PATH, REPO)
+
+    world = place(tris, poses)
+    if isinstance(WATER_LEVELS, int):
+        z = world[..., 2]
+        levels = np.linspace(z.min(), z.max(), WATER_LEVELS)
+    else:
+        levels = np.asarray(WATER_LEVELS, dtype=np.float64)
+
+    t0 = time.perf_counter()
+    res = sweep(world, levels)
+    dt = time.perf_counter() - t0
+
+    n_f, n_b = poses.shape[:2]
+    clipped = len(levels) * n_f * n_b * len(tris)
+    surface = 0.5 * np.linalg.norm(np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0]), axis=1).sum()
+    print(f"Blade mesh: {source}, {len(tris)} triangles, surface {1e-2 * surface:.1f} cm²")
+    print(f"Poses: {pose_source}, {n_b} blades x {n_f} frames")
+    print(f"{clipped:,} triangle clips in {1e3 * dt:.0f} ms ({1e9 * dt / clipped:.1f} ns each)\n")
+    print(f"{'level mm':>9} {'wet cm²':>9} {'proj cm²':>9} {'depth mm':>9} {'wet blades':>10}")
+    for i, lvl in enumerate(levels):
+        wet = res["wetted_area"][i]
+        depth = res["centroid_depth"][i]
+        mean_depth = np.nanmean(depth) if np.isfinite(depth).any() else float("nan")
+        print(f"{lvl:9.1f} {1e-2 * wet.sum(axis=1).mean():9.1f} "
+              f"{1e-2 * res['projected_area'][i].sum(axis=1).mean():9.1f} "
+              f"{mean_depth:9.1f} {(wet > 0).sum(axis=1).mean():10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Cam-profile optimizer over WING_MAP (maximizes net tread power per cycle)
+
+WHAT THIS SCRIPT DOES
+---------------------
+The WING_MAP control points in models/prototype/create_moving_parts.py were
+tuned by eye for the animation. This script treats the angles at the WING_MAP
+knot times as design variables and searches for the map that maximizes the
+net power delivered to the tread over one cycle:
+
+- Blade drag is evaluated with a flat-plate model at CYCLE_SAMPLES points
+  around the loop for the whole population at once (one NumPy expression,
+  tens of microseconds per candidate).
+- The search is differential evolution (DE/rand/1/bin); each generation is
+  evaluated in batches of BATCH_SIZE. With N_WORKERS > 1 it becomes an
+  island model: one population per worker process, each advanced
+  MIGRATION_INTERVAL generations per task (about a second of work, so
+  process dispatch stays negligible), after which every island's best
+  replaces the worst member of the next island in a ring. A generation is
+  only ~10 ms of work, far too little to ship to a pool on its own.
+- The follower angular rate is limited: the steepest WING_MAP segment,
+  converted to deg/s at the design tread speed, must stay below
+  MAX_FOLLOWER_RATE_DEG_S (penalty method).
+
+BLADE FORCE MODEL
+-----------------
+For a blade at loop position with unit tangent t, the plate normal is t
+rotated by CAM_ANGLE_SIGN × angle (angle 0 = broad face across the travel
+direction, 270 = edge-on, as in the baked rig). With relative water velocity
+w = U - u·t:
+
+    F = 0.5 rho A |w| (CN_MAX (w·n) n + CD_EDGE w)
+    P = F · (u t)
+
+The loop is fully submerged. FLOW_DIR points along the upper run, which is
+where the hand-tuned map holds the blade broad-on (capture phase).
+
+HOW TO USE
+----------
+    python analysis/cam_optimizer.py
+
+Prints baseline and optimized net power and the optimized WING_MAP as a
+Python literal that can be pasted into create_moving_parts.py.
+"""
+
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import tread_kinematics as tk
+
+# =========================
+# SETTINGS
+# =========================
+RHO_WATER = 1000.0              # kg/m³
+FLOW_SPEED_M_S = 1.0
+FLOW_FIELD = None               # channel_flow.py .npz: use its capture_mean_speed instead
+FLOW_DIR = (-1.0, 0.0)          # in loop (u, v) coordinates, see tread_kinematics.py
+TREAD_SPEED_RATIO = 0.33        # tread speed / flow speed
+
+BLADE_AREA_M2 = 0.159 * 0.040   # prototype blade, parts/blade/README.md
+CN_MAX = 1.98                   # flat plate normal-force coefficient at 90°
+CD_EDGE = 0.05                  # skin friction / edge drag
+MECH_LOSS_W = 0.0               # constant drivetrain loss subtracted from output
+
+CYCLE_SAMPLES = 512
+MAX_FOLLOWER_RATE_DEG_S = 1500.0
+RATE_PENALTY_W_PER_DEG_S = 0.01
+
+ANGLE_BOUNDS_DEG = (-180.0, 180.0)
+
+POP_SIZE = 0                    # 0 = 10 × number of design variables
+GENERATIONS = 2000
+DE_F = 0.6
+DE_CR = 0.9
+SEED = 28
+
+BATCH_SIZE = 256
+N_WORKERS = 1                   # >1 runs one DE island per worker process
+MIGRATION_INTERVAL = 100        # generations per island between migrations (one pool task)
+
+OUTPUT_JSON = None              # e.g. "wing_map_optimized.json"
+# =========================
+
+
+def flow_speed_m_s():
+    if FLOW_FIELD:
+        with np.load(FLOW_FIELD) as f:
+            return float(f["capture_mean_speed"])
+    return FLOW_SPEED_M_S
+
+
+def build_context(wing_map=tk.WING_MAP):
+    """Everything the fitness function needs, precomputed once."""
+    knots_t, base_a = tk.prepare_wing_map(wing_map)
+
+    pts2, seglen, cum, total = tk.polyline_table(tk.two_gear_loop())
+    t = (np.arange(CYCLE_SAMPLES) + 0.5) / CYCLE_SAMPLES
+    tang = tk.tangent_at_distance(pts2, seglen, cum, total, t * total)
+    perp = np.stack([-tang[:, 1], tang[:, 0]], axis=1)
+
+    flow_speed = flow_speed_m_s()
+    u = TREAD_SPEED_RATIO * flow_speed
+    flow = flow_speed * np.asarray(FLOW_DIR, dtype=np.float64)
+    flow /= max(np.linalg.norm(FLOW_DIR), 1e-12)
+    w = flow[None, :] - u * tang
+
+    seg_j, seg_u = tk.segment_weights(t, knots_t, tk.WING_MAP_SMOOTHSTEP)
+
+    n_blades = len(tk.blade_link_indices(tk.LINK_COUNT))
+    loop_len_m = total / 1000.0
+    # deg per unit cycle fraction -> deg/s at design speed; cos easing peaks at pi/2 × slope
+    ease_peak = 0.5 * math.pi if tk.WING_MAP_SMOOTHSTEP else 1.0
+
+    return {
+        "knots_t": knots_t,
+        "base_a": base_a,
+        "seg_j": seg_j,
+        "seg_u": seg_u,
+        "wt": np.einsum("ij,ij->i", w, tang),
+        "wp": np.einsum("ij,ij->i", w, perp),
+        "wmag": np.linalg.norm(w, axis=1),
+        "k": 0.5 * RHO_WATER * BLADE_AREA_M2 * u * n_blades,
+        "rate_scale": ease_peak * u / loop_len_m,
+        "dt_knots": np.diff(knots_t),
+    }
+
+
+def full_knots(x):
+    """Design vector (..., K-1) -> closed knot angles (..., K)."""
+    return np.concatenate([x, x[..., :1]], axis=-1)
+
+
+def max_follower_rate(a, ctx):
+    """Peak follower angular rate in deg/s for knot angles a (..., K)."""
+    slope = np.abs(np.diff(a, axis=-1)) / np.maximum(ctx["dt_knots"], 1e-12)
+    return slope.max(axis=-1) * ctx["rate_scale"]
+
+
+def cycle_power(a, ctx):
+    """Mean net tread power (W) over one cycle for knot angles a (pop, K)."""
+    a0 = a[:, ctx["seg_j"]]
+    ang = a0 + (a[:, ctx["seg_j"] + 1] - a0) * ctx["seg_u"]
+    phi = np.radians(tk.CAM_ANGLE_SIGN * ang)
+    c = np.cos(phi)
+    wn = ctx["wt"] * c + ctx["wp"] * np.sin(phi)
+    p = ctx["wmag"] * (CN_MAX * wn * c + CD_EDGE * ctx["wt"])
+    return ctx["k"] * p.mean(axis=1) - MECH_LOSS_W
+
+
+def fitness(x, ctx):
+    a = full_knots(x)
+    excess = np.maximum(max_follower_rate(a, ctx) - MAX_FOLLOWER_RATE_DEG_S, 0.0)
+    return cycle_power(a, ctx) - RATE_PENALTY_W_PER_DEG_S * excess
+
+
+_CTX = None
+
+
+def _init_worker(ctx):
+    global _CTX
+    _CTX = ctx
+
+
+def evaluate(pop, ctx):
+    """Fitness of the whole population, BATCH_SIZE candidates per call."""
+    batches = [pop[i:i + BATCH_SIZE] for i in range(0, len(pop), BATCH_SIZE)]
+    return np.concatenate([fitness(b, ctx) for b in batches])
+
+
+def initial_population(ctx, rng):
+    """Uniform population over ANGLE_BOUNDS_DEG with the current WING_MAP as member 0."""
+    lo, hi = ANGLE_BOUNDS_DEG
+    x0 = np.clip(ctx["base_a"][:-1], lo, hi)
+    n = POP_SIZE if POP_SIZE > 0 else 10 * len(x0)
+    pop = rng.uniform(lo, hi, (n, len(x0)))
+    pop[0] = x0
+    return pop
+
+
+def de_generations(pop, fit, ctx, rng, generations):
+    """Advance (pop, fit) in place by DE/rand/1/bin generations. Returns (pop, fit, evals)."""
+    lo, hi = ANGLE_BOUNDS_DEG
+    n, dim = pop.shape
+    idx = np.arange(n)
+    for _ in range(generations):
+        r1 = rng.integers(0, n, n)
+        r2 = (r1 + 1 + rng.integers(0, n - 1, n)) % n
+        r3 = (r2 + 1 + rng.integers(0, n - 1, n)) % n
+
+        mutant = np.clip(pop[r1] + DE_F * (pop[r2] - pop[r3]), lo, hi)
+        cross = rng.random((n, dim)) < DE_CR
+        cross[idx, rng.integers(0, dim, n)] = True
+        trial = np.where(cross, mutant, pop)
+
+        tfit = evaluate(trial, ctx)
+        better = tfit > fit
+        pop[better] = trial[better]
+        fit[better] = tfit[better]
+    return pop, fit, n * generations
+
+
+def _island_task(args):
+    pop, fit, seed, generations = args
+    return de_generations(pop, fit, _CTX, np.random.default_rng(seed), generations)
+
+
+def differential_evolution(ctx, generations=GENERATIONS, seed=SEED):
+    """DE/rand/1/bin, seeded with the current WING_MAP. Returns (best_x, best_fit, evals)."""
+    rng = np.random.default_rng(seed)
+    pop = initial_population(ctx, rng)
+    fit = evaluate(pop, ctx)
+    pop, fit, evals = de_generations(pop, fit, ctx, rng, generations)
+    best = int(np.argmax(fit))
+    return pop[best], float(fit[best]), evals + len(pop)
+
+
+def island_evolution(ctx, pool, islands=N_WORKERS, generations=GENERATIONS, seed=SEED):
+    """
+    One DE population per island, advanced on the pool MIGRATION_INTERVAL
+    generations at a time with ring migration of the best member in between.
+    Returns (best_x, best_fit, evals).
+    """
+    root = np.random.SeedSequence(seed)
+    state = []
+    for s in root.spawn(islands):
+        pop = initial_population(ctx, np.random.default_rng(s))
+        state.append((pop, evaluate(pop, ctx)))
+    evals = sum(len(pop) for pop, _ in state)
+
+    done = 0
+    while done < generations:
+        g = min(MIGRATION_INTERVAL, generations - done)
+        tasks = [(pop, fit, s, g) for (pop, fit), s in zip(state, root.spawn(islands))]
+        results = list(pool.map(_island_task, tasks))
+        state = [(pop, fit) for pop, fit, _ in results]
+        evals += sum(e for _, _, e in results)
+        done += g
+
+        best = [(pop[np.argmax(fit)].copy(), fit.max()) for pop, fit in state]
+        for k, (x, f) in enumerate(best):
+            pop, fit = state[(k + 1) % islands]
+            worst = int(np.argmin(fit))
+            if f > fit[worst]:
+                pop[worst], fit[worst] = x, f
+
+    pop, fit = max(state, key=lambda pf: pf[1].max())
+    best = int(np.argmax(fit))
+    return pop[best], float(fit[best]), evals
+
+
+def as_wing_map(knots_t, a):
+    """Knot angles back to WING_MAP form, wrapped to [0, 360)."""
+    return [(round(float(t), 4), round(float(x) % 360.0, 1)) for t, x in zip(knots_t, a)]
+
+
+def main():
+    ctx = build_context()
+    base = ctx["base_a"][None, :]
+    p_base = float(cycle_power(base, ctx)[0])
+    r_base = float(max_follower_rate(base, ctx)[0])
+
+    t0 = time.perf_counter()
+    if N_WORKERS > 1:
+        with ProcessPoolExecutor(N_WORKERS, initializer=_init_worker, initargs=(ctx,)) as pool:
+            best_x, best_fit, evals = island_evolution(ctx, pool)
+    else:
+        best_x, best_fit, evals = differential_evolution(ctx)
+    dt = time.perf_counter() - t0
+
+    best_a = full_knots(best_x)[None, :]
+    p_best = float(cycle_power(best_a, ctx)[0])
+    r_best = float(max_follower_rate(best_a, ctx)[0])
+
+    flow_speed = flow_speed_m_s()
+    print(f"Flow {flow_speed:.2f} m/s, tread {TREAD_SPEED_RATIO * flow_speed:.2f} m/s, "
+          f"{len(ctx['knots_t'])} knots, limit {MAX_FOLLOWER_RATE_DEG_S:.0f} deg/s")
+    print(f"Baseline WING_MAP : {p_base:8.3f} W   peak follower rate {r_base:7.0f} deg/s")
+    print(f"Optimized         : {p_best:8.3f} W   peak follower rate {r_best:7.0f} deg/s")
+    print(f"{evals:,} candidates in {dt:.1f} s ({1e6 * dt / evals:.1f} µs per candidate)")
+
+    wing_map = as_wing_map(ctx["knots_t"], best_a[0])
+    print("WING_MAP = [")
+    for t, a in wing_map:
+        print(f"    ({t:.2f}, {a:.1f}),")
+    print("]")
+
+    if OUTPUT_JSON:
+        with open(OUTPUT_JSON, "w") as fh:
+            json.dump({"wing_map": wing_map, "power_w": p_best, "peak_rate_deg_s": r_best}, fh, indent=2)
+        print(f"Wrote {os.path.abspath(OUTPUT_JSON)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""
+2D depth-averaged channel flow around the flow diverter and panels (NumPy)
+
+WHAT THIS SCRIPT DOES
+---------------------
+The flow diverter (parts/flow_diverter) and the side / center panels are
+meant to confine the flow and speed it up over the capture region. This
+script puts numbers on that with a plan-view, depth-averaged potential flow
+on a structured grid:
+
+    div(h grad phi) = 0,      u = -grad phi,      depth-integrated flux q = h u
+
+- h is the free water column: DEPTH_M in open water, reduced where the
+  diverter blocks part of the column (so the flow over it accelerates), and
+  zero inside panels (no flux through walls).
+- Inlet (x = 0): uniform inflow INFLOW_SPEED_M_S. Outlet (x = L): phi = 0.
+  Channel banks: no flux.
+- The 5-point system is solved with conjugate gradients preconditioned by a
+  multigrid V-cycle (Galerkin coarse operators from 2x2 cell aggregation,
+  a lone row / column of cells on odd-sized grids forming 2x1 aggregates,
+  damped Jacobi smoothing, dense solve on the coarsest grid of at most
+  COARSEST_CELLS cells). All stencils are whole-array NumPy expressions.
+
+Potential flow has no wakes or separation, so speeds behind bluff edges are
+optimistic; it is meant for comparing geometries, not absolute losses.
+
+GEOMETRY
+--------
+Channel coordinates in metres: x downstream, y across the channel. Panels are
+thick polylines; the diverter is a polygon over which a blocked fraction of
+the water column ramps up between DIVERTER_RAMP_X and then holds (depth
+averaging turns "lifted over the return run" into a shallower column).
+Each entry of VARIANTS is one geometry; all are solved and compared over
+CAPTURE_REGION (the plan-view footprint of the blades in the capture run).
+
+HOW TO USE
+----------
+    python analysis/channel_flow.py
+
+Prints per variant the mean / minimum speed and flow share through the
+capture region and writes channel_flow_<variant>.npz (x, y, h, u, v) when
+OUTPUT_NPZ is set. cam_optimizer.py reads capture_mean_speed from such a
+file via its FLOW_FIELD setting.
+"""
+
+import math
+import time
+
+import numpy as np
+
+# =========================
+# SETTINGS
+# =========================
+CHANNEL_LENGTH_M = 1.28
+CHANNEL_WIDTH_M = 0.48
+CELL_M = 0.005                  # grid: 256 x 96 cells
+DEPTH_M = 0.15
+INFLOW_SPEED_M_S = 1.0
+
+# blades: 159 mm wide, prototype loop about 250 mm long (parts/blade, tread_kinematics)
+CAPTURE_REGION = (0.55, 0.160, 0.80, 0.320)      # x0, y0, x1, y1
+
+PANEL_THICKNESS_M = 0.006
+SIDE_PANELS = [
+    [(0.30, 0.06), (0.50, 0.150), (0.85, 0.150)],
+    [(0.30, 0.42), (0.50, 0.330), (0.85, 0.330)],
+]
+CENTER_PANEL = [[(0.50, 0.240), (0.52, 0.240)]]   # short post between the two tread sides
+
+# The diverter lifts the flow off the return run: under the tread the lower part
+# of the column is blocked, ramping up from the leading edge.
+DIVERTER_POLYGON = [(0.36, 0.155), (0.80, 0.155), (0.80, 0.325), (0.36, 0.325)]
+DIVERTER_RAMP_X = (0.36, 0.55)
+DIVERTER_BLOCKED = 0.45                          # blocked column fraction after the ramp
+
+VARIANTS = {
+    "open_channel": {"panels": [], "diverter": False},
+    "side_panels": {"panels": SIDE_PANELS, "diverter": False},
+    "panels_diverter": {"panels": SIDE_PANELS + CENTER_PANEL, "diverter": True},
+}
+
+TOL = 1e-8                      # relative residual
+MAX_ITER = 200
+SMOOTH_SWEEPS = 2
+JACOBI_OMEGA = 0.8
+COARSEST_CELLS = 512            # dense direct solve below this size (the grid is coarsened down to it)
+
+OUTPUT_NPZ = False
+# =========================
+
+
+# ---------- geometry ----------
+def cell_centers(length=CHANNEL_LENGTH_M, width=CHANNEL_WIDTH_M, cell=CELL_M):
+    nx, ny = int(round(length / cell)), int(round(width / cell))
+    x = (np.arange(nx) + 0.5) * cell
+    y = (np.arange(ny) + 0.5) * cell
+    return np.meshgrid(x, y, indexing="ij")
+
+
+def polyline_mask(X, Y, polyline, thickness):
+    """Cells within thickness / 2 of the polyline (at least the cells it crosses)."""
+    P = np.stack([X, Y], axis=-1)
+    half = max(0.5 * thickness, 0.5 * math.sqrt(2.0) * (X[1, 0] - X[0, 0]))
+    mask = np.zeros(X.shape, dtype=bool)
+    for a, b in zip(polyline[:-1], polyline[1:]):
+        a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+        ab = b - a
+        s = np.clip(((P - a) @ ab) / max(ab @ ab, 1e-18), 0.0, 1.0)
+        d = np.linalg.norm(P - (a + s[..., None] * ab), axis=-1)
+        mask |= d <= half
+    return mask
+
+
+def polygon_mask(X, Y, poly):
+    """Even-odd point-in-polygon test on cell centers."""
+    inside = np.zeros(X.shape, dtype=bool)
+    pts = np.asarray(poly, dtype=np.float64)
+    for (x0, y0), (x1, y1) in zip(pts, np.roll(pts, -1, axis=0)):
+        crosses = (y0 > Y) != (y1 > Y)
+        xc = x0 + (Y - y0) * (x1 - x0) / np.where(y1 == y0, 1.0, y1 - y0)
+        inside ^= crosses & (X < xc)
+    return inside
+
+
+def depth_field(X, Y, variant):
+    """Free water column h (m) per cell; 0 inside panels."""
+    h = np.full(X.shape, DEPTH_M)
+    if variant["diverter"]:
+        inside = polygon_mask(X, Y, DIVERTER_POLYGON)
+        x0, x1 = DIVERTER_RAMP_X
+        blocked = DIVERTER_BLOCKED * np.clip((X - x0) / max(x1 - x0, 1e-12), 0.0, 1.0)
+        h = np.where(inside, DEPTH_M * (1.0 - blocked), h)
+    for panel in variant["panels"]:
+        h[polyline_mask(X, Y, panel, PANEL_THICKNESS_M)] = 0.0
+    return h
+
+
+# ---------- operator ----------
+def _pad_even(a, shape):
+    """a zero-padded at the high end to `shape` (one extra row / column per odd dimension)."""
+    return np.pad(a, [(0, n - m) for n, m in zip(shape, a.shape)])
+
+
+def restrict(r):
+    """Sum over 2x2 aggregates (the last aggregate is 2x1 / 1x1 on odd dimensions)."""
+    nx, ny = r.shape
+    cx, cy = -(-nx // 2), -(-ny // 2)
+    return _pad_even(r, (2 * cx, 2 * cy)).reshape(cx, 2, cy, 2).sum(axis=(1, 3))
+
+
+def prolong(e, shape):
+    """Piecewise-constant injection of aggregate values back onto a grid of `shape`."""
+    return np.repeat(np.repeat(e, 2, axis=0), 2, axis=1)[:shape[0], :shape[1]]
+
+
+class Level:
+    """
+    SPD 5-point operator: (A phi)_c = diag_c phi_c - sum_faces k_f phi_nb.
+    kx[i, j] couples (i, j)-(i+1, j); ky[i, j] couples (i, j)-(i, j+1).
+    """
+
+    def __init__(self, diag, kx, ky):
+        self.diag, self.kx, self.ky = diag, kx, ky
+
+    def apply(self, p):
+        out = self.diag * p
+        out[:-1] -= self.kx * p[1:]
+        out[1:] -= self.kx * p[:-1]
+        out[:, :-1] -= self.ky * p[:, 1:]
+        out[:, 1:] -= self.ky * p[:, :-1]
+        return out
+
+    def coarsen(self):
+        """
+        Galerkin P^T A P for piecewise-constant 2x2 aggregation. Odd dimensions
+        are padded with one uncoupled cell of zero diagonal, which leaves the
+        last aggregate with only its real cells.
+        """
+        nx, ny = self.diag.shape
+        cx, cy = -(-nx // 2), -(-ny // 2)
+        diag = _pad_even(self.diag, (2 * cx, 2 * cy))
+        kx = _pad_even(self.kx, (2 * cx - 1, 2 * cy))
+        ky = _pad_even(self.ky, (2 * cx, 2 * cy - 1))
+        d = diag.reshape(cx, 2, cy, 2).sum(axis=(1, 3))
+        d -= 2.0 * kx[0::2].reshape(cx, cy, 2).sum(axis=2)           # faces inside each block
+        d -= 2.0 * ky[:, 0::2].reshape(cx, 2, cy).sum(axis=1)
+        kx = kx[1::2].reshape(cx - 1, cy, 2).sum(axis=2)             # faces between blocks
+        ky = ky[:, 1::2].reshape(cx, 2, cy - 1).sum(axis=1)
+        return Level(d, kx, ky)
+
+    def dense(self):
+        nx, ny = self.diag.shape
+        n = nx * ny
+        idx = np.arange(n).reshape(nx, ny)
+        A = np.zeros((n, n))
+        A[idx.ravel(), idx.ravel()] = self.diag.ravel()
+        A[idx[:-1].ravel(), idx[1:].ravel()] = -self.kx.ravel()
+        A[idx[1:].ravel(), idx[:-1].ravel()] = -self.kx.ravel()
+        A[idx[:, :-1].ravel(), idx[:, 1:].ravel()] = -self.ky.ravel()
+        A[idx[:, 1:].ravel(), idx[:, :-1].ravel()] = -self.ky.ravel()
+        return A
+
+
+def build_system(h, inflow=INFLOW_SPEED_M_S, cell=CELL_M):
+    """Fine-level operator and right-hand side for the depth field h."""
+    def harmonic(a, b):
+        s = a + b
+        return np.where(s > 0, 2.0 * a * b / np.where(s > 0, s, 1.0), 0.0)
+
+    kx = harmonic(h[:-1], h[1:])
+    ky = harmonic(h[:, :-1], h[:, 1:])
+    diag = np.zeros_like(h)
+    diag[:-1] += kx
+    diag[1:] += kx
+    diag[:, :-1] += ky
+    diag[:, 1:] += ky
+    diag[-1] += 2.0 * h[-1]                      # outlet: phi = 0 half a cell downstream
+
+    solid = diag <= 0.0
+    diag[solid] = 1.0                            # decoupled cells: phi = 0
+
+    b = np.zeros_like(h)
+    b[0] = inflow * h[0] * cell                  # inlet flux per cell, in units where k = h
+    b[solid] = 0.0
+    return Level(diag, kx, ky), b
+
+
+def hierarchy(fine):
+    levels = [fine]
+    while True:
+        nx, ny = levels[-1].diag.shape
+        if nx * ny <= COARSEST_CELLS:
+            break
+        levels.append(levels[-1].coarsen())
+    if levels[-1].diag.size > COARSEST_CELLS:
+        raise ValueError(f"coarsest grid {levels[-1].diag.shape} exceeds COARSEST_CELLS = {COARSEST_CELLS}")
+    coarse = levels[-1].dense()
+    coarse += np.eye(len(coarse)) * 1e-12 * np.abs(np.diag(coarse)).max()
+    return levels, np.linalg.inv(coarse)
+
+
+def v_cycle(levels, coarse_inv, r, k=0):
+    """Symmetric V-cycle: approximate A^-1 r."""
+    A = levels[k]
+    if k == len(levels) - 1:
+        return (coarse_inv @ r.ravel()).reshape(r.shape)
+    inv_d = JACOBI_OMEGA / A.diag
+    x = inv_d * r
+    for _ in range(SMOOTH_SWEEPS - 1):
+        x += inv_d * (r - A.apply(x))
+    res = r - A.apply(x)
+    ec = v_cycle(levels, coarse_inv, restrict(res), k + 1)
+    x += prolong(ec, res.shape)
+    for _ in range(SMOOTH_SWEEPS):
+        x += inv_d * (r - A.apply(x))
+    return x
+
+
+def solve(A, b, tol=TOL, max_iter=MAX_ITER):
+    """Multigrid-preconditioned conjugate gradients. Returns (phi, iterations, rel. residual)."""
+    levels, coarse_inv = hierarchy(A)
+    x = np.zeros_like(b)
+    r = b.copy()
+    z = v_cycle(levels, coarse_inv, r)
+    p = z.copy()
+    rz = np.vdot(r, z)
+    b_norm = max(np.linalg.norm(b), 1e-300)
+    for it in range(1, max_iter + 1):
+        Ap = A.apply(p)
+        alpha = rz / np.vdot(p, Ap)
+        x += alpha * p
+        r -= alpha * Ap
+        rel = np.linalg.norm(r) / b_norm
+        if rel < tol:
+            return x, it, rel
+        z = v_cycle(levels, coarse_inv, r)
+        rz_new = np.vdot(r, z)
+        p = z + (rz_new / rz) * p
+        rz = rz_new
+    return x, max_iter, rel
+
+
+# ---------- velocities ----------
+def velocities(phi, h, cell=CELL_M):
+    """Cell-centered depth-averaged velocity (u, v) in m/s; zero in panels."""
+    wet = h > 0
+    gx = np.zeros((phi.shape[0] + 1, phi.shape[1]))
+    gy = np.zeros((phi.shape[0], phi.shape[1] + 1))
+    open_x = wet[:-1] & wet[1:]
+    open_y = wet[:, :-1] & wet[:, 1:]
+    gx[1:-1] = np.where(open_x, (phi[:-1] - phi[1:]) / cell, 0.0)
+    gy[:, 1:-1] = np.where(open_y, (phi[:, :-1] - phi[:, 1:]) / cell, 0.0)
+    gx[0] = INFLOW_SPEED_M_S
+    gx[-1] = 2.0 * phi[-1] / cell
+    u = np.where(wet, 0.5 * (gx[:-1] + gx[1:]), 0.0)
+    v = np.where(wet, 0.5 * (gy[:, :-1] + gy[:, 1:]), 0.0)
+    return u, v
+
+
+def capture_stats(X, Y, h, u, v, region=CAPTURE_REGION):
+    x0, y0, x1, y1 = region
+    inside = (X >= x0) & (X <= x1) & (Y >= y0) & (Y <= y1) & (h > 0)
+    speed = np.hypot(u, v)
+    # flow share through the capture region's cross-section at its mid x
+    col = np.argmin(np.abs(X[:, 0] - 0.5 * (x0 + x1)))
+    band = (Y[col] >= y0) & (Y[col] <= y1)
+    q = h[col] * u[col]
+    return {
+        "capture_mean_speed": float(speed[inside].mean()),
+        "capture_min_speed": float(speed[inside].min()),
+        "capture_speed_ratio": float(speed[inside].mean() / INFLOW_SPEED_M_S),
+        "capture_flow_share": float(q[band].sum() / max(q.sum(), 1e-300)),
+        "capture_uniformity": float(speed[inside].std() / max(speed[inside].mean(), 1e-300)),
+    }
+
+
+def run_variant(name, variant, X, Y):
+    h = depth_field(X, Y, variant)
+    t0 = time.perf_counter()
+    A, b = build_system(h)
+    phi, iters, rel = solve(A, b)
+    dt = time.perf_counter() - t0
+    u, v = velocities(phi, h)
+    stats = capture_stats(X, Y, h, u, v)
+    if OUTPUT_NPZ:
+        np.savez_compressed(f"channel_flow_{name}.npz", x=X[:, 0], y=Y[0], h=h, u=u, v=v, **stats)
+    return stats, iters, rel, dt
+
+
+def main():
+    X, Y = cell_centers()
+    print(f"Grid {X.shape[0]} x {X.shape[1]} cells of {1000 * CELL_M:.0f} mm, "
+          f"depth {DEPTH_M:.2f} m, inflow {INFLOW_SPEED_M_S:.2f} m/s\n")
+    print(f"{'variant':18s} {'iters':>5} {'time s':>7} {'mean m/s':>9} {'min m/s':>8} "
+          f"{'ratio':>6} {'flow %':>7} {'cv %':>6}")
+    for name, variant in VARIANTS.items():
+        s, iters, rel, dt = run_variant(name, variant, X, Y)
+        print(f"{name:18s} {iters:5d} {dt:7.2f} {s['capture_mean_speed']:9.3f} {s['capture_min_speed']:8.3f} "
+              f"{s['capture_speed_ratio']:6.3f} {100 * s['capture_flow_share']:7.1f} "
+              f"{100 * s['capture_uniformity']:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
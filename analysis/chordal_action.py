@@ -0,0 +1,154 @@
+"""
+Sprocket engagement and chordal action sweep (tooth count × pitch × speed)
+
+WHAT THIS SCRIPT DOES
+---------------------
+create_moving_parts.py turns gear angle into chain travel as theta * gear_r,
+i.e. a perfectly round sprocket. A real sprocket engages the chain one
+tooth at a time: within each tooth the engaged pin swings through
+phi in [-pi/N, pi/N), so the span moves at v = omega R cos(phi) and the
+lever arm of the chain tension is R cos(phi). This script evaluates the
+resulting ripple for every combination of TEETH, PITCHES_MM and
+TREAD_SPEEDS_M_S in one broadcast NumPy expression:
+
+- speed / torque ripple        1 - cos(pi/N) (constant gear speed / tension)
+- chordal rise                 R (1 - cos(pi/N)), span lift per tooth
+- peak chordal acceleration    omega² R sin(pi/N)
+- link impact velocity         omega p / 2, seating pin vs. tooth, normal to the span
+- engagement rate / impact power over both gears
+- gear-to-gear ratio ripple    cos(phi) / cos(phi + delta), delta = tooth phase
+                               of the span (CENTER_DISTANCE_MM / p, fractional part)
+- loop closure                 center distance change for a whole number of links
+
+Candidates are ranked by peak chordal acceleration at the top production
+speed. Setting CHAIN_TRAVEL_MODEL = 'CHORDAL' in create_moving_parts.py
+bakes the same polygonal travel (tread_kinematics.chordal_travel).
+
+HOW TO USE
+----------
+    python analysis/chordal_action.py
+"""
+
+import csv
+import os
+import time
+
+import numpy as np
+
+import tread_kinematics as tk
+
+# =========================
+# SETTINGS
+# =========================
+TEETH = np.arange(10, 61)
+PITCHES_MM = np.array([6.4, 8.0, 9.525, 12.7, 15.875, 19.05])
+TREAD_SPEEDS_M_S = np.array([0.2, 0.33, 0.5, 0.75, 1.0])   # production operating range
+
+CENTER_DISTANCE_MM = tk.TRACK_CENTER_DISTANCE
+MAX_GEAR_RADIUS_MM = 60.0        # frame clearance
+LINK_MASS_KG = 0.004             # one link incl. share of the blade rig
+PHASE_SAMPLES = 256              # within one tooth, for the gear-to-gear ratio ripple
+
+TOP_N = 15
+OUTPUT_CSV = None                # e.g. "chordal_sweep.csv"
+# =========================
+
+
+def sweep(teeth=TEETH, pitches_mm=PITCHES_MM, speeds_m_s=TREAD_SPEEDS_M_S,
+          center_distance_mm=CENTER_DISTANCE_MM):
+    """All metrics as arrays broadcast to (len(teeth), len(pitches), len(speeds))."""
+    N = np.asarray(teeth, dtype=np.float64)[:, None, None]
+    p = np.asarray(pitches_mm, dtype=np.float64)[None, :, None] / 1000.0
+    v = np.asarray(speeds_m_s, dtype=np.float64)[None, None, :]
+    half = np.pi / N
+
+    R = tk.gear_radius(p, N)
+    omega = 2.0 * np.pi * v / (N * p)            # mean gear speed for mean chain speed v
+    ripple = 1.0 - np.cos(half)
+
+    # tooth phase of the far end of the span; equal gears -> span = center distance
+    links_in_span = center_distance_mm / 1000.0 / p
+    delta = 2.0 * half * (links_in_span % 1.0)
+    phi = (np.arange(PHASE_SAMPLES) / PHASE_SAMPLES * 2.0 - 1.0) * half[..., None]
+    phi2 = (phi + delta[..., None] + half[..., None]) % (2.0 * half[..., None]) - half[..., None]
+    ratio = np.cos(phi) / np.cos(phi2)
+
+    links = 2.0 * links_in_span + N              # half a wrap on each gear
+    engage_hz = N * omega / (2.0 * np.pi)
+    impact_v = 0.5 * omega * p
+
+    shape = np.broadcast_shapes(N.shape, p.shape, v.shape)
+    return {
+        "teeth": np.broadcast_to(N, shape),
+        "pitch_mm": np.broadcast_to(p * 1000.0, shape),
+        "speed_m_s": np.broadcast_to(v, shape),
+        "gear_radius_mm": np.broadcast_to(R * 1000.0, shape),
+        "gear_rpm": omega * 60.0 / (2.0 * np.pi),
+        "speed_ripple": np.broadcast_to(ripple, shape),
+        "torque_ripple": np.broadcast_to(ripple, shape),
+        "chordal_rise_mm": np.broadcast_to(R * ripple * 1000.0, shape),
+        "peak_accel_m_s2": omega ** 2 * R * np.sin(half),
+        "impact_velocity_m_s": impact_v,
+        "engagement_hz": engage_hz,
+        "impact_power_w": 2.0 * 0.5 * LINK_MASS_KG * impact_v ** 2 * engage_hz,
+        "ratio_ripple": np.broadcast_to(ratio.max(axis=-1) - ratio.min(axis=-1), shape),
+        "link_count": np.broadcast_to(np.round(links), shape),
+        "center_adjust_mm": np.broadcast_to((np.round(links) - links) * p * 500.0, shape),
+    }
+
+
+def rank(res, max_radius_mm=MAX_GEAR_RADIUS_MM):
+    """(teeth, pitch) candidates that fit, ordered by peak acceleration at the top speed."""
+    top = {k: a[..., -1] for k, a in res.items()}
+    ok = top["gear_radius_mm"] <= max_radius_mm
+    ti, pi = np.nonzero(ok)
+    order = np.lexsort((top["impact_power_w"][ti, pi], top["peak_accel_m_s2"][ti, pi]))
+    return ti[order], pi[order]
+
+
+def travel_deviation_mm(teeth=tk.GEAR_TEETH, pitch=tk.LINK_PITCH, samples=4096):
+    """Largest difference between smooth (theta * gear_r) and chordal travel over one tooth."""
+    theta = np.linspace(0.0, 2.0 * np.pi / teeth, samples)
+    smooth = theta * tk.gear_radius(pitch, teeth)
+    return float(np.abs(tk.chordal_travel(theta, pitch, teeth) - smooth).max())
+
+
+def main():
+    t0 = time.perf_counter()
+    res = sweep()
+    dt = time.perf_counter() - t0
+    n = res["peak_accel_m_s2"].size
+
+    ti, pi = rank(res)
+    v_top = TREAD_SPEEDS_M_S[-1]
+    print(f"{len(TEETH)} tooth counts x {len(PITCHES_MM)} pitches x {len(TREAD_SPEEDS_M_S)} speeds "
+          f"= {n:,} cases in {1e3 * dt:.1f} ms")
+    print(f"Ranked at {v_top:.2f} m/s, gear radius <= {MAX_GEAR_RADIUS_MM:.0f} mm, "
+          f"{len(ti)} of {len(TEETH) * len(PITCHES_MM)} combinations fit\n")
+    print(f"{'teeth':>5} {'pitch':>7} {'R mm':>6} {'rpm':>6} {'ripple %':>8} {'rise mm':>7} "
+          f"{'acc m/s²':>9} {'v_imp m/s':>9} {'imp W':>7} {'ratio %':>8} {'links':>5} {'dC mm':>6}")
+    for t, p in list(zip(ti, pi))[:TOP_N]:
+        r = {k: a[t, p, -1] for k, a in res.items()}
+        print(f"{r['teeth']:5.0f} {r['pitch_mm']:7.3f} {r['gear_radius_mm']:6.1f} {r['gear_rpm']:6.1f} "
+              f"{100 * r['speed_ripple']:8.3f} {r['chordal_rise_mm']:7.3f} {r['peak_accel_m_s2']:9.3f} "
+              f"{r['impact_velocity_m_s']:9.4f} {r['impact_power_w']:7.4f} {100 * r['ratio_ripple']:8.3f} "
+              f"{r['link_count']:5.0f} {r['center_adjust_mm']:+6.2f}")
+
+    cur = sweep([tk.GEAR_TEETH], [tk.LINK_PITCH], [v_top])
+    print(f"\nCurrent design ({tk.GEAR_TEETH} teeth, {tk.LINK_PITCH} mm): "
+          f"ripple {100 * cur['speed_ripple'].item():.3f} %, "
+          f"peak accel {cur['peak_accel_m_s2'].item():.3f} m/s², "
+          f"impact {cur['impact_velocity_m_s'].item():.4f} m/s, "
+          f"chordal vs smooth travel up to {travel_deviation_mm():.3f} mm")
+
+    if OUTPUT_CSV:
+        keys = list(res)
+        with open(OUTPUT_CSV, "w", newline="") as fh:
+            w = csv.writer(fh)
+            w.writerow(keys)
+            w.writerows(np.stack([res[k].ravel() for k in keys], axis=1).tolist())
+        print(f"Wrote {os.path.abspath(OUTPUT_CSV)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""
+Gearbox, PM generator, rectifier and MPPT simulation behind the pinion stage
+
+WHAT THIS SCRIPT DOES
+---------------------
+MECH_RATIOS gives the pinion a 5:1 ratio and docs/power_transmission.md says
+that stage drives the generator. This script steps the tread and the whole
+electrical chain in time, for every combination of flow speed, extra gearbox
+ratio and generator at once (one NumPy array per state variable):
+
+    water --F(u, U)--> tread / gear --pinion 5:1 x GEARBOX_RATIO--> generator
+          --diode bridge--> DC link --converter (MPPT)--> output
+
+- Hydrodynamic drive: the flat-plate model of cam_optimizer.py with the
+  baseline WING_MAP, tabulated once as F = 0.5 rho A n U² C_F(lambda),
+  lambda = tread speed / flow speed.
+- Tread inertia: links and blades at the gear radius, gears, and the
+  generator rotor reflected through the total ratio.
+- Gearbox loss map per stage: torque-dependent mesh loss (MESH_EFFICIENCY)
+  plus speed-dependent drag (no-load torque + viscous term).
+- PM generator + rectifier as a DC-side equivalent: E_dc = k_dc omega,
+  V_dc = E_dc - R_dc I - 2 V_diode, torque k_dc I plus iron-loss drag;
+  the bridge blocks when E_dc < 2 V_diode.
+- MPPT: perturb & observe on the converter's DC current reference. The
+  period is per case: at least MPPT_PERIOD_S, MPPT_TAU_MULT mechanical time
+  constants J / (d(F r)/d omega) at the best tip-speed ratio and
+  MPPT_FLOW_MULT turbulence correlation times, so every step is judged after
+  the tread has settled and not on a gust. The current step is
+  MPPT_SLEW_A_S x period, so the search climbs at the same rate whatever
+  the period, capped at MPPT_STEP_FRAC of the current reference (at least
+  MPPT_STEP_A) so slow, low-current cases do not dither around their
+  optimum with steps as large as the current itself.
+  A tread slowing below MPPT_STALL_LAMBDA is treated as stalling: the
+  current reference backs off by MPPT_STALL_BACKOFF and the search turns
+  down.
+- Flow: per-case mean speed with turbulence, either AR(1) noise
+  (TURBULENCE_INTENSITY, time constant LENGTH_SCALE_M / U) or the
+  grid-averaged u of a turbulent_inflow.py record (INFLOW_PATH), time-shifted
+  per case.
+
+Reported per generator x ratio: mean electrical output at each flow speed,
+the FLOW_WEIGHTS-weighted mean (site flow histogram), the tip-speed ratio
+reached by the MPPT against the best one, and the chain efficiencies,
+followed by the change in weighted output when every MPPT period is scaled
+by each of MPPT_PERIOD_CHECK (the results should not depend on it), next
+to the change from another turbulence seed for scale.
+
+HOW TO USE
+----------
+    python analysis/drivetrain_sim.py
+"""
+
+import time
+
+import numpy as np
+
+import cam_optimizer as co
+import tread_kinematics as tk
+
+# =========================
+# SETTINGS
+# =========================
+FLOW_SPEEDS_M_S = np.array([0.5, 0.75, 1.0, 1.25, 1.5])
+FLOW_WEIGHTS = np.array([0.15, 0.25, 0.3, 0.2, 0.1])   # share of time at each speed
+TURBULENCE_INTENSITY = 0.10
+LENGTH_SCALE_M = 0.5
+INFLOW_PATH = None              # turbulent_inflow.py record instead of AR(1) noise
+
+PINION_RATIO = dict(tk.MECH_RATIOS)["Pinion"]
+GEARBOX_RATIOS = np.array([1.0, 2.0, 3.0, 5.0, 8.0])   # extra stage after the pinion (1 = none)
+
+GENERATORS = {
+    # k_dc: DC-side EMF constant V/(rad/s), r_dc: ohm, j: rotor kg m², k_fe: iron loss N m/(rad/s), i_max: A
+    "pm_12v_small": dict(k_dc=0.020, r_dc=0.8, j=2e-6, k_fe=2e-6, i_max=3.0),
+    "pm_24v_mid":   dict(k_dc=0.045, r_dc=1.6, j=6e-6, k_fe=4e-6, i_max=2.0),
+    "pm_48v_large": dict(k_dc=0.110, r_dc=4.0, j=2e-5, k_fe=8e-6, i_max=1.0),
+}
+
+TREAD_MASS_KG = 0.45            # links, pins, followers and blades
+GEAR_INERTIA = 4e-5             # both gears, axles and the pinion, at the gear shaft
+MESH_EFFICIENCY = 0.97          # per stage
+NO_LOAD_TORQUE = 0.002          # N m per stage, at its input shaft
+VISCOUS_DRAG = 1e-5             # N m/(rad/s) per stage, at its input shaft
+CHAIN_FRICTION_N = 0.3          # pivots, bearings and chain, along the tread
+DIODE_DROP_V = 0.3              # Schottky, two conducting
+CONVERTER_EFFICIENCY = 0.94
+
+MPPT_PERIOD_S = 0.2             # shortest period (s)
+MPPT_TAU_MULT = 5.0             # at least this many mechanical time constants
+MPPT_FLOW_MULT = 2.0            # and this many turbulence correlation times
+MPPT_SLEW_A_S = 0.05            # current step = slew x period,
+MPPT_STEP_FRAC = 0.2            # but at most this fraction of the current reference
+MPPT_STEP_A = 0.01              # (or this, near zero current)
+MPPT_STALL_LAMBDA = 0.05        # tread / flow speed below this at an MPPT step counts as stalling
+MPPT_STALL_BACKOFF = 0.5        # fraction of the current reference dropped on a stall
+MPPT_PERIOD_CHECK = (0.5, 2.0)  # MPPT period multipliers for the sensitivity check
+
+DT_S = 0.005
+DURATION_S = 120.0
+SETTLE_S = 40.0                 # excluded from the averages
+LAMBDA_SAMPLES = 241
+SEED = 44
+TOP_N = 8
+# =========================
+
+
+def force_coefficient_table(samples=LAMBDA_SAMPLES, wing_map=tk.WING_MAP):
+    """(lambda grid, C_F) of the mean tread-direction blade force for the baked wing map."""
+    kt, ka = tk.prepare_wing_map(wing_map)
+    pts2, seglen, cum, total = tk.polyline_table(tk.two_gear_loop())
+    t = (np.arange(co.CYCLE_SAMPLES) + 0.5) / co.CYCLE_SAMPLES
+    tang = tk.tangent_at_distance(pts2, seglen, cum, total, t * total)
+    perp = np.stack([-tang[:, 1], tang[:, 0]], axis=1)
+    phi = np.radians(tk.CAM_ANGLE_SIGN * tk.wing_angle(t, kt, ka))
+    n = np.cos(phi)[:, None] * tang + np.sin(phi)[:, None] * perp
+
+    flow = np.asarray(co.FLOW_DIR, dtype=np.float64)
+    flow /= max(np.linalg.norm(flow), 1e-12)
+    lam = np.linspace(0.0, 1.2, samples)
+    w = flow[None, None, :] - lam[:, None, None] * tang[None]          # per unit flow speed
+    wn = np.einsum("lsk,sk->ls", w, n)
+    wt = np.einsum("lsk,sk->ls", w, tang)
+    wmag = np.linalg.norm(w, axis=-1)
+    c = np.einsum("sk,sk->s", n, tang)
+    return lam, (wmag * (co.CN_MAX * wn * c + co.CD_EDGE * wt)).mean(axis=1)
+
+
+def build_cases(flows=FLOW_SPEEDS_M_S, ratios=GEARBOX_RATIOS, generators=GENERATORS):
+    """Flat arrays over flow x ratio x generator."""
+    names = list(generators)
+    F, R, G = np.meshgrid(np.arange(len(flows)), np.arange(len(ratios)), np.arange(len(names)), indexing="ij")
+    F, R, G = F.ravel(), R.ravel(), G.ravel()
+    gen = {k: np.array([generators[names[g]][k] for g in G]) for k in ("k_dc", "r_dc", "j", "k_fe", "i_max")}
+    return {
+        "flow_idx": F, "ratio_idx": R, "gen_idx": G, "gen_names": names,
+        "flow": np.asarray(flows, dtype=np.float64)[F],
+        "extra_ratio": np.asarray(ratios, dtype=np.float64)[R],
+        **gen,
+    }
+
+
+def flow_traces(cases, steps, dt=DT_S, seed=SEED):
+    """Iterator of per-step (cases,) flow speeds."""
+    rng = np.random.default_rng(seed)
+    U = cases["flow"]
+    if INFLOW_PATH:
+        import turbulent_inflow as ti
+        arr, meta = ti.read_inflow(INFLOW_PATH)
+        u = np.asarray(arr[:, :, 0], dtype=np.float64).mean(axis=1) / meta["mean_speed_m_s"]
+        t_src = meta["dt"] * np.arange(len(u))
+        shift = rng.uniform(0.0, t_src[-1], len(U))
+        for k in range(steps):
+            yield U * np.interp((shift + k * dt) % t_src[-1], t_src, u)
+        return
+    a = np.exp(-dt * U / LENGTH_SCALE_M)
+    b = np.sqrt(1.0 - a * a)
+    x = rng.standard_normal(len(U))
+    for _ in range(steps):
+        yield U * (1.0 + TURBULENCE_INTENSITY * x)
+        x = a * x + b * rng.standard_normal(len(U))
+
+
+def mppt_periods(cases, J, table, min_period_s=MPPT_PERIOD_S, tau_mult=MPPT_TAU_MULT, flow_mult=MPPT_FLOW_MULT):
+    """
+    Per-case MPPT period (s): the longest of min_period_s, tau_mult mechanical
+    time constants J / b (b the hydrodynamic damping d(F r_g)/d omega at the
+    best tip-speed ratio; the current-controlled generator adds none) and
+    flow_mult turbulence correlation times LENGTH_SCALE_M / U.
+    """
+    lam, cf = table
+    best = np.argmax(lam * cf)
+    slope = np.gradient(cf, lam)[best]
+    r_g = float(tk.gear_radius()) / 1000.0
+    n_blades = len(tk.blade_link_indices(tk.LINK_COUNT))
+    f_scale = 0.5 * co.RHO_WATER * co.BLADE_AREA_M2 * n_blades
+    b = f_scale * cases["flow"] * r_g ** 2 * max(abs(slope), 1e-6) + VISCOUS_DRAG
+    return np.maximum(np.maximum(min_period_s, tau_mult * J / b), flow_mult * LENGTH_SCALE_M / cases["flow"])
+
+
+def simulate(cases, duration_s=DURATION_S, dt=DT_S, settle_s=SETTLE_S, table=None, period_scale=1.0, seed=SEED):
+    """
+    Step all cases; returns time-averaged powers, lambda and the MPPT current.
+    period_scale multiplies every MPPT period (and with it the slew-limited step).
+    """
+    lam_tab, cf_tab = force_coefficient_table() if table is None else table
+    n = len(cases["flow"])
+    r_g = float(tk.gear_radius()) / 1000.0
+    n_blades = len(tk.blade_link_indices(tk.LINK_COUNT))
+    f_scale = 0.5 * co.RHO_WATER * co.BLADE_AREA_M2 * n_blades
+
+    ratio = PINION_RATIO * cases["extra_ratio"]
+    stages = np.where(cases["extra_ratio"] > 1.0, 2, 1)
+    eta = MESH_EFFICIENCY ** stages
+    J = TREAD_MASS_KG * r_g ** 2 + GEAR_INERTIA + cases["j"] * ratio ** 2
+    k_dc, r_dc, k_fe, i_max = cases["k_dc"], cases["r_dc"], cases["k_fe"], cases["i_max"]
+
+    omega = np.zeros(n)                         # gear shaft
+    i_ref = np.zeros(n)
+    p_prev = np.zeros(n)
+    step_dir = np.ones(n)
+    mppt_every = np.maximum(1, np.round(period_scale * mppt_periods(cases, J, (lam_tab, cf_tab)) / dt)).astype(int)
+    mppt_step = MPPT_SLEW_A_S * mppt_every * dt
+    p_acc = np.zeros(n)
+
+    steps = int(round(duration_s / dt))
+    settle = int(round(settle_s / dt))
+    acc = {k: np.zeros(n) for k in ("hydro", "gear", "gen", "dc", "out", "lambda", "flow", "current")}
+    for k, U in enumerate(flow_traces(cases, steps, dt, seed)):
+        u = omega * r_g
+        lam = u / np.maximum(U, 1e-6)
+        F = f_scale * U * U * np.interp(lam, lam_tab, cf_tab)
+
+        w_gen = omega * ratio
+        e_dc = k_dc * w_gen
+        i_ok = np.maximum(e_dc - 2.0 * DIODE_DROP_V, 0.0) / r_dc   # bridge blocks below 2 V_diode
+        i = np.minimum(np.minimum(i_ref, i_max), i_ok)
+        v_dc = e_dc - r_dc * i - 2.0 * DIODE_DROP_V
+        t_gen = k_dc * i + k_fe * w_gen
+        t_gear = (ratio * t_gen / eta + stages * NO_LOAD_TORQUE * np.sign(omega)
+                  + stages * VISCOUS_DRAG * omega + CHAIN_FRICTION_N * r_g * np.sign(omega))
+        omega = np.maximum(omega + dt * (F * r_g - t_gear) / J, 0.0)
+
+        p_dc = v_dc * i
+        p_acc += p_dc
+        due = (k + 1) % mppt_every == 0
+        if due.any():
+            p_mean = p_acc / mppt_every
+            stall = due & (lam < MPPT_STALL_LAMBDA) & (i_ref > 0.0)
+            step_dir = np.where(due & (p_mean < p_prev), -step_dir, step_dir)
+            step_dir = np.where(stall, -1.0, step_dir)
+            step = np.minimum(mppt_step, np.maximum(MPPT_STEP_A, MPPT_STEP_FRAC * i_ref))
+            i_new = np.where(stall, i_ref * (1.0 - MPPT_STALL_BACKOFF), i_ref + step_dir * step)
+            i_ref = np.where(due, np.clip(i_new, 0.0, i_max), i_ref)
+            p_prev = np.where(due, p_mean, p_prev)
+            p_acc = np.where(due, 0.0, p_acc)
+
+        if k >= settle:
+            acc["hydro"] += F * u
+            acc["gear"] += (F * r_g - CHAIN_FRICTION_N * r_g) * omega
+            acc["gen"] += t_gen * w_gen
+            acc["dc"] += p_dc
+            acc["out"] += CONVERTER_EFFICIENCY * p_dc
+            acc["lambda"] += lam
+            acc["flow"] += U
+            acc["current"] += i
+    m = max(steps - settle, 1)
+    return {k: v / m for k, v in acc.items()}
+
+
+def ideal_hydro_power(U, table):
+    """Best hydrodynamic power over lambda at steady flow U (W)."""
+    lam, cf = table
+    n_blades = len(tk.blade_link_indices(tk.LINK_COUNT))
+    return 0.5 * co.RHO_WATER * co.BLADE_AREA_M2 * n_blades * np.asarray(U) ** 3 * (lam * cf).max()
+
+
+def main():
+    table = force_coefficient_table()
+    lam, cf = table
+    lam_best = lam[np.argmax(lam * cf)]
+    cases = build_cases()
+    n = len(cases["flow"])
+    steps = int(round(DURATION_S / DT_S))
+
+    t0 = time.perf_counter()
+    res = simulate(cases, table=table)
+    dt = time.perf_counter() - t0
+    print(f"{n} cases ({len(FLOW_SPEEDS_M_S)} flows x {len(GEARBOX_RATIOS)} ratios x {len(GENERATORS)} generators) "
+          f"x {steps:,} steps in {dt:.2f} s ({1e9 * dt / (n * steps):.0f} ns per case-step)")
+    print(f"best tread / flow speed ratio {lam_best:.3f}, pinion {PINION_RATIO:g}:1\n")
+
+    shape = (len(FLOW_SPEEDS_M_S), len(GEARBOX_RATIOS), len(GENERATORS))
+    out = res["out"].reshape(shape)
+    weighted = np.tensordot(FLOW_WEIGHTS / FLOW_WEIGHTS.sum(), out, axes=1)
+    ideal = ideal_hydro_power(FLOW_SPEEDS_M_S, table)
+    lam_w = np.tensordot(FLOW_WEIGHTS / FLOW_WEIGHTS.sum(), res["lambda"].reshape(shape), axes=1)
+    chain = {k: res[k].reshape(shape) for k in ("hydro", "gear", "gen", "dc", "out")}
+
+    order = np.argsort(weighted.ravel())[::-1]
+    speeds = " ".join(f"{format(u, 'g') + ' m/s':>9}" for u in FLOW_SPEEDS_M_S)
+    print(f"{'generator':<14} {'ratio':>6} {'weighted W':>10} {speeds} {'lambda':>7} "
+          f"{'gbox %':>7} {'gen %':>6} {'water→wire %':>12}")
+    for idx in order[:TOP_N]:
+        r, g = np.unravel_index(idx, weighted.shape)
+        row = " ".join(f"{out[f, r, g]:9.3f}" for f in range(len(FLOW_SPEEDS_M_S)))
+        w = FLOW_WEIGHTS / FLOW_WEIGHTS.sum()
+        e_gbox = (w @ chain["gen"][:, r, g]) / max(w @ chain["gear"][:, r, g], 1e-12)
+        e_gen = (w @ chain["dc"][:, r, g]) / max(w @ chain["gen"][:, r, g], 1e-12)
+        e_all = weighted[r, g] / max(w @ ideal, 1e-12)
+        print(f"{list(GENERATORS)[g]:<14} {PINION_RATIO * GEARBOX_RATIOS[r]:6.0f} {weighted[r, g]:10.3f} {row} "
+              f"{lam_w[r, g]:7.3f} {100 * e_gbox:7.1f} {100 * e_gen:6.1f} {100 * e_all:12.1f}")
+    print(f"\n{'ideal hydro':<21} {ideal @ (FLOW_WEIGHTS / FLOW_WEIGHTS.sum()):10.3f} "
+          + " ".join(f"{p:9.3f}" for p in ideal))
+
+    # ---------- MPPT period sensitivity ----------
+    print(f"\nchange in weighted output over the top {TOP_N}:")
+    top = order[:TOP_N]
+    checks = [(f"MPPT periods x{m:g}", dict(period_scale=m)) for m in MPPT_PERIOD_CHECK]
+    checks.append((f"seed {SEED + 1} (scatter)", dict(seed=SEED + 1)))
+    for label, kw in checks:
+        alt = simulate(cases, table=table, **kw)["out"].reshape(shape)
+        w_alt = np.tensordot(FLOW_WEIGHTS / FLOW_WEIGHTS.sum(), alt, axes=1).ravel()[top]
+        rel = (w_alt - weighted.ravel()[top]) / np.maximum(weighted.ravel()[top], 1e-12)
+        print(f"  {label:<22} max {100 * np.abs(rel).max():5.1f} %, mean {100 * rel.mean():+5.1f} %")
+
+
+if __name__ == "__main__":
+    main()
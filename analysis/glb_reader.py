@@ -0,0 +1,333 @@
+"""
+Memory-mapped GLB reader: baked animation as NumPy arrays, pose diffing
+
+WHAT THIS SCRIPT DOES
+---------------------
+Checking a bake or comparing two exports used to mean re-opening
+prototype_moving_parts.glb in Blender. This module reads the file directly:
+
+- The .glb is memory-mapped; only the JSON chunk is parsed. Accessors are
+  returned as zero-copy, read-only NumPy views into the binary chunk
+  (strided views when the buffer view is interleaved), so nothing is read
+  from disk until it is used.
+- Node names, node -> mesh references, the node hierarchy and every
+  animation channel (sampler input / output views, interpolation) are
+  exposed as plain Python / NumPy objects.
+- world_matrices() evaluates the baked animation for any set of nodes at any
+  times: channels that share an input accessor (Blender writes one per
+  action length) are sampled together, parents are composed in hierarchy
+  order.
+- diff_poses() compares two files object by object (translation and rotation
+  error over time, objects present in only one file).
+
+Interpolation: LINEAR (rotation as normalized lerp, which equals slerp at the
+keys), STEP, and CUBICSPLINE values without tangents. Only the GLB-embedded
+buffer is supported.
+
+Coordinates stay glTF (Y up) unless to_blender() is applied:
+(x, y, z) -> (x, -z, y).
+
+HOW TO USE
+----------
+    python analysis/glb_reader.py
+
+Set COMPARE_PATH to a second export to get a per-object pose diff, e.g.
+before / after a change to create_moving_parts.py.
+"""
+
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+# =========================
+# SETTINGS
+# =========================
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GLB_PATH = os.path.join(REPO, "models", "prototype", "prototype_moving_parts.glb")
+COMPARE_PATH = None             # second .glb to diff against GLB_PATH
+NODE_PREFIX = ""                # only nodes whose name starts with this
+TRANSLATION_TOL = 1e-3          # file units (the prototype is exported in mm)
+ROTATION_TOL_DEG = 1e-2
+TOP_N = 15
+# =========================
+
+GLTF_TO_BLENDER = np.array([[1.0, 0.0, 0.0], [0.0, 0.0, -1.0], [0.0, 1.0, 0.0]])
+
+_COMPONENTS = {5120: np.int8, 5121: np.uint8, 5122: np.int16, 5123: np.uint16,
+               5125: np.uint32, 5126: np.float32}
+_WIDTH = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16}
+_CHUNK_JSON = 0x4E4F534A
+_CHUNK_BIN = 0x004E4942
+_DEFAULTS = {"translation": (0.0, 0.0, 0.0), "rotation": (0.0, 0.0, 0.0, 1.0), "scale": (1.0, 1.0, 1.0)}
+
+
+class Glb:
+    """A .glb file, memory-mapped. gltf holds the parsed JSON chunk."""
+
+    def __init__(self, path):
+        self.path = path
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, version, length = struct.unpack("<4sII", self.data[:12].tobytes())
+        if magic != b"glTF" or version != 2:
+            raise ValueError(f"{path} is not a binary glTF 2.0 file")
+
+        self.gltf, self.bin_offset, self.bin_length = None, 0, 0
+        offset = 12
+        while offset < min(length, len(self.data)):
+            clen, ctype = struct.unpack("<II", self.data[offset:offset + 8].tobytes())
+            if ctype == _CHUNK_JSON:
+                self.gltf = json.loads(self.data[offset + 8:offset + 8 + clen].tobytes())
+            elif ctype == _CHUNK_BIN and not self.bin_length:
+                self.bin_offset, self.bin_length = offset + 8, clen
+            offset += 8 + clen
+        if self.gltf is None:
+            raise ValueError(f"{path} has no JSON chunk")
+
+        self.node_names = [n.get("name", f"node_{i}") for i, n in enumerate(self.gltf.get("nodes", []))]
+        self.node_index = {name: i for i, name in enumerate(self.node_names)}
+        self.parent = np.full(len(self.node_names), -1)
+        for i, n in enumerate(self.gltf.get("nodes", [])):
+            self.parent[n.get("children", [])] = i
+        self._channels = None
+
+    # ---------- raw data ----------
+    def buffer_view(self, index):
+        """uint8 view of a buffer view (GLB binary chunk only)."""
+        view = self.gltf["bufferViews"][index]
+        if view.get("buffer", 0) != 0 or "uri" in self.gltf["buffers"][view.get("buffer", 0)]:
+            raise ValueError(f"buffer view {index} is not in the GLB binary chunk")
+        start = self.bin_offset + view.get("byteOffset", 0)
+        return self.data[start:start + view["byteLength"]]
+
+    def accessor(self, index):
+        """Accessor as a read-only (count, width) view into the file (a copy only for sparse accessors)."""
+        acc = self.gltf["accessors"][index]
+        dtype = np.dtype(_COMPONENTS[acc["componentType"]])
+        width = _WIDTH[acc["type"]]
+        count = acc["count"]
+        if "bufferView" in acc:
+            raw = self.buffer_view(acc["bufferView"])
+            stride = self.gltf["bufferViews"][acc["bufferView"]].get("byteStride") or dtype.itemsize * width
+            out = np.ndarray((count, width), dtype=dtype, buffer=raw, offset=acc.get("byteOffset", 0),
+                             strides=(stride, dtype.itemsize))
+        else:
+            out = np.zeros((count, width), dtype=dtype)
+        if "sparse" in acc:
+            sp = acc["sparse"]
+            idx_dtype = np.dtype(_COMPONENTS[sp["indices"]["componentType"]])
+            idx = np.frombuffer(self.buffer_view(sp["indices"]["bufferView"]), dtype=idx_dtype,
+                                count=sp["count"], offset=sp["indices"].get("byteOffset", 0))
+            vals = np.frombuffer(self.buffer_view(sp["values"]["bufferView"]), dtype=dtype,
+                                 count=sp["count"] * width, offset=sp["values"].get("byteOffset", 0))
+            out = np.array(out)
+            out[idx] = vals.reshape(-1, width)
+        return out
+
+    # ---------- scene ----------
+    def mesh_refs(self):
+        """{node name: mesh name} for every node that instances a mesh."""
+        meshes = self.gltf.get("meshes", [])
+        return {self.node_names[i]: meshes[n["mesh"]].get("name", f"mesh_{n['mesh']}")
+                for i, n in enumerate(self.gltf.get("nodes", [])) if "mesh" in n}
+
+    def channels(self):
+        """Animation channels as dicts: animation, node, path, interpolation, input / output views."""
+        if self._channels is None:
+            self._channels = []
+            for anim in self.gltf.get("animations", []):
+                for ch in anim["channels"]:
+                    if "node" not in ch["target"]:
+                        continue
+                    smp = anim["samplers"][ch["sampler"]]
+                    self._channels.append({
+                        "animation": anim.get("name", ""),
+                        "node": ch["target"]["node"],
+                        "path": ch["target"]["path"],
+                        "interpolation": smp.get("interpolation", "LINEAR"),
+                        "input_accessor": smp["input"],
+                        "input": self.accessor(smp["input"])[:, 0],
+                        "output": self.accessor(smp["output"]),
+                    })
+        return self._channels
+
+    def key_times(self):
+        """Sorted union of all animation key times."""
+        inputs = {ch["input_accessor"]: ch["input"] for ch in self.channels()}
+        if not inputs:
+            return np.zeros(1)
+        return np.unique(np.concatenate([np.asarray(t, dtype=np.float64) for t in inputs.values()]))
+
+    # ---------- poses ----------
+    def local_trs(self, nodes, times):
+        """{path: (T, N, 3|4)} translation / rotation / scale of nodes at times."""
+        nodes = np.asarray(nodes, dtype=np.int64)
+        times = np.asarray(times, dtype=np.float64)
+        col = {n: k for k, n in enumerate(nodes.tolist())}
+        out = {}
+        for path, default in _DEFAULTS.items():
+            rest = np.array([self.gltf["nodes"][n].get(path, default) for n in nodes], dtype=np.float64)
+            out[path] = np.broadcast_to(rest, (len(times),) + rest.shape).copy()
+
+        groups = {}
+        for ch in self.channels():
+            if ch["node"] in col and ch["path"] in out:
+                key = (ch["input_accessor"], ch["path"], ch["interpolation"])
+                groups.setdefault(key, []).append(ch)
+        for (_, path, interp), chans in groups.items():
+            t_keys = np.asarray(chans[0]["input"], dtype=np.float64)
+            vals = np.stack([np.asarray(ch["output"], dtype=np.float64) for ch in chans], axis=1)
+            if interp == "CUBICSPLINE":
+                vals = vals.reshape(len(t_keys), 3, len(chans), -1)[:, 1]
+            out[path][:, [col[ch["node"]] for ch in chans]] = _sample(t_keys, vals, times, interp,
+                                                                       rotation=path == "rotation")
+        return out
+
+    def world_matrices(self, names=None, times=None, prefix=""):
+        """
+        (names, (T, N, 4, 4)) world matrices in glTF coordinates. names
+        defaults to every node starting with prefix (sorted); times defaults
+        to key_times().
+        """
+        if names is None:
+            names = sorted(n for n in self.node_names if n.startswith(prefix))
+        times = self.key_times() if times is None else np.asarray(times, dtype=np.float64)
+        wanted = [self.node_index[n] for n in names]
+
+        needed, stack = set(), list(wanted)
+        while stack:
+            n = stack.pop()
+            if n >= 0 and n not in needed:
+                needed.add(n)
+                stack.append(int(self.parent[n]))
+        order = sorted(needed, key=self._depth)
+        local = self._local_matrices(order, times)
+
+        world = {}
+        for k, n in enumerate(order):
+            p = int(self.parent[n])
+            world[n] = local[:, k] if p < 0 else world[p] @ local[:, k]
+        if not wanted:
+            return names, np.zeros((len(times), 0, 4, 4))
+        return names, np.stack([world[n] for n in wanted], axis=1)
+
+    def _depth(self, n):
+        d = 0
+        while self.parent[n] >= 0:
+            n, d = self.parent[n], d + 1
+        return d
+
+    def _local_matrices(self, nodes, times):
+        trs = self.local_trs(nodes, times)
+        M = np.zeros((len(times), len(nodes), 4, 4))
+        M[..., :3, :3] = quat_to_matrix(trs["rotation"]) * trs["scale"][..., None, :]
+        M[..., :3, 3] = trs["translation"]
+        M[..., 3, 3] = 1.0
+        for k, n in enumerate(nodes):
+            if "matrix" in self.gltf["nodes"][n]:
+                M[:, k] = np.asarray(self.gltf["nodes"][n]["matrix"], dtype=np.float64).reshape(4, 4).T
+        return M
+
+
+def _sample(t_keys, vals, times, interp, rotation=False):
+    """Sample (K, C, W) key values at times -> (T, C, W)."""
+    if len(t_keys) == 1:
+        return np.broadcast_to(vals[0], (len(times),) + vals.shape[1:])
+    i = np.clip(np.searchsorted(t_keys, times, side="right") - 1, 0, len(t_keys) - 2)
+    if interp == "STEP":
+        i = np.where(times >= t_keys[-1], len(t_keys) - 1, i)
+        return vals[i]
+    f = np.clip((times - t_keys[i]) / (t_keys[i + 1] - t_keys[i]), 0.0, 1.0)[:, None, None]
+    a, b = vals[i], vals[i + 1]
+    if rotation:
+        b = np.where((a * b).sum(axis=-1, keepdims=True) < 0.0, -b, b)
+        v = a + f * (b - a)
+        return v / np.linalg.norm(v, axis=-1, keepdims=True)
+    return a + f * (b - a)
+
+
+def quat_to_matrix(q):
+    """glTF quaternions (..., 4) as (x, y, z, w) -> rotation matrices (..., 3, 3)."""
+    q = q / np.linalg.norm(q, axis=-1, keepdims=True)
+    x, y, z, w = np.moveaxis(q, -1, 0)
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)], axis=-1),
+        np.stack([2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)], axis=-1),
+        np.stack([2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)], axis=-1),
+    ], axis=-2)
+
+
+def to_blender(M):
+    """glTF (Y up) world matrices (..., 4, 4) -> Blender (Z up)."""
+    C = np.eye(4)
+    C[:3, :3] = GLTF_TO_BLENDER
+    return C @ M @ C.T
+
+
+def diff_poses(a, b, names=None, times=None, prefix=""):
+    """
+    Per-object pose difference of two Glb files over time. Returns
+    (rows, only_a, only_b); rows are (name, max translation error,
+    max rotation error in degrees, time of the larger one), worst first.
+    """
+    in_a = {n for n in a.node_names if n.startswith(prefix)}
+    in_b = {n for n in b.node_names if n.startswith(prefix)}
+    names = sorted(in_a & in_b) if names is None else list(names)
+    times = np.union1d(a.key_times(), b.key_times()) if times is None else np.asarray(times)
+    _, Ma = a.world_matrices(names, times)
+    _, Mb = b.world_matrices(names, times)
+
+    dt = np.linalg.norm(Ma[..., :3, 3] - Mb[..., :3, 3], axis=-1)
+    Ra = Ma[..., :3, :3] / np.linalg.norm(Ma[..., :3, :3], axis=-2, keepdims=True)
+    Rb = Mb[..., :3, :3] / np.linalg.norm(Mb[..., :3, :3], axis=-2, keepdims=True)
+    chord = np.linalg.norm(Ra - Rb, axis=(-2, -1)) / (2.0 * np.sqrt(2.0))   # = sin(angle / 2)
+    dr = np.degrees(2.0 * np.arcsin(np.clip(chord, 0.0, 1.0)))
+
+    rows = []
+    for k, name in enumerate(names):
+        it, ir = int(dt[:, k].argmax()), int(dr[:, k].argmax())
+        worst = it if dt[it, k] / TRANSLATION_TOL >= dr[ir, k] / ROTATION_TOL_DEG else ir
+        rows.append((name, float(dt[it, k]), float(dr[ir, k]), float(times[worst])))
+    rows.sort(key=lambda r: max(r[1] / TRANSLATION_TOL, r[2] / ROTATION_TOL_DEG), reverse=True)
+    return rows, sorted(in_a - in_b), sorted(in_b - in_a)
+
+
+def main():
+    t0 = time.perf_counter()
+    glb = Glb(GLB_PATH)
+    t_open = time.perf_counter() - t0
+    chans = glb.channels()
+    t_chan = time.perf_counter() - t0 - t_open
+    t0 = time.perf_counter()
+    names, M = glb.world_matrices(prefix=NODE_PREFIX)
+    t_pose = time.perf_counter() - t0
+
+    times = glb.key_times()
+    print(f"{os.path.relpath(GLB_PATH, REPO)}: {os.path.getsize(GLB_PATH) / 1e6:.1f} MB, "
+          f"{len(glb.node_names)} nodes, {len(glb.mesh_refs())} mesh instances, "
+          f"{len(glb.gltf.get('animations', []))} animations / {len(chans)} channels, "
+          f"{len(times)} keys ({times[0]:.3f}-{times[-1]:.3f} s)")
+    print(f"open + JSON {1e3 * t_open:.1f} ms, channel views {1e3 * t_chan:.1f} ms, "
+          f"world poses of {len(names)} nodes x {len(times)} keys {1e3 * t_pose:.1f} ms")
+
+    if not COMPARE_PATH:
+        return
+    other = Glb(COMPARE_PATH)
+    t0 = time.perf_counter()
+    rows, only_a, only_b = diff_poses(glb, other, prefix=NODE_PREFIX)
+    t_diff = time.perf_counter() - t0
+    bad = [r for r in rows if r[1] > TRANSLATION_TOL or r[2] > ROTATION_TOL_DEG]
+    print(f"\nDiff against {COMPARE_PATH}: {len(rows)} common objects in {1e3 * t_diff:.1f} ms, "
+          f"{len(bad)} outside tolerance ({TRANSLATION_TOL:g} units, {ROTATION_TOL_DEG:g}°)")
+    if only_a or only_b:
+        print(f"only in {os.path.basename(GLB_PATH)}: {len(only_a)}, "
+              f"only in {os.path.basename(COMPARE_PATH)}: {len(only_b)}")
+    print(f"\n{'object':<24} {'max dT':>10} {'max dR °':>10} {'at s':>7}")
+    for name, d_t, d_r, t in rows[:TOP_N]:
+        print(f"{name:<24} {d_t:10.4g} {d_r:10.4g} {t:7.3f}")
+
+
+if __name__ == "__main__":
+    main()
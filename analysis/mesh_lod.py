@@ -0,0 +1,650 @@
+"""
+Level-of-detail meshes and vertex-cache ordering for the viewer GLB
+
+WHAT THIS SCRIPT DOES
+---------------------
+prototype_moving_parts.glb instances the full-resolution master meshes
+(Link_A, Link_B, CamPin, CamFollower, Wing) hundreds of times. For every
+master part this script
+
+1. loads the mesh (the GLB master mesh, or parts/*.stl if the GLB lacks it),
+2. builds LOD levels at LOD_RATIOS of the triangle count by quadric error
+   edge collapse (Garland / Heckbert quadrics, optimal collapse position),
+3. re-derives normals with a crease angle (hard edges stay hard),
+4. orders the triangles for the post-transform vertex cache (Tipsify,
+   Sander et al. 2007) and the vertices by first use (fetch locality),
+5. writes OUTPUT_GLB: the input file with optimized LOD0 index buffers and,
+   for every instance, MSFT_lod alternatives plus MSFT_screencoverage
+   thresholds. Viewers without MSFT_lod render LOD0 as before. The binary
+   chunk is rebuilt from the buffer views still referenced, so the replaced
+   master meshes are not carried along.
+
+This is a post-process, not part of the bake: create_moving_parts.py exports
+prototype_moving_parts.glb without LODs, and this script writes the separate
+prototype_moving_parts_lod.glb next to it (git-ignored, like the bake). Re-run
+it after every bake that should reach the viewer with LODs.
+
+Animated instance nodes keep their transforms and animation; their mesh is
+moved to a "LOD0:<name>" child that carries the MSFT_lod extension, the lower
+levels are "LOD<k>:<name>" nodes listed only in that extension.
+
+DECIMATION
+----------
+Decimation works on the welded mesh (coincident vertices merged, duplicate
+and degenerate triangles dropped). Collapses are done in parallel passes over
+independent edge sets: an edge is taken when it is the cheapest candidate
+within the faces around both of its endpoints, repeated over a few rounds
+with the faces of taken edges excluded, so no face is touched by two
+collapses. A
+collapse is rejected when it breaks the link condition (would create a
+non-manifold edge) or flips a face (normal turns by more than
+MAX_FLIP_DEG). Open boundaries get extra perpendicular quadrics.
+
+HOW TO USE
+----------
+    python analysis/mesh_lod.py
+
+Prints per part and LOD the triangle / vertex counts and the average cache
+miss ratio (ACMR, FIFO of CACHE_SIZE) before and after reordering, and the
+per-frame triangle totals over all instances.
+"""
+
+import copy
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+import glb_reader as gr
+from blade_immersion import read_stl
+
+# =========================
+# SETTINGS
+# =========================
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GLB_PATH = os.path.join(REPO, "models", "prototype", "prototype_moving_parts.glb")
+OUTPUT_GLB = os.path.join(REPO, "models", "prototype", "prototype_moving_parts_lod.glb")
+
+MASTER_PARTS = {                # master mesh base name -> fallback STL
+    "Link_A": os.path.join(REPO, "parts", "link_tread", "link_tread.stl"),
+    "Link_B": os.path.join(REPO, "parts", "link_tread_connector", "link_tread_connector.stl"),
+    "CamPin": os.path.join(REPO, "parts", "cam_pin", "cam_pin.stl"),
+    "CamFollower": os.path.join(REPO, "parts", "cam_follower", "cam_follower.stl"),
+    "Wing": os.path.join(REPO, "parts", "blade", "blade.stl"),
+}
+
+LOD_RATIOS = (0.5, 0.2, 0.06)           # triangle fraction of LOD1, LOD2, ...
+SCREEN_COVERAGE = (0.2, 0.06, 0.015, 0.0)  # MSFT_screencoverage per level (LOD0 first)
+MIN_TRIANGLES = 12
+
+WELD_TOL_MM = 1e-4
+CREASE_DEG = 35.0
+MAX_FLIP_DEG = 60.0
+SLIVER_FRAC = 1e-3              # faces below this share of the median area are not flip-tested
+BOUNDARY_WEIGHT = 100.0
+PASS_FRACTION = 0.25                    # max share of edges considered per collapse pass
+CACHE_SIZE = 16
+# =========================
+
+
+# ---------- mesh sources ----------
+def base_name(name):
+    """Blender duplicate suffix removed: 'Link_A.003' -> 'Link_A'."""
+    head, dot, tail = name.rpartition(".")
+    return head if dot and tail.isdigit() else name
+
+
+def master_meshes(glb):
+    """{part: mesh index} of the MASTER_PARTS meshes present in the GLB."""
+    out = {}
+    for i, mesh in enumerate(glb.gltf.get("meshes", [])):
+        part = base_name(mesh.get("name", ""))
+        if part in MASTER_PARTS and part not in out:
+            out[part] = i
+    return out
+
+
+def glb_mesh(glb, mesh_index):
+    """(positions, normals, indices) of all primitives of a mesh, glTF coordinates."""
+    pos, nrm, idx, off = [], [], [], 0
+    for prim in glb.gltf["meshes"][mesh_index]["primitives"]:
+        p = glb.accessor(prim["attributes"]["POSITION"]).astype(np.float64)
+        n = glb.accessor(prim["attributes"]["NORMAL"]).astype(np.float64) if "NORMAL" in prim["attributes"] \
+            else np.zeros_like(p)
+        i = glb.accessor(prim["indices"]).ravel().astype(np.int64) if "indices" in prim else np.arange(len(p))
+        pos.append(p)
+        nrm.append(n)
+        idx.append(i.reshape(-1, 3) + off)
+        off += len(p)
+    return np.concatenate(pos), np.concatenate(nrm), np.concatenate(idx)
+
+
+def weld(tris, tol=WELD_TOL_MM):
+    """
+    (T, 3, 3) triangle soup -> (positions, faces) with coincident corners
+    merged and degenerate or duplicated triangles dropped.
+    """
+    flat = tris.reshape(-1, 3)
+    _, first, inverse = np.unique(np.round(flat / tol).astype(np.int64), axis=0,
+                                  return_index=True, return_inverse=True)
+    faces = inverse.reshape(-1, 3)
+    keep = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])
+    faces = faces[keep]
+    _, once = np.unique(np.sort(faces, axis=1), axis=0, return_index=True)
+    return flat[first], faces[np.sort(once)]
+
+
+def compact(P, F):
+    used, F = np.unique(F, return_inverse=True)
+    return P[used], F.reshape(-1, 3)
+
+
+# ---------- quadric decimation ----------
+def face_planes(P, F):
+    n = np.cross(P[F[:, 1]] - P[F[:, 0]], P[F[:, 2]] - P[F[:, 0]])
+    area2 = np.linalg.norm(n, axis=1)
+    n = n / np.maximum(area2, 1e-30)[:, None]
+    return n, area2
+
+
+def vertex_quadrics(P, F, boundary_weight=BOUNDARY_WEIGHT):
+    """(V, 4, 4) area-weighted plane quadrics, plus boundary constraint planes."""
+    n, area2 = face_planes(P, F)
+    plane = np.concatenate([n, -(n * P[F[:, 0]]).sum(axis=1, keepdims=True)], axis=1)
+    K = 0.5 * area2[:, None, None] * plane[:, :, None] * plane[:, None, :]
+    Q = np.zeros((len(P), 4, 4))
+    for k in range(3):
+        np.add.at(Q, F[:, k], K)
+
+    e = np.sort(np.concatenate([F[:, [0, 1]], F[:, [1, 2]], F[:, [2, 0]]]), axis=1)
+    fidx = np.tile(np.arange(len(F)), 3)
+    _, inv, cnt = np.unique(e[:, 0] * len(P) + e[:, 1], return_inverse=True, return_counts=True)
+    b = cnt[inv] == 1
+    if b.any():
+        a, c = P[e[b, 0]], P[e[b, 1]]
+        d = c - a
+        m = np.cross(d, n[fidx[b]])
+        m /= np.maximum(np.linalg.norm(m, axis=1, keepdims=True), 1e-30)
+        bp = np.concatenate([m, -(m * a).sum(axis=1, keepdims=True)], axis=1)
+        w = boundary_weight * (d ** 2).sum(axis=1)
+        Kb = w[:, None, None] * bp[:, :, None] * bp[:, None, :]
+        np.add.at(Q, e[b, 0], Kb)
+        np.add.at(Q, e[b, 1], Kb)
+    return Q
+
+
+def edge_table(F):
+    """Unique edges (E, 2) and the number of faces on each."""
+    e = np.sort(np.concatenate([F[:, [0, 1]], F[:, [1, 2]], F[:, [2, 0]]]), axis=1)
+    n = int(F.max()) + 1
+    key, cnt = np.unique(e[:, 0] * n + e[:, 1], return_counts=True)
+    return np.stack([key // n, key % n], axis=1), cnt
+
+
+def collapse_targets(P, Q, E):
+    """Optimal position and quadric cost of collapsing every edge."""
+    Qe = Q[E[:, 0]] + Q[E[:, 1]]
+    A, b = Qe[:, :3, :3], -Qe[:, :3, 3]
+    pa, pb = P[E[:, 0]], P[E[:, 1]]
+    mid = 0.5 * (pa + pb)
+    length = np.linalg.norm(pb - pa, axis=1)
+
+    cands = [pa, pb, mid]
+    det = np.abs(np.linalg.det(A))
+    scale = np.abs(A).max(axis=(1, 2)) ** 3 + 1e-30
+    ok = det > 1e-10 * scale
+    if ok.any():
+        x = mid.copy()
+        x[ok] = np.linalg.solve(A[ok], b[ok][..., None])[..., 0]
+        near = ok & (np.linalg.norm(x - mid, axis=1) <= length)
+        cands.append(np.where(near[:, None], x, mid))
+
+    best, cost = None, None
+    for c in cands:
+        h = np.concatenate([c, np.ones((len(c), 1))], axis=1)
+        q = np.einsum("ei,eij,ej->e", h, Qe, h)
+        if best is None:
+            best, cost = c.copy(), q
+        else:
+            better = q < cost
+            best[better], cost[better] = c[better], q[better]
+    return best, np.maximum(cost, 0.0)
+
+
+def independent_edges(F, E, rank, n_vertices, rounds=16):
+    """
+    Edges no two of which touch a common face, favouring low rank: in each
+    round an edge is taken when its rank is the minimum over the faces around
+    both endpoints, then everything touching the taken edges' faces drops out.
+    """
+    inf = np.iinfo(np.int64).max
+    rank = rank.copy()
+    sel = np.zeros(len(E), dtype=bool)
+    for _ in range(rounds):
+        live = rank < inf
+        if not live.any():
+            break
+        vmin = np.full(n_vertices, inf)
+        np.minimum.at(vmin, E[live, 0], rank[live])
+        np.minimum.at(vmin, E[live, 1], rank[live])
+        fmin = vmin[F].min(axis=1)
+        ring = np.full(n_vertices, inf)
+        for k in range(3):
+            np.minimum.at(ring, F[:, k], fmin)
+        new = live & (rank == ring[E[:, 0]]) & (rank == ring[E[:, 1]])
+        if not new.any():
+            break
+        sel |= new
+        touched = np.zeros(n_vertices, dtype=bool)
+        touched[E[new].ravel()] = True
+        blocked = np.zeros(n_vertices, dtype=bool)
+        blocked[F[touched[F].any(axis=1)].ravel()] = True
+        rank[blocked[E[:, 0]] | blocked[E[:, 1]]] = inf
+    return sel
+
+
+def link_condition(E, faces_on_edge, idx):
+    """Which candidate edges idx keep the mesh manifold (common neighbours = opposite vertices)."""
+    a, b = E[idx, 0], E[idx, 1]
+    nb = np.concatenate([E, E[:, ::-1]])
+    nb = nb[np.argsort(nb[:, 0], kind="stable")]
+    start = np.searchsorted(nb[:, 0], np.arange(nb[:, 0].max() + 2))
+    base = nb.max() + 1
+
+    def neighbours(v):
+        cnt = start[v + 1] - start[v]
+        owner = np.repeat(np.arange(len(v)), cnt)
+        pos = np.repeat(start[v] - np.cumsum(np.r_[0, cnt[:-1]]), cnt) + np.arange(cnt.sum())
+        return owner * base + nb[pos, 1]
+
+    uniq, cnt = np.unique(np.concatenate([neighbours(a), neighbours(b)]), return_counts=True)
+    common = np.bincount(uniq[cnt == 2] // base, minlength=len(idx))
+    return (common == faces_on_edge[idx]) & (faces_on_edge[idx] <= 2)
+
+
+def try_collapses(P, F, E, options, sel, cos_flip):
+    """
+    Apply the selected (independent) collapses that flip no face, trying the
+    collapse positions in options in turn. Returns (P, F, applied, rejected).
+    """
+    choice = np.zeros(len(E), dtype=np.int64)
+    sliver = SLIVER_FRAC * np.median(face_planes(P, F)[1])
+    edge_of = np.full(len(P), -1)
+    rejected = np.zeros(len(E), dtype=bool)
+    while True:
+        idx = np.nonzero(sel)[0]
+        edge_of[:] = -1
+        edge_of[E[idx, 0]] = idx
+        edge_of[E[idx, 1]] = idx
+        newp = P.copy()
+        newp[E[idx, 0]] = options[choice[idx], idx]
+        newp[E[idx, 1]] = options[choice[idx], idx]
+        remap = np.arange(len(P))
+        remap[E[idx, 1]] = E[idx, 0]
+        F2 = remap[F]
+        dead = (F2[:, 0] == F2[:, 1]) | (F2[:, 1] == F2[:, 2]) | (F2[:, 0] == F2[:, 2])
+        moved = (edge_of[F] >= 0).any(axis=1) & ~dead
+        n_old, a_old = face_planes(P, F[moved])
+        n_new, a_new = face_planes(newp, F2[moved])
+        bad = (a_old > sliver) & (((n_old * n_new).sum(axis=1) < cos_flip) | (a_new < SLIVER_FRAC * a_old))
+        if not bad.any():
+            return newp, F2[~dead], idx, rejected
+        veto = edge_of[F[moved][bad]]
+        veto = np.unique(veto[veto >= 0])
+        choice[veto] += 1
+        out = veto[choice[veto] >= len(options)]
+        sel[out] = False
+        rejected[out] = True
+        choice[veto] = np.minimum(choice[veto], len(options) - 1)
+
+
+def decimate(P, F, target, max_passes=500):
+    """Quadric edge collapse of (P, F) down to about target faces."""
+    P, F = P.copy(), F.copy()
+    Q = vertex_quadrics(P, F)
+    cos_flip = np.cos(np.radians(MAX_FLIP_DEG))
+    for _ in range(max_passes):
+        if len(F) <= target:
+            break
+        E, nface = edge_table(F)
+        x, cost = collapse_targets(P, Q, E)
+        # optimal position first, then either endpoint, before giving up on an edge
+        options = np.stack([x, P[E[:, 0]], P[E[:, 1]]])
+        order = np.argsort(cost, kind="stable")
+        order = order[link_condition(E, nface, order)]
+        quota = max(1, min(int(PASS_FRACTION * len(E)), (len(F) - target) // 2 + 1))
+        excluded = np.zeros(len(E), dtype=bool)
+        while True:
+            cand = order[~excluded[order]][:quota]
+            rank = np.full(len(E), np.iinfo(np.int64).max)
+            rank[cand] = np.arange(len(cand))
+            sel = independent_edges(F, E, rank, len(P))
+            newp, F2, idx, rejected = try_collapses(P, F, E, options, sel, cos_flip)
+            if len(idx) or not len(cand):
+                break
+            excluded |= rejected
+        if not len(idx):
+            break
+        Q[E[idx, 0]] += Q[E[idx, 1]]
+        P, F = newp, F2
+    return compact(P, F)
+
+
+# ---------- normals ----------
+def crease_normals(P, F, crease_deg=CREASE_DEG):
+    """Split vertices at creases. Returns (positions, normals, faces)."""
+    fn = np.cross(P[F[:, 1]] - P[F[:, 0]], P[F[:, 2]] - P[F[:, 0]])
+    fu = fn / np.maximum(np.linalg.norm(fn, axis=1, keepdims=True), 1e-30)
+    cv = F.ravel()
+    cf = np.repeat(np.arange(len(F)), 3)
+    order = np.argsort(cv, kind="stable")
+    cv_s, cf_s = cv[order], cf[order]
+    start = np.searchsorted(cv_s, cv_s, side="left")
+    size = np.searchsorted(cv_s, cv_s, side="right") - start
+    i = np.repeat(np.arange(len(cv_s)), size)
+    j = np.repeat(start - np.cumsum(np.r_[0, size[:-1]]), size) + np.arange(size.sum())
+    smooth = (fu[cf_s[i]] * fu[cf_s[j]]).sum(axis=1) >= np.cos(np.radians(crease_deg))
+    corner_n = np.zeros((len(cv_s), 3))
+    np.add.at(corner_n, i[smooth], fn[cf_s[j[smooth]]])
+    corner_n /= np.maximum(np.linalg.norm(corner_n, axis=1, keepdims=True), 1e-30)
+
+    normals = np.empty_like(corner_n)
+    normals[order] = corner_n
+    key = np.concatenate([cv[:, None], np.round(normals * 1e4).astype(np.int64)], axis=1)
+    _, first, inverse = np.unique(key, axis=0, return_index=True, return_inverse=True)
+    return P[cv[first]], normals[first], inverse.reshape(-1, 3)
+
+
+# ---------- vertex cache ----------
+def tipsify(F, n_vertices, cache=CACHE_SIZE):
+    """Triangle order for a FIFO vertex cache (Sander, Nehab, Barczak 2007)."""
+    tris = F.tolist()
+    order = np.argsort(F.ravel(), kind="stable")
+    start = np.searchsorted(F.ravel()[order], np.arange(n_vertices + 1))
+    adj_flat = (order // 3).tolist()
+    start = start.tolist()
+    live = np.bincount(F.ravel(), minlength=n_vertices).tolist()
+    stamp = [0] * n_vertices
+    emitted = [False] * len(tris)
+    dead_end = []
+    out = []
+    s, cursor, f = cache + 1, 0, 0
+    while f >= 0:
+        ring = []
+        for t in adj_flat[start[f]:start[f + 1]]:
+            if emitted[t]:
+                continue
+            emitted[t] = True
+            out.append(t)
+            for v in tris[t]:
+                dead_end.append(v)
+                ring.append(v)
+                live[v] -= 1
+                if s - stamp[v] > cache:
+                    stamp[v] = s
+                    s += 1
+        best, f = -1, -1
+        for v in ring:
+            if live[v] > 0:
+                p = s - stamp[v] if s - stamp[v] + 2 * live[v] <= cache else 0
+                if p > best:
+                    best, f = p, v
+        if f < 0:
+            while dead_end:
+                d = dead_end.pop()
+                if live[d] > 0:
+                    f = d
+                    break
+        if f < 0:
+            while cursor < n_vertices:
+                if live[cursor] > 0:
+                    f = cursor
+                    break
+                cursor += 1
+    return F[np.asarray(out, dtype=np.int64)]
+
+
+def fetch_order(F, n_vertices):
+    """Renumber vertices by first use. Returns (old index per new vertex, new faces)."""
+    first = np.full(n_vertices, len(F) * 3)
+    flat = F.ravel()
+    np.minimum.at(first, flat, np.arange(len(flat)))
+    old = np.argsort(first, kind="stable")[:len(np.unique(flat))]
+    new = np.empty(n_vertices, dtype=np.int64)
+    new[old] = np.arange(len(old))
+    return old, new[F]
+
+
+def acmr(F, cache=CACHE_SIZE):
+    """Average cache misses per triangle for a FIFO cache."""
+    fifo, inside, misses = [], set(), 0
+    for v in F.ravel().tolist():
+        if v in inside:
+            continue
+        misses += 1
+        fifo.append(v)
+        inside.add(v)
+        if len(fifo) > cache:
+            inside.discard(fifo.pop(0))
+    return misses / max(len(F), 1)
+
+
+def optimize(P, N, F):
+    """Cache-ordered faces and fetch-ordered vertices. Returns (P, N, F)."""
+    F = tipsify(F, len(P))
+    old, F = fetch_order(F, len(P))
+    return P[old], N[old], F
+
+
+# ---------- GLB writing ----------
+class GlbWriter:
+    """
+    Appends buffer views / accessors to a copy of an existing GLB; write()
+    drops the ones left unreferenced.
+    """
+
+    def __init__(self, glb):
+        self.gltf = copy.deepcopy(glb.gltf)
+        self.blob = bytearray(glb.data[glb.bin_offset:glb.bin_offset + glb.bin_length].tobytes())
+        self.gltf.setdefault("bufferViews", [])
+        self.gltf.setdefault("accessors", [])
+
+    def _view(self, data, target):
+        while len(self.blob) % 4:
+            self.blob.append(0)
+        self.gltf["bufferViews"].append({"buffer": 0, "byteOffset": len(self.blob),
+                                         "byteLength": len(data), "target": target})
+        self.blob += data
+        return len(self.gltf["bufferViews"]) - 1
+
+    def vec3(self, a):
+        a = np.ascontiguousarray(a, dtype=np.float32)
+        view = self._view(a.tobytes(), 34962)
+        self.gltf["accessors"].append({"bufferView": view, "componentType": 5126, "count": len(a),
+                                       "type": "VEC3", "min": a.min(axis=0).tolist(),
+                                       "max": a.max(axis=0).tolist()})
+        return len(self.gltf["accessors"]) - 1
+
+    def indices(self, F, n_vertices):
+        dtype, ctype = (np.uint16, 5123) if n_vertices < 65536 else (np.uint32, 5125)
+        a = np.ascontiguousarray(F.ravel(), dtype=dtype)
+        view = self._view(a.tobytes(), 34963)
+        self.gltf["accessors"].append({"bufferView": view, "componentType": ctype, "count": len(a),
+                                       "type": "SCALAR"})
+        return len(self.gltf["accessors"]) - 1
+
+    def primitive(self, P, N, F, template=None):
+        prim = {k: v for k, v in (template or {}).items() if k in ("material", "mode", "extras")}
+        prim["attributes"] = {"POSITION": self.vec3(P), "NORMAL": self.vec3(N)}
+        prim["indices"] = self.indices(F, len(P))
+        return prim
+
+    def compact(self):
+        """Drop accessors and buffer views nothing refers to and repack the binary chunk."""
+        gltf = self.gltf
+        used_acc = set()
+        for mesh in gltf.get("meshes", []):
+            for prim in mesh["primitives"]:
+                used_acc.update(prim["attributes"].values())
+                used_acc.update(a for t in prim.get("targets", []) for a in t.values())
+                if "indices" in prim:
+                    used_acc.add(prim["indices"])
+        used_acc.update(s["inverseBindMatrices"] for s in gltf.get("skins", []) if "inverseBindMatrices" in s)
+        for anim in gltf.get("animations", []):
+            for smp in anim["samplers"]:
+                used_acc.update((smp["input"], smp["output"]))
+        acc_map = {old: new for new, old in enumerate(sorted(used_acc))}
+
+        accessors = [gltf["accessors"][i] for i in sorted(used_acc)]
+        view_refs = [a for a in accessors if "bufferView" in a]
+        for a in accessors:
+            sparse = a.get("sparse", {})
+            view_refs += [sparse[k] for k in ("indices", "values") if k in sparse]
+        view_refs += [im for im in gltf.get("images", []) if "bufferView" in im]
+        view_map = {old: new for new, old in enumerate(sorted({r["bufferView"] for r in view_refs}))}
+
+        blob, views = bytearray(), []
+        for old in sorted(view_map):
+            view = dict(gltf["bufferViews"][old])
+            while len(blob) % 4:
+                blob.append(0)
+            start = view.get("byteOffset", 0)
+            data = self.blob[start:start + view["byteLength"]]
+            view["byteOffset"] = len(blob)
+            blob += data
+            views.append(view)
+        for r in view_refs:
+            r["bufferView"] = view_map[r["bufferView"]]
+
+        for mesh in gltf.get("meshes", []):
+            for prim in mesh["primitives"]:
+                prim["attributes"] = {k: acc_map[a] for k, a in prim["attributes"].items()}
+                if "targets" in prim:
+                    prim["targets"] = [{k: acc_map[a] for k, a in t.items()} for t in prim["targets"]]
+                if "indices" in prim:
+                    prim["indices"] = acc_map[prim["indices"]]
+        for skin in gltf.get("skins", []):
+            if "inverseBindMatrices" in skin:
+                skin["inverseBindMatrices"] = acc_map[skin["inverseBindMatrices"]]
+        for anim in gltf.get("animations", []):
+            for smp in anim["samplers"]:
+                smp["input"], smp["output"] = acc_map[smp["input"]], acc_map[smp["output"]]
+        gltf["accessors"], gltf["bufferViews"], self.blob = accessors, views, blob
+
+    def write(self, path):
+        self.compact()
+        while len(self.blob) % 4:
+            self.blob.append(0)
+        self.gltf["buffers"] = [{"byteLength": len(self.blob)}]
+        js = json.dumps(self.gltf, separators=(",", ":")).encode("utf-8")
+        js += b" " * (-len(js) % 4)
+        total = 12 + 8 + len(js) + 8 + len(self.blob)
+        with open(path, "wb") as fh:
+            fh.write(struct.pack("<4sII", b"glTF", 2, total))
+            fh.write(struct.pack("<II", len(js), 0x4E4F534A))
+            fh.write(js)
+            fh.write(struct.pack("<II", len(self.blob), 0x004E4942))
+            fh.write(self.blob)
+
+
+def add_lods(writer, mesh_index, lods, coverage=SCREEN_COVERAGE):
+    """Replace the master mesh with LOD0 and give every instance MSFT_lod alternatives."""
+    gltf = writer.gltf
+    name = gltf["meshes"][mesh_index].get("name", f"mesh_{mesh_index}")
+    template = gltf["meshes"][mesh_index]["primitives"][0]
+    gltf["meshes"][mesh_index]["primitives"] = [writer.primitive(*lods[0], template)]
+    lod_meshes = []
+    for k, (P, N, F) in enumerate(lods[1:], start=1):
+        gltf["meshes"].append({"name": f"{name}_LOD{k}", "primitives": [writer.primitive(P, N, F, template)]})
+        lod_meshes.append(len(gltf["meshes"]) - 1)
+
+    instances = [i for i, n in enumerate(gltf["nodes"]) if n.get("mesh") == mesh_index]
+    for i in instances:
+        node = gltf["nodes"][i]
+        node_name = node.get("name", f"node_{i}")
+        del node["mesh"]
+        ids = []
+        for k, m in enumerate(lod_meshes, start=1):
+            gltf["nodes"].append({"name": f"LOD{k}:{node_name}", "mesh": m})
+            ids.append(len(gltf["nodes"]) - 1)
+        gltf["nodes"].append({
+            "name": f"LOD0:{node_name}",
+            "mesh": mesh_index,
+            "extensions": {"MSFT_lod": {"ids": ids}},
+            "extras": {"MSFT_screencoverage": list(coverage[:len(ids) + 1])},
+        })
+        node.setdefault("children", []).append(len(gltf["nodes"]) - 1)
+    used = gltf.setdefault("extensionsUsed", [])
+    if "MSFT_lod" not in used:
+        used.append("MSFT_lod")
+    return len(instances)
+
+
+# ---------- pipeline ----------
+def build_lods(P, N, F, ratios=LOD_RATIOS):
+    """
+    [(P, N, F)] for LOD0 (original vertices, reordered) and the decimated
+    levels, plus the ACMR of each level before reordering.
+    """
+    lods, before = [optimize(P, N, F)], [acmr(F)]
+    Pw, Fw = weld(P[F])
+    for r in ratios:
+        target = max(MIN_TRIANGLES, int(round(r * len(F))))
+        Pw, Fw = decimate(Pw, Fw, target)
+        Pl, Nl, Fl = crease_normals(Pw, Fw)
+        before.append(acmr(Fl))
+        lods.append(optimize(Pl, Nl, Fl))
+    return lods, before
+
+
+def part_source(glb, meshes, part):
+    """(P, N, F, source) for a master part, glTF coordinates."""
+    if part in meshes:
+        P, N, F = glb_mesh(glb, meshes[part])
+        return P, N, F, f"glb:{glb.gltf['meshes'][meshes[part]]['name']}"
+    tris = read_stl(MASTER_PARTS[part])
+    if tris is None:
+        return None
+    P, F = weld(tris @ gr.GLTF_TO_BLENDER)            # Blender Z up -> glTF Y up
+    P, N, F = crease_normals(P, F)
+    return P, N, F, os.path.relpath(MASTER_PARTS[part], REPO)
+
+
+def main():
+    glb = gr.Glb(GLB_PATH)
+    meshes = master_meshes(glb)
+    writer = GlbWriter(glb)
+    counts = {i: 0 for i in meshes.values()}
+    for n in glb.gltf.get("nodes", []):
+        if n.get("mesh") in counts:
+            counts[n["mesh"]] += 1
+
+    print(f"{'part':<12} {'LOD':>3} {'tris':>6} {'verts':>6} {'ACMR in':>8} {'ACMR out':>9} {'ms':>6}  source")
+    totals = np.zeros(len(LOD_RATIOS) + 1)
+    for part in MASTER_PARTS:
+        src = part_source(glb, meshes, part)
+        if src is None:
+            print(f"{part:<12} not in the GLB and no usable STL, skipped")
+            continue
+        P, N, F, source = src
+        t0 = time.perf_counter()
+        lods, before = build_lods(P, N, F)
+        dt = 1e3 * (time.perf_counter() - t0)
+        for k, (Pl, Nl, Fl) in enumerate(lods):
+            head = f"{dt:6.0f}  {source}" if k == 0 else ""
+            print(f"{part:<12} {k:3d} {len(Fl):6d} {len(Pl):6d} {before[k]:8.3f} {acmr(Fl):9.3f} {head}")
+        if part in meshes:
+            n_inst = add_lods(writer, meshes[part], lods)
+            totals += n_inst * np.array([len(l[2]) for l in lods])
+
+    writer.write(OUTPUT_GLB)
+    print(f"\ntriangles per frame over all instances, by LOD: "
+          + ", ".join(f"LOD{k} {int(t):,}" for k, t in enumerate(totals)))
+    print(f"wrote {os.path.relpath(OUTPUT_GLB, REPO)} ({os.path.getsize(OUTPUT_GLB) / 1e6:.1f} MB, "
+          f"input {os.path.getsize(GLB_PATH) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
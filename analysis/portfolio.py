@@ -0,0 +1,325 @@
+"""
+Fleet / site portfolio evaluator with a process pool and on-disk cache
+
+WHAT THIS SCRIPT DOES
+---------------------
+Evaluates a whole catalog of candidate river sites in one run:
+
+    flow series → power curve → duration curve → annual energy → ROI
+
+- Each site is evaluated in its own worker process (ProcessPoolExecutor).
+- Per-site intermediate results (power curve, flow duration curve, energy)
+  are memoized on disk under CACHE_DIR, keyed by a hash of exactly the inputs
+  that produced them.
+- The ROI stage (analysis/roi_monte_carlo.py) has its own key, so changing
+  only prices or costs re-uses the cached hydrology, and an unchanged site is
+  not re-run at all.
+
+SITE CATALOG
+------------
+A JSON list of site dicts. Hydrology / unit fields:
+
+    name                 unique site name
+    flow_csv             path (relative to the catalog) to a velocity series,
+                         one m/s value per line (first numeric column is used)
+    flow_series          inline list of m/s values (instead of flow_csv)
+    channel_width_m      usable channel width
+    units                requested number of containerized units
+    unit_width_m         width of one unit across the flow (default UNIT_WIDTH_M)
+    capture_area_m2      capture area of one unit
+    cp                   water-to-wire coefficient (single value)
+    cut_in_m_s           optional, default CUT_IN_M_S
+    rated_kw             optional per-unit generator limit, default RATED_KW
+
+plus the economic distributions used by roi_monte_carlo.py ("availability",
+"price", "cost", "degradation"). "flow" is optional and is a year-to-year
+velocity scale factor around 1.0 (default FLOW_YEAR_FACTOR).
+
+The number of units actually placed is limited so that the units block at
+most MAX_BLOCKAGE of the channel width (docs/environment_and_deployment.md:
+the installation must stay non-blocking).
+
+HOW TO USE
+----------
+    python analysis/portfolio.py [catalog.json] [--results out.csv]
+
+Without a catalog argument, SITE_CATALOG is used, and if that does not exist
+a small synthetic EXAMPLE catalog is evaluated. --results overrides
+RESULTS_CSV. A catalog argument that does not exist is an error.
+
+OUTPUT
+------
+RESULTS_CSV with one row per site (units placed, annual energy, P50/P90
+payback, ...), and a table sorted by P50 payback on stdout.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import roi_monte_carlo as roi
+
+# =========================
+# SETTINGS
+# =========================
+SITE_CATALOG = "sites.json"
+CACHE_DIR = ".portfolio_cache"
+RESULTS_CSV = "portfolio_results.csv"
+
+MAX_WORKERS = None          # None = os.cpu_count()
+
+# Bump when the hydrology or ROI maths change, so old cache entries are ignored
+CACHE_VERSION = 1
+
+UNIT_WIDTH_M = 2.4          # inside width of a standard ISO container
+MAX_BLOCKAGE = 0.5          # max fraction of channel width covered by units
+CUT_IN_M_S = 0.3
+RATED_KW = 5.0
+
+POWER_CURVE_MAX_M_S = 4.0
+POWER_CURVE_BINS = 81
+DURATION_CURVE_POINTS = 101
+
+FLOW_YEAR_FACTOR = ("lognormal", 1.0, 0.08)
+
+PORTFOLIO_DRAWS = 500_000
+
+EXAMPLE_SITES = 6
+# =========================
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def stable_hash(obj) -> str:
+    blob = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:24]
+
+
+def read_flow_csv(path: str) -> np.ndarray:
+    """First numeric column of a CSV file (header and blank lines are skipped)."""
+    vals = []
+    with open(path, newline="") as fh:
+        for row in csv.reader(fh):
+            if not row:
+                continue
+            try:
+                vals.append(float(row[0]))
+            except ValueError:
+                continue
+    if not vals:
+        raise RuntimeError(f"No flow values in {path}")
+    return np.asarray(vals, dtype=np.float64)
+
+
+def hydro_inputs(site, base_dir):
+    """Everything the hydrology stage depends on (used for its cache key)."""
+    out = {
+        "v": CACHE_VERSION,
+        "channel_width_m": float(site["channel_width_m"]),
+        "units": int(site.get("units", 1)),
+        "unit_width_m": float(site.get("unit_width_m", UNIT_WIDTH_M)),
+        "capture_area_m2": float(site["capture_area_m2"]),
+        "cp": float(site.get("cp", 0.2)),
+        "cut_in_m_s": float(site.get("cut_in_m_s", CUT_IN_M_S)),
+        "rated_kw": float(site.get("rated_kw", RATED_KW)),
+    }
+    if "flow_csv" in site:
+        out["flow_csv"] = file_digest(os.path.join(base_dir, site["flow_csv"]))
+    else:
+        out["flow_series"] = stable_hash(site["flow_series"])
+    return out
+
+
+def units_placed(hyd) -> int:
+    max_units = int(math.floor(hyd["channel_width_m"] * MAX_BLOCKAGE / hyd["unit_width_m"]))
+    return max(0, min(hyd["units"], max_units))
+
+
+def unit_power_kw(v, hyd):
+    """Power of one unit at velocity v: cubic up to RATED_KW, zero below cut-in."""
+    p = roi.mean_power_kw(v, hyd["capture_area_m2"], hyd["cp"])
+    p = np.minimum(p, hyd["rated_kw"])
+    return np.where(v >= hyd["cut_in_m_s"], p, 0.0)
+
+
+def hydrology(site, base_dir, hyd):
+    """Power curve, flow duration curve and full-availability annual energy."""
+    if "flow_csv" in site:
+        v = read_flow_csv(os.path.join(base_dir, site["flow_csv"]))
+    else:
+        v = np.asarray(site["flow_series"], dtype=np.float64)
+    v = np.maximum(v, 0.0)
+
+    n_units = units_placed(hyd)
+
+    curve_v = np.linspace(0.0, POWER_CURVE_MAX_M_S, POWER_CURVE_BINS)
+    curve_p = unit_power_kw(curve_v, hyd) * n_units
+
+    exceed = np.linspace(0.0, 100.0, DURATION_CURVE_POINTS)
+    duration_v = np.percentile(v, 100.0 - exceed)
+
+    mean_kw = float(np.mean(unit_power_kw(v, hyd))) * n_units
+    return {
+        "power_curve_v": curve_v,
+        "power_curve_kw": curve_p,
+        "duration_exceedance_pct": exceed,
+        "duration_v": duration_v,
+        "units_placed": np.int64(n_units),
+        "mean_kw": np.float64(mean_kw),
+        "energy_kwh": np.float64(mean_kw * roi.HOURS_PER_YEAR),
+    }
+
+
+def evaluate_site(site, base_dir, cache_dir, n_draws=PORTFOLIO_DRAWS):
+    """Run (or fetch from cache) the full chain for one site. Returns a result dict."""
+    hyd = hydro_inputs(site, base_dir)
+    hyd_key = stable_hash(hyd)
+    econ = {k: site.get(k) for k in ("availability", "price", "cost", "degradation")}
+    econ["flow"] = site.get("flow", FLOW_YEAR_FACTOR)
+    roi_key = stable_hash([hyd_key, econ, site["name"], n_draws])
+
+    os.makedirs(cache_dir, exist_ok=True)
+    hyd_path = os.path.join(cache_dir, f"hydro_{hyd_key}.npz")
+    roi_path = os.path.join(cache_dir, f"roi_{roi_key}.json")
+
+    if os.path.exists(roi_path):
+        with open(roi_path) as fh:
+            res = json.load(fh)
+        res["cached"] = "all"
+        return res
+
+    cached = "hydro"
+    if os.path.exists(hyd_path):
+        with np.load(hyd_path) as z:
+            curves = {k: z[k] for k in z.files}
+    else:
+        cached = "none"
+        curves = hydrology(site, base_dir, hyd)
+        tmp = hyd_path + f".{os.getpid()}.tmp.npz"
+        np.savez(tmp, **curves)
+        os.replace(tmp, hyd_path)
+
+    n_units = int(curves["units_placed"])
+    roi_site = dict(econ)
+    roi_site["name"] = site["name"]
+    roi_site["units"] = max(n_units, 1)
+    roi_site["energy_kwh"] = float(curves["energy_kwh"])
+    mc = roi.evaluate_site(roi_site, n_draws=n_draws)
+
+    res = {
+        "name": site["name"],
+        "units_placed": n_units,
+        "mean_kw": float(curves["mean_kw"]),
+        "energy_kwh": float(curves["energy_kwh"]),
+        "energy_p50_kwh": mc["energy_kwh"]["P50"],
+        "revenue_p50": mc["revenue"]["P50"],
+        "payback_p50": mc["payback_years"]["P50"],
+        "payback_p90": mc["payback_years"]["P90"],
+        "prob_payback_within_lifetime": mc["prob_payback_within_lifetime"],
+        "top_driver": mc["sensitivity"][0][0],
+        "hydro_cache": os.path.basename(hyd_path),
+    }
+    tmp = roi_path + f".{os.getpid()}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(res, fh)
+    os.replace(tmp, roi_path)
+
+    res["cached"] = cached
+    return res
+
+
+def evaluate_portfolio(sites, base_dir=".", cache_dir=CACHE_DIR, max_workers=MAX_WORKERS):
+    """Evaluate all sites on a process pool. Results keep catalog order."""
+    names = [s["name"] for s in sites]
+    if len(set(names)) != len(names):
+        raise RuntimeError("Site names in the catalog must be unique")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(evaluate_site, s, base_dir, cache_dir) for s in sites]
+        return [f.result() for f in futures]
+
+
+def example_catalog(n_sites=EXAMPLE_SITES, seed=7):
+    """Synthetic sites with one year of hourly flow each (seasonal + noise)."""
+    rng = np.random.default_rng(seed)
+    hours = np.arange(int(roi.HOURS_PER_YEAR))
+    season = np.sin(2.0 * np.pi * hours / roi.HOURS_PER_YEAR)
+
+    sites = []
+    for k in range(n_sites):
+        mean_v = rng.uniform(0.8, 2.0)
+        v = mean_v * (1.0 + 0.3 * season) * np.exp(rng.normal(0.0, 0.1, hours.size))
+        sites.append({
+            "name": f"example_site_{k:02d}",
+            "flow_series": np.round(v, 3).tolist(),
+            "channel_width_m": float(rng.uniform(5.0, 40.0)),
+            "units": int(rng.integers(1, 6)),
+            "capture_area_m2": 0.8,
+            "cp": 0.18,
+            "availability": ("beta", 0.8, 50.0),
+            "price": ("triangular", 0.05, 0.15, 0.30),
+            "cost": ("normal", 10_000.0, 1_500.0),
+            "degradation": ("uniform", 0.0, 0.02),
+        })
+    return sites
+
+
+def write_results_csv(results, path):
+    cols = ["name", "units_placed", "mean_kw", "energy_kwh", "energy_p50_kwh", "revenue_p50",
+            "payback_p50", "payback_p90", "prob_payback_within_lifetime", "top_driver", "cached"]
+    with open(path, "w", newline="") as fh:
+        w = csv.writer(fh)
+        w.writerow(cols)
+        for r in results:
+            w.writerow([r.get(c) for c in cols])
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    ap.add_argument("catalog", nargs="?", default=None,
+                    help=f"site catalog JSON (default {SITE_CATALOG}, example sites if that is missing)")
+    ap.add_argument("--results", default=RESULTS_CSV, help=f"output CSV (default {RESULTS_CSV})")
+    args = ap.parse_args()
+
+    catalog = args.catalog or SITE_CATALOG
+    if args.catalog and not os.path.exists(catalog):
+        ap.error(f"catalog {catalog} not found")
+    if os.path.exists(catalog):
+        with open(catalog) as fh:
+            sites = json.load(fh)
+        base_dir = os.path.dirname(os.path.abspath(catalog))
+    else:
+        print(f"Catalog {catalog} not found, evaluating {EXAMPLE_SITES} synthetic sites.")
+        sites = example_catalog()
+        base_dir = "."
+
+    t0 = time.perf_counter()
+    results = evaluate_portfolio(sites, base_dir=base_dir)
+    dt = time.perf_counter() - t0
+
+    write_results_csv(results, args.results)
+
+    reused = sum(1 for r in results if r["cached"] == "all")
+    print(f"{len(results)} sites in {dt:.1f} s ({reused} unchanged, re-used from {CACHE_DIR})")
+    for r in sorted(results, key=lambda r: r["payback_p50"]):
+        print(f"  {r['name']:<24} units={r['units_placed']:<2d} E={r['energy_kwh']:>10,.0f} kWh/yr"
+              f"  payback P50={roi.format_years(r['payback_p50']):>6}"
+              f"  P90={roi.format_years(r['payback_p90']):>6}  [{r['cached']}]")
+    print(f"Wrote {args.results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Reference evaluator for the procedural pose descriptor (NumPy, no Blender)
+
+WHAT THIS SCRIPT DOES
+---------------------
+models/prototype/create_moving_parts.py can write a pose descriptor
+(EXPORT_DESCRIPTOR_PATH) instead of relying on baked samples: the resampled
+track paths, pitch, PERIOD_N link pattern, joint / marker offsets, the
+prepared WING_MAP, MECH_ROT gear ratios and the travel source. A few
+kilobytes regardless of frame count, link count or playback speed.
+
+This module reconstructs every pose from that file at arbitrary (fractional)
+frames, vectorized over time. It is the reference for client-side ports
+(e.g. the web viewer): same maths as chain_matrices() / rig_matrices() /
+mech_quats() in the bake script, with matrices as row-major 4x4 arrays in
+Blender world coordinates.
+
+The bake carries each link's up vector over from the previous frame. The
+descriptor stores it relative to the track plane (tracks.<side>.up_ref:
+plane normal N, coefficients of N and N x forward). The transport keeps the
+coefficients fixed only when the track plane contains world up or is
+perpendicular to it (one coefficient zero); then up_ref.coef holds them once.
+Otherwise up_ref.coef_frames holds them for every baked frame (interpolated
+between frames, held outside the bake range). Poses match the bake without
+replaying the frames before them; tracks are assumed planar.
+
+HOW TO USE
+----------
+    python analysis/pose_descriptor.py prototype_moving_parts.pose.json
+
+    desc = load_descriptor(path)
+    poses = evaluate(desc, frames)      # {object name: (len(frames), 4, 4)}
+    gears = mech_angles(desc, frames)   # {object name: (axis, angle_rad)}
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+import tread_kinematics as tk
+
+# =========================
+# SETTINGS
+# =========================
+PLAYBACK_SPEED = 1.0            # CLI timing run: frames advance this much per display frame
+# =========================
+
+
+def load_descriptor(path):
+    """Descriptor JSON with the numeric parts converted to float64 arrays."""
+    with open(path) as fh:
+        desc = json.load(fh)
+    if desc.get("format") != "tread-pose-descriptor":
+        raise ValueError(f"{path} is not a tread pose descriptor")
+    if desc.get("version", 1) < 2:
+        raise ValueError(f"{path}: descriptor version {desc.get('version', 1)} has no link up reference, "
+                         f"re-export it with the current create_moving_parts.py")
+
+    for tr in desc["tracks"].values():
+        tr["up_ref"]["plane_normal"] = np.asarray(tr["up_ref"]["plane_normal"], dtype=np.float64)
+        tr["up_ref"]["coef"] = np.asarray(tr["up_ref"]["coef"], dtype=np.float64)
+        if "coef_frames" in tr["up_ref"]:
+            tr["up_ref"]["coef_frames"] = np.asarray(tr["up_ref"]["coef_frames"], dtype=np.float64)
+        tr["matrix_world"] = np.asarray(tr["matrix_world"], dtype=np.float64)
+        pts = np.asarray(tr["points"], dtype=np.float64)
+        tr["pts2"] = np.concatenate([pts, pts[:1]])
+        tr["cum"] = np.asarray(tr["cum"], dtype=np.float64)
+        tr["seglen"] = np.diff(tr["cum"])
+    ch = desc["chain"]
+    ch["joints"] = {k: np.asarray(v, dtype=np.float64) for k, v in ch["joints"].items()}
+    wm = desc["wing_map"]
+    knots = np.asarray(wm["knots"], dtype=np.float64)
+    wm["t"], wm["a"] = knots[:, 0], knots[:, 1]
+    if desc["travel"]["mode"] == "sampled":
+        desc["travel"]["theta"] = np.asarray(desc["travel"]["theta"], dtype=np.float64)
+    desc["world_up"] = np.asarray(desc["world_up"], dtype=np.float64)
+    return desc
+
+
+# ---------- travel ----------
+def gear_theta(desc, frames):
+    """Gear angle (rad) at each (fractional) frame."""
+    frames = np.asarray(frames, dtype=np.float64)
+    tr = desc["travel"]
+    if tr["mode"] == "master":
+        return frames * tr["speed_rad_per_frame"] + tr["phase_rad"]
+    f0 = desc["frame_start"]
+    return np.interp(frames, f0 + np.arange(len(tr["theta"])), tr["theta"])
+
+
+def traveled(desc, frames):
+    """Distance along the track, zero at frame_start (as in the bake)."""
+    tr = desc["travel"]
+    th0 = gear_theta(desc, [desc["frame_start"]])[0]
+    theta = (gear_theta(desc, frames) - th0) * tr["chain_sign"]
+    if tr.get("model") == "chordal":
+        return tk.chordal_travel(theta, desc["chain"]["pitch"], tr["teeth"])
+    return theta * tr["gear_r"]
+
+
+# ---------- vector helpers ----------
+def _dot(a, b):
+    return np.einsum("...i,...i->...", a, b)[..., None]
+
+
+def _normalize(v, fallback):
+    n = np.linalg.norm(v, axis=-1, keepdims=True)
+    return np.where(n < 1e-9, fallback, v / np.where(n < 1e-9, 1.0, n))
+
+
+def _reject(v, y):
+    return v - y * _dot(v, y)
+
+
+def _transform(M, p):
+    return np.einsum("...ij,...j->...i", M[..., :3, :3], p) + M[..., :3, 3]
+
+
+def _compose(R, t):
+    M = np.zeros(R.shape[:-2] + (4, 4))
+    M[..., :3, :3] = R
+    M[..., :3, 3] = t
+    M[..., 3, 3] = 1.0
+    return M
+
+
+def stable_basis(y, up, world_up):
+    """stable_basis_from_forward(): (x, y, z) for unit forward y and up hint (None = world up)."""
+    alt = np.array([0.0, 1.0, 0.0])
+    if up is None:
+        z = _reject(world_up, y)
+    else:
+        z = _reject(up, y)
+        z = np.where(np.linalg.norm(z, axis=-1, keepdims=True) < 1e-6, _reject(world_up, y), z)
+    z = np.where(np.linalg.norm(z, axis=-1, keepdims=True) < 1e-6, _reject(alt, y), z)
+    z = _normalize(z, world_up)
+    x = _normalize(np.cross(y, z), np.array([1.0, 0.0, 0.0]))
+    z = _normalize(np.cross(x, y), world_up)
+    return x, y, z
+
+
+# ---------- chain ----------
+def up_coefficients(desc, up_ref, frames):
+    """(n, 2) constant or (T, n, 2) per-frame up coefficients at the given frames."""
+    if "coef_frames" not in up_ref:
+        return up_ref["coef"]
+    C = up_ref["coef_frames"]
+    u = np.clip(np.asarray(frames, dtype=np.float64) - desc["frame_start"], 0.0, len(C) - 1)
+    k0 = np.minimum(np.floor(u).astype(int), len(C) - 2) if len(C) > 1 else np.zeros(len(u), dtype=int)
+    w = (u - k0)[:, None, None]
+    return C[k0] * (1.0 - w) + C[np.minimum(k0 + 1, len(C) - 1)] * w
+
+
+def link_matrices(desc, side, frames):
+    """World matrices of every link on track `side` ('L' / 'R'): (T, count, 4, 4)."""
+    tr = desc["tracks"][side]
+    ch = desc["chain"]
+    n, pitch = ch["count"], ch["pitch"]
+    world_up = desc["world_up"]
+
+    dist = tr["curve_dir"] * (np.arange(n) * pitch)[None, :] + traveled(desc, frames)[:, None]
+    p_local = tk.eval_at_distance(tr["pts2"], tr["seglen"], tr["cum"], tr["cum"][-1], dist)
+    p = _transform(tr["matrix_world"], p_local)                     # (T, n, 3)
+    fwd = _normalize(np.roll(p, -1, axis=1) - p, np.array([0.0, 1.0, 0.0]))
+
+    # the bake's transported up, as plane coefficients (see module docstring)
+    N = tr["up_ref"]["plane_normal"]
+    coef = up_coefficients(desc, tr["up_ref"], frames)
+    side_dir = _normalize(np.cross(N, fwd), np.zeros(3))
+    hint = coef[..., 0, None] * N + coef[..., 1, None] * side_dir
+    x, y, z = stable_basis(fwd, hint, world_up)
+    W = np.stack([x, y, z], axis=-1)                                # (T, n, 3, 3)
+
+    special = (np.arange(n) % ch["period_n"]) == ch["special_at"]
+    Ls, j0s = {}, {}
+    for kind, (j0, j1) in ch["joints"].items():
+        fl = _normalize(j1 - j0, np.array([0.0, 1.0, 0.0]))
+        lx, ly, lz = stable_basis(fl, np.array([0.0, 0.0, 1.0]), world_up)
+        Ls[kind], j0s[kind] = np.stack([lx, ly, lz], axis=-1), j0
+    L = np.where(special[:, None, None], Ls["B"], Ls["A"])          # (n, 3, 3)
+    j0 = np.where(special[:, None], j0s["B"], j0s["A"])             # (n, 3)
+
+    R = W @ np.swapaxes(L, -1, -2)
+    return _compose(R, p - np.einsum("...ij,...j->...i", R, j0))
+
+
+def rig_link_indices(desc):
+    ch = desc["chain"]
+    return tk.blade_link_indices(ch["count"], ch["period_n"], ch["special_at"])
+
+
+# ---------- rigs ----------
+def cam_basis(x_vec, ang_deg, base_y, flip):
+    """basis_from_cam_angle() for arrays of hinge axes, angles and base y axes."""
+    x = _normalize(x_vec, np.array([1.0, 0.0, 0.0]))
+    y0 = _normalize(_reject(base_y, x), _reject(np.array([0.0, 1.0, 0.0]), x))
+    a = np.radians(ang_deg)[..., None]
+    y = np.cos(a) * y0 + np.sin(a) * np.cross(x, y0)
+    z = _normalize(np.cross(x, y), np.array([0.0, 0.0, 1.0]))
+    y = _normalize(np.cross(z, x), np.array([0.0, 1.0, 0.0]))
+    if flip:
+        y, z = -y, -z
+    return np.stack([x, y, z], axis=-1)
+
+
+def plain_basis(x_vec, base_y, world_up):
+    x = _normalize(x_vec, np.array([1.0, 0.0, 0.0]))
+    y = _normalize(base_y, np.array([0.0, 1.0, 0.0]))
+    z = _normalize(np.cross(x, y), world_up)
+    y = _normalize(np.cross(z, x), np.array([0.0, 1.0, 0.0]))
+    return np.stack([x, y, z], axis=-1)
+
+
+def rig_matrices(desc, frames, mats_l=None, mats_r=None):
+    """
+    World matrices of the cam rigs: {part: (T, n_rigs, 4, 4)} with parts
+    pin_L, pin_R, follower_L, follower_R, wing_pivot, wing.
+    """
+    rig = desc["rig"]
+    wm = desc["wing_map"]
+    idx = rig_link_indices(desc)
+    mL = (link_matrices(desc, "L", frames) if mats_l is None else mats_l)[:, idx]
+    mR = (link_matrices(desc, "R", frames) if mats_r is None else mats_r)[:, idx]
+    RL, RR = mL[..., :3, :3], mR[..., :3, :3]
+
+    c0 = np.asarray(rig["c0_local"], dtype=np.float64)
+    C0L, C0R = _transform(mL, c0), _transform(mR, c0)
+    x_vec = C0R - C0L
+    sep = np.linalg.norm(x_vec, axis=-1, keepdims=True)
+    x_dir = np.where(sep < 1e-9, np.array([1.0, 0.0, 0.0]), x_vec / np.where(sep < 1e-9, 1.0, sep))
+    half_sep = np.where(sep < 1e-9, 0.0, 0.5 * sep)
+
+    pin_extra = rig["pin_outer_half_dist"] - half_sep
+    fol_extra = rig["follower_outer_half_dist"] - half_sep
+
+    def offset(R, pos, h0):
+        return pos if h0 is None else pos - R @ np.asarray(h0, dtype=np.float64)
+
+    out = {
+        "pin_L": _compose(RL, offset(RL, C0L - x_dir * pin_extra, rig["pin_h0_local"])),
+        "pin_R": _compose(RR, offset(RR, C0R + x_dir * pin_extra, rig["pin_h0_local"])),
+    }
+
+    mid = 0.5 * (C0L + C0R)
+    if rig["force_wing_world_x_zero"]:
+        mid[..., 0] = 0.0
+
+    base_y = RL[..., :, 1]
+    if wm["enabled"]:
+        tr = desc["tracks"]["L"]
+        pitch = desc["chain"]["pitch"]
+        dist = tr["curve_dir"] * (idx * pitch)[None, :] + traveled(desc, frames)[:, None]
+        t = (dist % tr["total"]) / tr["total"]
+        ang = tk.wing_angle(t, wm["t"], wm["a"], wm["smoothstep"]) * wm["cam_angle_sign"]
+        R = cam_basis(x_vec, ang, base_y, rig["wing_flip_around_hinge_x"])
+    else:
+        R = plain_basis(x_vec, base_y, desc["world_up"])
+
+    out["follower_L"] = _compose(R, offset(R, C0L - x_dir * fol_extra, rig["follower_h0_local"]))
+    out["follower_R"] = _compose(R, offset(R, C0R + x_dir * fol_extra, rig["follower_h0_local"]))
+    out["wing_pivot"] = _compose(R, mid)
+    out["wing"] = out["wing_pivot"]
+    return out
+
+
+# ---------- gears ----------
+_AXES = {"X": (1.0, 0.0, 0.0), "Y": (0.0, 1.0, 0.0), "Z": (0.0, 0.0, 1.0)}
+
+
+def mech_angles(desc, frames):
+    """{object name: (axis, angle_rad array)} for the MECH_ROT objects."""
+    th = gear_theta(desc, frames)
+    return {m["name"]: (_AXES[m["axis"].upper()], th * m["ratio"] * m["sign"])
+            for m in desc["mechanics"]}
+
+
+# ---------- everything ----------
+def evaluate(desc, frames):
+    """World matrix of every chain link and rig part, keyed by object name: (T, 4, 4)."""
+    frames = np.atleast_1d(np.asarray(frames, dtype=np.float64))
+    mats = {side: link_matrices(desc, side, frames) for side in ("L", "R")}
+
+    poses = {}
+    for side, fmt in desc["chain"]["names"].items():
+        for i in range(desc["chain"]["count"]):
+            poses[fmt.format(i)] = mats[side][:, i]
+
+    idx = rig_link_indices(desc)
+    rigs = rig_matrices(desc, frames, mats["L"], mats["R"])
+    for part, fmt in desc["rig"]["names"].items():
+        for k, i in enumerate(idx):
+            poses[fmt.format(int(i))] = rigs[part][:, k]
+    return poses
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    ap.add_argument("descriptor")
+    ap.add_argument("--frame", type=float, default=None, help="print the poses at this frame")
+    args = ap.parse_args()
+
+    desc = load_descriptor(args.descriptor)
+    frames = np.arange(desc["frame_start"], desc["frame_end"] + 1, PLAYBACK_SPEED)
+
+    t0 = time.perf_counter()
+    poses = evaluate(desc, frames)
+    dt = time.perf_counter() - t0
+
+    size = os.path.getsize(args.descriptor)
+    baked = len(poses) * len(frames) * 7 * 4     # location + quaternion, float32
+    print(f"{args.descriptor}: {size / 1024.0:.1f} KiB "
+          f"(baked TRS samples for the same range: {baked / 1024.0:.0f} KiB)")
+    print(f"{len(poses)} objects x {len(frames)} frames in {1e3 * dt:.1f} ms "
+          f"({1e6 * dt / len(frames):.0f} µs per frame)")
+
+    if args.frame is not None:
+        one = evaluate(desc, [args.frame])
+        for name, M in one.items():
+            loc = M[0, :3, 3]
+            print(f"{name:22s} {loc[0]:9.3f} {loc[1]:9.3f} {loc[2]:9.3f}")
+        for name, (axis, ang) in mech_angles(desc, [args.frame]).items():
+            print(f"{name:22s} {math.degrees(ang[0]):9.2f} deg about {axis}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""
+Surrogate power / load model (sparse polynomial chaos) for instant predictions
+
+WHAT THIS SCRIPT DOES
+---------------------
+Evaluating kinematics plus hydrodynamics per design point is too slow for
+interactive site tools and nested optimization. This script
+
+1. samples N_TRAIN designs (Latin hypercube over VARIABLES) and evaluates
+   the reference model for each,
+2. fits a sparse Legendre polynomial-chaos expansion per output: candidate
+   terms up to total degree MAX_DEGREE, selected greedily by orthogonal
+   matching pursuit, with the number of terms chosen by K-fold
+   cross-validation,
+3. reports CV and hold-out errors, writes the model to MODEL_PATH (JSON) and
+   times batch evaluation.
+
+REFERENCE MODEL
+---------------
+The flat-plate blade model of cam_optimizer.py around the two-gear loop,
+for a design given by
+
+    period_n          links per blade (blade count = LINK_COUNT / period_n)
+    gear_teeth        sprocket teeth; the loop end radius scales with the gear
+    blade_height_mm   blade height (width stays 159 mm)
+    capture_angle     WING_MAP angle of the capture plateau (270 baked)
+    wing_phase        WING_MAP shift as a loop fraction
+    depth_ratio       water level above the loop bottom / loop height
+
+At every loop point the blade force is scaled by its submerged fraction
+(blade centered on the hinge). The tread runs at the best speed ratio
+lambda = u / U found on a grid. Outputs:
+
+    power_w           cycle power at the best lambda
+    peak_force_n      largest single-blade force over the cycle
+    tension_n         mean tread force (chain pull) at the best lambda
+
+Flow speed, blade area and blade count enter through exact scaling laws, so
+the expansions are fitted to the coefficients
+
+    c_p = P / (0.5 rho A n U³),  c_f = F_peak / (0.5 rho A U²),  c_t = T / (0.5 rho A n U²)
+
+and flow_speed_m_s is an input of predict() only. c_p is smooth and fits to
+a few % of its spread; c_f is a maximum over the cycle (kinks where the
+worst sample moves) and is the least accurate output, check the printed
+errors before using it for sizing.
+
+Batch evaluation compiles the union of the selected terms once
+(compile_model) and builds the basis from pairwise Legendre factor tables in
+cache-sized chunks, about a microsecond per design on one core.
+
+HOW TO USE
+----------
+    python analysis/power_surrogate.py
+
+    model = load_model("power_surrogate.json")
+    predict(model, designs)            # designs: dict of arrays or (N, 6) array
+    power_curve_w(model, design, v)    # one design over a range of flow speeds
+"""
+
+import json
+import time
+
+import numpy as np
+
+import cam_optimizer as co
+import tread_kinematics as tk
+
+# =========================
+# SETTINGS
+# =========================
+VARIABLES = [                   # (name, low, high)
+    ("period_n", 3.0, 12.0),
+    ("gear_teeth", 20.0, 60.0),
+    ("blade_height_mm", 20.0, 80.0),
+    ("capture_angle", 240.0, 300.0),
+    ("wing_phase", -0.03, 0.03),
+    ("depth_ratio", 0.3, 1.3),
+]
+BLADE_WIDTH_MM = 159.0
+LAMBDA_GRID = np.linspace(0.02, 0.8, 40)
+
+N_TRAIN = 3000
+N_TEST = 500
+MAX_DEGREE = 5
+MAX_TERMS = 240                 # of 462 basis terms; main() flags an output whose CV minimum sits here
+CV_FOLDS = 5
+SEED = 45
+
+MODEL_PATH = "power_surrogate.json"
+BENCH_QUERIES = 1_000_000
+CHUNK = 512                     # designs per evaluation block (cache sized)
+# =========================
+
+OUTPUTS = ("c_p", "c_f", "c_t")
+NAMES = [v[0] for v in VARIABLES]
+
+
+# ---------- reference model ----------
+def reference_coefficients(x):
+    """(N, len(VARIABLES)) designs -> dict of (N,) c_p, c_f, c_t and the best lambda."""
+    x = np.atleast_2d(np.asarray(x, dtype=np.float64))
+    flow = np.asarray(co.FLOW_DIR, dtype=np.float64)
+    flow /= max(np.linalg.norm(flow), 1e-12)
+    kt, ka = tk.prepare_wing_map(tk.WING_MAP)
+    plateau = np.isclose(np.mod(ka, 360.0), 270.0)
+    t = (np.arange(co.CYCLE_SAMPLES) + 0.5) / co.CYCLE_SAMPLES
+
+    out = {k: np.zeros(len(x)) for k in OUTPUTS + ("lambda",)}
+    loops = {}
+    for i, (period_n, teeth, height, capture, phase, depth) in enumerate(x):
+        key = int(round(teeth))
+        if key not in loops:
+            radius = tk.TRACK_RADIUS * float(tk.gear_radius(tk.LINK_PITCH, key) / tk.gear_radius())
+            pts2, seglen, cum, total = tk.polyline_table(tk.two_gear_loop(radius=radius))
+            p = tk.eval_at_distance(pts2, seglen, cum, total, t * total)
+            tang = tk.tangent_at_distance(pts2, seglen, cum, total, t * total)
+            loops[key] = (p[:, 1] - p[:, 1].min(), 2.0 * radius, tang)
+        v_rel, loop_h, tang = loops[key]
+        perp = np.stack([-tang[:, 1], tang[:, 0]], axis=1)
+
+        a = np.where(plateau, ka - 270.0 + capture, ka)
+        phi = np.radians(tk.CAM_ANGLE_SIGN * tk.wing_angle(t - phase, kt, a))
+        n = np.cos(phi)[:, None] * tang + np.sin(phi)[:, None] * perp
+        wet = np.clip((depth * loop_h - v_rel) / height + 0.5, 0.0, 1.0)
+
+        w = flow[None, None, :] - LAMBDA_GRID[:, None, None] * tang[None]
+        wn = np.einsum("lsk,sk->ls", w, n)
+        wmag = np.linalg.norm(w, axis=-1)
+        f_vec = wmag[..., None] * (co.CN_MAX * wn[..., None] * n[None] + co.CD_EDGE * w) * wet[None, :, None]
+        f_t = np.einsum("lsk,sk->ls", f_vec, tang).mean(axis=1)
+        j = int(np.argmax(LAMBDA_GRID * f_t))
+        out["c_p"][i] = LAMBDA_GRID[j] * f_t[j]
+        out["c_t"][i] = f_t[j]
+        out["c_f"][i] = np.linalg.norm(f_vec[j], axis=-1).max()
+        out["lambda"][i] = LAMBDA_GRID[j]
+    return out
+
+
+def blade_scales(x):
+    """(0.5 rho A, blade count) of designs (N, len(VARIABLES))."""
+    x = np.atleast_2d(x)
+    area = BLADE_WIDTH_MM * x[:, NAMES.index("blade_height_mm")] * 1e-6
+    n_blades = np.floor(tk.LINK_COUNT / np.round(x[:, NAMES.index("period_n")]))
+    return 0.5 * co.RHO_WATER * area, n_blades
+
+
+def latin_hypercube(n, rng):
+    lo = np.array([v[1] for v in VARIABLES])
+    hi = np.array([v[2] for v in VARIABLES])
+    u = (rng.permuted(np.tile(np.arange(n), (len(VARIABLES), 1)), axis=1).T + rng.random((n, len(VARIABLES)))) / n
+    return lo + u * (hi - lo)
+
+
+# ---------- polynomial chaos ----------
+def total_degree_indices(dim, degree):
+    """All multi-indices with sum <= degree, constant term first."""
+    idx = [np.zeros(dim, dtype=np.int64)]
+    for d in range(1, degree + 1):
+        for comb in np.ndindex(*([d + 1] * dim)):
+            if sum(comb) == d:
+                idx.append(np.array(comb))
+    return np.array(idx)
+
+
+def to_unit(x, bounds):
+    lo, hi = bounds[:, 0], bounds[:, 1]
+    return np.clip(2.0 * (x - lo) / (hi - lo) - 1.0, -1.0, 1.0)
+
+
+def legendre_table(z, degree):
+    """(dim, degree + 1, N) orthonormal Legendre values on [-1, 1]."""
+    P = np.empty((z.shape[1], degree + 1, z.shape[0]))
+    P[:, 0] = 1.0
+    if degree >= 1:
+        P[:, 1] = z.T
+    for k in range(1, degree):
+        P[:, k + 1] = ((2 * k + 1) * z.T * P[:, k] - k * P[:, k - 1]) / (k + 1)
+    P *= np.sqrt(2.0 * np.arange(degree + 1) + 1.0)[None, :, None]
+    return P
+
+
+def design_matrix(z, terms):
+    """(N, len(terms)) basis values."""
+    P = legendre_table(z, int(terms.max(initial=0)))
+    out = np.ones((z.shape[0], len(terms)))
+    for j, alpha in enumerate(terms):
+        for d in np.nonzero(alpha)[0]:
+            out[:, j] *= P[d, alpha[d]]
+    return out
+
+
+def omp_path(Phi, y, max_terms):
+    """
+    Greedy term order and the least-squares coefficients after each addition.
+    The active columns are kept as a QR factorization (Gram-Schmidt, applied
+    twice), so each addition costs one projection instead of a new lstsq.
+    """
+    norms = np.maximum(np.linalg.norm(Phi, axis=0), 1e-12)
+    n_max = min(max_terms, Phi.shape[1])
+    Q = np.zeros((Phi.shape[0], n_max))
+    R = np.zeros((n_max, n_max))
+    qy = np.zeros(n_max)
+    active, coefs = [], []
+    r = y.astype(np.float64)
+    for k in range(n_max):
+        if k == 0:
+            j = 0
+        else:
+            score = np.abs(Phi.T @ r) / norms
+            score[active] = -1.0
+            j = int(np.argmax(score))
+        v = Phi[:, j].copy()
+        for _ in range(2):
+            h = Q[:, :k].T @ v
+            v -= Q[:, :k] @ h
+            R[:k, k] += h
+        R[k, k] = np.linalg.norm(v)
+        Q[:, k] = v / max(R[k, k], 1e-300)
+        qy[k] = Q[:, k] @ y
+        r = r - qy[k] * Q[:, k]
+        active.append(j)
+        coefs.append(np.linalg.solve(R[:k + 1, :k + 1], qy[:k + 1]))
+    return active, coefs
+
+
+def fit_output(Phi, y, rng, folds=CV_FOLDS, max_terms=MAX_TERMS):
+    """
+    K-fold choice of the term count, then the final OMP fit.
+    Returns (terms, coef, cv_rmse, at_cap): at_cap means the CV error was
+    still falling at max_terms.
+    """
+    fold = rng.permutation(len(y)) % folds
+    err = np.zeros(max_terms)
+    for f in range(folds):
+        tr, va = fold != f, fold == f
+        active, coefs = omp_path(Phi[tr], y[tr], max_terms)
+        for k, c in enumerate(coefs):
+            err[k] += ((Phi[va][:, active[:k + 1]] @ c - y[va]) ** 2).sum()
+    err = np.sqrt(err / len(y))
+    k_best = int(np.argmin(err[:len(coefs)]))
+    active, coefs = omp_path(Phi, y, k_best + 1)
+    return active, coefs[-1], float(err[k_best]), k_best + 1 >= max_terms
+
+
+def fit(x, coeffs, rng):
+    bounds = np.array([v[1:] for v in VARIABLES])
+    terms = total_degree_indices(len(VARIABLES), MAX_DEGREE)
+    Phi = design_matrix(to_unit(x, bounds), terms)
+    model = {"format": "tread-surrogate", "version": 1,
+             "variables": [{"name": n, "low": lo, "high": hi} for n, lo, hi in VARIABLES],
+             "blade_width_mm": BLADE_WIDTH_MM, "outputs": {}}
+    for name in OUTPUTS:
+        active, coef, cv, at_cap = fit_output(Phi, coeffs[name], rng)
+        model["outputs"][name] = {
+            "terms": terms[active].tolist(),
+            "coef": coef.tolist(),
+            "cv_rmse": cv,
+            "at_cap": at_cap,
+            "std": float(np.std(coeffs[name])),
+        }
+    return model
+
+
+def save_model(model, path):
+    with open(path, "w") as fh:
+        json.dump(model, fh)
+
+
+def load_model(path):
+    with open(path) as fh:
+        model = json.load(fh)
+    if model.get("format") != "tread-surrogate":
+        raise ValueError(f"{path} is not a tread surrogate model")
+    return model
+
+
+def _as_matrix(model, designs):
+    if isinstance(designs, dict):
+        names = [v["name"] for v in model["variables"]]
+        n = max(np.size(designs[k]) for k in names)
+        return np.stack([np.broadcast_to(np.asarray(designs[k], dtype=np.float64), (n,)) for k in names], axis=1)
+    return np.atleast_2d(np.asarray(designs, dtype=np.float64))
+
+
+def compile_model(model):
+    """Evaluation plan: union of terms, coefficient matrix and pairwise factor tables."""
+    names = list(model["outputs"])
+    terms = sorted({tuple(t) for o in model["outputs"].values() for t in o["terms"]})
+    row = {t: i for i, t in enumerate(terms)}
+    coef = np.zeros((len(terms), len(names)))
+    for j, name in enumerate(names):
+        for t, c in zip(model["outputs"][name]["terms"], model["outputs"][name]["coef"]):
+            coef[row[tuple(t)], j] = c
+    terms = np.array(terms, dtype=np.int64)
+    dim = terms.shape[1]
+    pairs = [(d, min(d + 1, dim - 1)) for d in range(0, dim, 2)]
+    groups = []
+    for a, b in pairs:
+        sub = terms[:, [a, b]] if a != b else terms[:, [a]]
+        uniq, inv = np.unique(sub, axis=0, return_inverse=True)
+        groups.append((a, b, uniq, inv.ravel()))
+    return {
+        "names": names,
+        "variables": model["variables"],
+        "bounds": np.array([[v["low"], v["high"]] for v in model["variables"]]),
+        "degree": int(terms.max(initial=0)),
+        "coef": coef,
+        "groups": groups,
+    }
+
+
+def predict_coefficients(model, designs, chunk=CHUNK):
+    """Non-dimensional c_p, c_f, c_t for designs (dict of arrays or (N, dim) array)."""
+    plan = model if "groups" in model else compile_model(model)
+    x = _as_matrix(model, designs)
+    out = np.empty((len(x), len(plan["names"])))
+    for s in range(0, len(x), chunk):
+        P = legendre_table(to_unit(x[s:s + chunk], plan["bounds"]), plan["degree"])
+        Phi = None
+        for a, b, uniq, inv in plan["groups"]:
+            f = P[a][uniq[:, 0]] * P[b][uniq[:, 1]] if a != b else P[a][uniq[:, 0]]
+            Phi = f[inv] if Phi is None else Phi * f[inv]
+        out[s:s + chunk] = (plan["coef"].T @ Phi).T
+    return {name: out[:, j] for j, name in enumerate(plan["names"])}
+
+
+def predict(model, designs, flow_speed_m_s):
+    """
+    power_w, peak_force_n, tension_n for designs at flow speeds (broadcast).
+    model may be the loaded dict or compile_model() of it (saves the set-up
+    when called many times with small batches).
+    """
+    x = _as_matrix(model, designs)
+    c = predict_coefficients(model, x)
+    q, n_blades = blade_scales(x)
+    U = np.asarray(flow_speed_m_s, dtype=np.float64)
+    return {
+        "power_w": q * n_blades * U ** 3 * c["c_p"],
+        "peak_force_n": q * U ** 2 * c["c_f"],
+        "tension_n": q * n_blades * U ** 2 * c["c_t"],
+    }
+
+
+def power_curve_w(model, design, speeds):
+    """Power (W) of one design over flow speeds; design is a dict of scalars."""
+    speeds = np.asarray(speeds, dtype=np.float64)
+    return predict(model, {k: np.full(speeds.shape, v) for k, v in design.items()}, speeds)["power_w"]
+
+
+def main():
+    rng = np.random.default_rng(SEED)
+    x = latin_hypercube(N_TRAIN + N_TEST, rng)
+    t0 = time.perf_counter()
+    ref = reference_coefficients(x)
+    t_ref = (time.perf_counter() - t0) / len(x)
+
+    train = {k: v[:N_TRAIN] for k, v in ref.items()}
+    t0 = time.perf_counter()
+    model = fit(x[:N_TRAIN], train, rng)
+    t_fit = time.perf_counter() - t0
+    save_model(model, MODEL_PATH)
+
+    pred = predict_coefficients(model, x[N_TRAIN:])
+    print(f"reference model {1e3 * t_ref:.2f} ms per design, {N_TRAIN} training designs, "
+          f"fit in {t_fit:.1f} s -> {MODEL_PATH}\n")
+    print(f"{'output':<6} {'terms':>6} {'CV RMSE':>9} {'test RMSE':>10} {'test max':>9} {'rel to std':>10}")
+    for name, o in model["outputs"].items():
+        e = pred[name] - ref[name][N_TRAIN:]
+        print(f"{name:<6} {len(o['coef']):6d} {o['cv_rmse']:9.4f} {np.sqrt(np.mean(e ** 2)):10.4f} "
+              f"{np.abs(e).max():9.4f} {np.sqrt(np.mean(e ** 2)) / o['std']:10.3f}"
+              + ("  CV minimum at MAX_TERMS, raise it" if o["at_cap"] else ""))
+
+    model = compile_model(load_model(MODEL_PATH))
+    q = latin_hypercube(BENCH_QUERIES, rng)
+    speeds = rng.uniform(0.3, 2.5, BENCH_QUERIES)
+    t0 = time.perf_counter()
+    res = predict(model, q, speeds)
+    dt = time.perf_counter() - t0
+    print(f"\n{BENCH_QUERIES:,} queries in {1e3 * dt:.0f} ms ({1e9 * dt / BENCH_QUERIES:.0f} ns per design), "
+          f"{t_ref / (dt / BENCH_QUERIES):,.0f}x faster than the reference model")
+
+    base = {"period_n": tk.PERIOD_N, "gear_teeth": tk.GEAR_TEETH, "blade_height_mm": 40.0,
+            "capture_angle": 270.0, "wing_phase": 0.0, "depth_ratio": 1.3}
+    v = np.array([0.5, 1.0, 1.5, 2.0])
+    curve = power_curve_w(model, base, v)
+    print("baked design power curve: " + ", ".join(f"{u:g} m/s {p:.2f} W" for u, p in zip(v, curve))
+          + f"  (mean peak blade force {res['peak_force_n'].mean():.1f} N over the benchmark)")
+
+
+if __name__ == "__main__":
+    main()
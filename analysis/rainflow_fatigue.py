@@ -0,0 +1,290 @@
+"""
+Streaming rainflow counting and S-N fatigue damage for many components
+
+WHAT THIS SCRIPT DOES
+---------------------
+Counts load cycles in long load histories (links, CamPin / CamFollower,
+blades) and turns them into accumulated damage and expected life:
+
+- Histories are fed chunk by chunk as (samples, components) arrays, so a
+  year-long record never has to be in memory (e.g. straight from the
+  memory-mapped output of turbulent_inflow.py).
+- Turning points are extracted per chunk with array operations (sign of the
+  slope, plateaus forward-filled). The last sample of a chunk stays pending
+  until the next chunk decides whether it is a turning point.
+- Four-point rainflow (equivalent to ASTM E1049) runs on an array-backed
+  residual per component: the new turning points are appended to it and
+  every window that closes a cycle is removed in the same pass, for all
+  components and all positions at once (see _reduce). The Python loop runs
+  over passes, a few dozen per chunk, instead of over samples.
+- Closed cycles are binned into per-component range / mean matrices.
+  finish() counts what is left on the residual stacks as half cycles.
+- damage() applies a Basquin S-N curve with a Goodman mean-stress
+  correction (Miner's rule) per component class; expected life is the
+  simulated duration divided by the damage.
+
+LOAD_GATE quantizes the loads before counting, which drops reversals smaller
+than the gate (sensor noise, FFT ripple) and shortens the residual stacks.
+
+S-N CURVES
+----------
+    S_eq = S_a / (1 - S_m / S_u)     (S_m > 0, Goodman; S_a for S_m <= 0)
+    N    = N_REF (S_REF / S_eq)^m    (infinite below the endurance limit)
+
+stress_per_load converts the counted load (N) into stress (MPa) for that
+part. The values in SN_CURVES are placeholders for printed / moulded plastic
+parts; replace them with coupon data before trusting the lives.
+
+HOW TO USE
+----------
+    python analysis/rainflow_fatigue.py
+
+With INFLOW_PATH set to a record from turbulent_inflow.py, every grid point
+becomes one blade-load history (flat-plate normal force of cam_optimizer.py
+in the relative flow). Otherwise N_COMPONENTS synthetic histories are used.
+"""
+
+import time
+
+import numpy as np
+
+import cam_optimizer as co
+
+# =========================
+# SETTINGS
+# =========================
+INFLOW_PATH = None              # e.g. "inflow/inflow_seed0.npy"
+N_COMPONENTS = 2000             # synthetic histories when INFLOW_PATH is None
+SYNTH_DT_S = 0.02
+SYNTH_DURATION_S = 3600.0
+SYNTH_MEAN_N = 4.0
+SYNTH_TONES_HZ = (0.15, 0.6, 1.7, 4.1)
+SYNTH_TONE_AMP_N = (1.2, 0.8, 0.4, 0.2)
+SYNTH_NOISE_N = 0.02
+SEED = 41
+
+CHUNK_SAMPLES = 16384
+LOAD_GATE_N = 0.05              # 0 = no quantization
+RANGE_BINS = 64
+MEAN_BINS = 32
+
+SN_CURVES = {
+    #             MPa / N            Basquin m  S_ref MPa  N_ref  S_u MPa  endurance MPa
+    "link":      dict(stress_per_load=1.6, m=8.0, s_ref=20.0, n_ref=1e6, s_u=45.0, s_e=4.0),
+    "cam_pin":   dict(stress_per_load=2.5, m=8.0, s_ref=20.0, n_ref=1e6, s_u=45.0, s_e=4.0),
+    "blade":     dict(stress_per_load=0.6, m=10.0, s_ref=18.0, n_ref=1e6, s_u=40.0, s_e=3.0),
+}
+SECONDS_PER_YEAR = 365.25 * 86400.0
+# =========================
+
+
+class StreamingRainflow:
+    """Four-point rainflow counter for n components, fed (samples, n) chunks."""
+
+    def __init__(self, n, range_edges, mean_edges, gate=0.0):
+        self.n = n
+        self.range_edges = np.asarray(range_edges, dtype=np.float64)
+        self.mean_edges = np.asarray(mean_edges, dtype=np.float64)
+        self.gate = gate
+        self.stack = np.zeros((n, 0))
+        self.depth = np.zeros(n, dtype=np.int64)
+        self.max_depth = 0
+        self.last = None
+        self.last_sign = np.zeros(n, dtype=np.int8)
+        self.counts = np.zeros((n, len(self.range_edges) - 1, len(self.mean_edges) - 1))
+        self.samples = 0
+        self.turning_points = 0
+        self._cycles = []
+
+    def feed(self, x):
+        x = np.asarray(x, dtype=np.float64).reshape(len(x), self.n)
+        if self.last is None:
+            self.last = x[0].copy()
+        y = np.empty((self.n, len(x) + 1))             # component-major from here on
+        y[:, 0] = self.last
+        y[:, 1:] = x.T
+        if self.gate > 0.0:
+            np.round(y / self.gate, out=y)
+            y *= self.gate
+        self.samples += len(x)
+
+        # s[:, j] = slope sign into y[:, j] (s[:, 0] carried over), zeros forward-filled
+        s = np.empty(y.shape, dtype=np.int8)
+        s[:, 0] = self.last_sign
+        s[:, 1:] = np.sign(np.diff(y, axis=1))
+        idx = np.where(s != 0, np.arange(y.shape[1], dtype=np.int32)[None], 0)
+        np.maximum.accumulate(idx, axis=1, out=idx)
+        s = np.take_along_axis(s, idx, axis=1)
+        rev = s[:, :-1] != s[:, 1:]                    # y[:, j] is a turning point, j < len(x)
+        self.last = y[:, -1].copy()
+        self.last_sign = s[:, -1].copy()
+
+        comp, t = np.nonzero(rev)                      # grouped by component, in time order
+        self._append(comp, y[comp, t])
+        self._flush()
+
+    def _append(self, comp, vals):
+        """Append turning points to the residual sequences and close every cycle possible."""
+        per_comp = np.bincount(comp, minlength=self.n)
+        pos = self.depth[comp] + np.arange(len(comp)) - (np.cumsum(per_comp) - per_comp)[comp]
+        length = self.depth + per_comp
+        width = int(length.max(initial=0))
+        seq = np.zeros((self.n, max(width, 4)))
+        keep = min(self.stack.shape[1], width)
+        seq[:, :keep] = self.stack[:, :keep]
+        seq[comp, pos] = vals
+        self.turning_points += len(comp)
+        self.stack, self.depth = self._reduce(seq, length)
+        self.max_depth = max(self.max_depth, int(self.depth.max(initial=0)))
+
+    def _reduce(self, seq, length):
+        """
+        Four-point rule applied to all windows of all components at once:
+        (b, c) is a closed cycle when |b - c| <= |a - b| and |b - c| <= |c - d|.
+        Removing one only widens its neighbours' ranges, so all qualifying
+        windows that share no point are removed in the same pass, and the result
+        equals the sequential stack algorithm.
+        """
+        while seq.shape[1] >= 4:
+            r = np.abs(np.diff(seq, axis=1))
+            j = np.arange(1, seq.shape[1] - 2)
+            q = (r[:, 1:-1] <= r[:, :-2]) & (r[:, 1:-1] <= r[:, 2:]) & (j[None] + 2 < length[:, None])
+            q[:, 1:] &= ~q[:, :-1]
+            comp, jb = np.nonzero(q)
+            if not comp.size:
+                break
+            jb = jb + 1
+            b, c = seq[comp, jb], seq[comp, jb + 1]
+            self._cycles.append((comp, np.abs(b - c), 0.5 * (b + c), 1.0))
+
+            kept = np.ones(seq.shape, dtype=bool)
+            kept[comp, jb] = False
+            kept[comp, jb + 1] = False
+            kept &= np.arange(seq.shape[1])[None] < length[:, None]
+            length = kept.sum(axis=1)
+            out = np.zeros((self.n, max(int(length.max(initial=0)), 4)))
+            rows, cols = np.nonzero(kept)
+            out[rows, np.cumsum(kept, axis=1)[rows, cols] - 1] = seq[rows, cols]
+            seq = out
+        return seq, length
+
+    def _flush(self):
+        if not self._cycles:
+            return
+        comp = np.concatenate([c[0] for c in self._cycles])
+        rng = np.concatenate([c[1] for c in self._cycles])
+        mean = np.concatenate([c[2] for c in self._cycles])
+        w = np.concatenate([np.full(len(c[0]), c[3]) for c in self._cycles])
+        self._cycles = []
+        nr, nm = self.counts.shape[1:]
+        ri = np.clip(np.searchsorted(self.range_edges, rng, side="right") - 1, 0, nr - 1)
+        mi = np.clip(np.searchsorted(self.mean_edges, mean, side="right") - 1, 0, nm - 1)
+        flat = (comp * nr + ri) * nm + mi
+        self.counts += np.bincount(flat, weights=w, minlength=self.counts.size).reshape(self.counts.shape)
+
+    def finish(self):
+        """Close the history: push the pending last sample, count the residual as half cycles."""
+        if self.last is not None:
+            self._append(np.arange(self.n), self.last)
+        for j in range(int(self.depth.max(initial=0)) - 1):
+            comp = np.nonzero(self.depth > j + 1)[0]
+            a, b = self.stack[comp, j], self.stack[comp, j + 1]
+            self._cycles.append((comp, np.abs(b - a), 0.5 * (a + b), 0.5))
+        self._flush()
+        self.depth[:] = 0
+        self.last = None
+        return self.counts
+
+
+def cycles_to_failure(stress_amp, stress_mean, curve):
+    """Basquin life with Goodman correction; inf below the endurance limit."""
+    denom = np.clip(1.0 - np.maximum(stress_mean, 0.0) / curve["s_u"], 1e-6, None)
+    s_eq = stress_amp / denom
+    with np.errstate(divide="ignore"):
+        n = curve["n_ref"] * (curve["s_ref"] / s_eq) ** curve["m"]
+    return np.where(s_eq > curve["s_e"], n, np.inf)
+
+
+def damage(counts, range_edges, mean_edges, curve):
+    """Miner damage per component from (n, range bins, mean bins) cycle counts."""
+    r = 0.5 * (range_edges[1:] + range_edges[:-1])
+    m = 0.5 * (mean_edges[1:] + mean_edges[:-1])
+    k = curve["stress_per_load"]
+    n_fail = cycles_to_failure(0.5 * k * r[:, None], k * m[None, :], curve)
+    return (counts / n_fail[None]).sum(axis=(1, 2))
+
+
+# ---------- load sources ----------
+def inflow_blade_loads(path, chunk=CHUNK_SAMPLES):
+    """(dt, n, iterator of (rows, n) chunks): blade normal load at each inflow grid point."""
+    import turbulent_inflow as ti
+    arr, meta = ti.read_inflow(path)
+    u_tread = co.TREAD_SPEED_RATIO * meta["mean_speed_m_s"]
+    area = co.BLADE_AREA_M2 / arr.shape[1]             # each point carries its share of the blade
+    k = 0.5 * co.RHO_WATER * area * co.CN_MAX
+
+    def chunks():
+        for i in range(0, arr.shape[0], chunk):
+            w = np.asarray(arr[i:i + chunk, :, 0], dtype=np.float64) - u_tread
+            yield k * w * np.abs(w)
+    return meta["dt"], arr.shape[1], chunks()
+
+
+def synthetic_loads(n=N_COMPONENTS, dt=SYNTH_DT_S, duration_s=SYNTH_DURATION_S,
+                    chunk=CHUNK_SAMPLES, seed=SEED):
+    """(dt, n, iterator): random-phase multi-tone loads plus noise, per component."""
+    rng = np.random.default_rng(seed)
+    f = np.asarray(SYNTH_TONES_HZ)
+    a = np.asarray(SYNTH_TONE_AMP_N)[None, :] * rng.uniform(0.5, 1.5, (n, len(f)))
+    phase = rng.uniform(0.0, 2.0 * np.pi, (n, len(f)))
+    total = int(round(duration_s / dt))
+
+    amp = (a * np.exp(1j * phase)).T                     # (tones, n) complex amplitudes
+
+    def chunks():
+        for i in range(0, total, chunk):
+            t = dt * np.arange(i, min(i + chunk, total))
+            x = SYNTH_MEAN_N + (np.exp(2j * np.pi * t[:, None] * f[None]) @ amp).imag
+            yield x + SYNTH_NOISE_N * rng.standard_normal(x.shape)
+    return dt, n, chunks()
+
+
+def main():
+    if INFLOW_PATH:
+        dt, n, chunks = inflow_blade_loads(INFLOW_PATH)
+        source = INFLOW_PATH
+    else:
+        dt, n, chunks = synthetic_loads()
+        source = "synthetic"
+
+    first = next(chunks)
+    span = max(np.abs(first).max(), 1e-9) * 2.0
+    range_edges = np.linspace(0.0, 2.0 * span, RANGE_BINS + 1)
+    mean_edges = np.linspace(-span, span, MEAN_BINS + 1)
+    rf = StreamingRainflow(n, range_edges, mean_edges, gate=LOAD_GATE_N)
+
+    t0 = time.perf_counter()
+    rf.feed(first)
+    for x in chunks:
+        rf.feed(x)
+    counts = rf.finish()
+    elapsed = time.perf_counter() - t0
+
+    seconds = rf.samples * dt
+    cycles = counts.sum(axis=(1, 2))
+    print(f"{source}: {n:,} components x {rf.samples:,} samples ({seconds / 3600.0:.2f} h), "
+          f"{rf.turning_points:,} turning points, counted in {elapsed:.2f} s "
+          f"({n * rf.samples / elapsed / 1e6:.1f} M samples/s)")
+    print(f"cycles per component: mean {cycles.mean():,.0f}, max {cycles.max():,.0f}, "
+          f"max residual stack depth {rf.max_depth}\n")
+
+    print(f"{'part':<10} {'worst damage':>13} {'worst life y':>13} {'median life y':>14}")
+    for name, curve in SN_CURVES.items():
+        d = damage(counts, range_edges, mean_edges, curve)
+        with np.errstate(divide="ignore"):
+            life = seconds / SECONDS_PER_YEAR / d
+        print(f"{name:<10} {d.max():13.3e} {life.min():13.3g} {np.median(life):14.3g}")
+
+
+if __name__ == "__main__":
+    main()
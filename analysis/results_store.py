@@ -0,0 +1,391 @@
+"""
+Indexed results store for sweep, simulation and bake outputs
+
+WHAT THIS SCRIPT DOES
+---------------------
+Sweeps and simulations otherwise leave loose .npz / .json files behind that
+nobody can query. ResultsStore keeps them in one directory:
+
+    STORE_DIR/index.sqlite           one row per run: kind, content hash,
+                                     creation time, full parameters (JSON)
+                                     + indexed parameter and metric tables
+    STORE_DIR/arrays/<hash>/<name>.npy
+                                     one file per array (columnar), opened
+                                     memory-mapped only when accessed
+
+- Every run is keyed by a content hash of its kind, its parameters and
+  STORE_VERSION. get_or_compute() returns the stored run when the hash is
+  already present, so re-running a design point costs one index lookup.
+- Scalar parameters (nested dicts are flattened to "a.b" keys) and summary
+  metrics are stored row-wise with (key, value) indexes, so range queries
+  run in SQLite:
+
+      store.query("flat_plate_cycle",
+                  params={"period_n": 6},
+                  metrics={"power_w@1.2": (0.5, None)})
+
+  A metric can be tied to an operating point with "name@at" (e.g. the flow
+  speed), stored in its own indexed column.
+- Lists (WING_MAP, MECH_RATIOS, ...) are kept in the parameter JSON and in
+  the hash, but are not range-indexed.
+- Writers are safe across processes: arrays go to a temporary directory
+  that is renamed into place, the index row is inserted with INSERT OR
+  IGNORE in one transaction (the array directory is removed again if that
+  insert fails). Non-finite metrics are rejected before anything is written.
+
+geometry_params() collects the track geometry, gear and WING_MAP settings of
+tread_kinematics.py so every run records the rig it was computed for.
+
+HOW TO USE
+----------
+    python analysis/results_store.py
+
+Runs a small flat-plate design sweep (power_surrogate.reference_coefficients)
+through the store twice, then prints a range query and lazily loads one
+run's arrays.
+
+    store = ResultsStore(STORE_DIR)
+    run = store.get_or_compute("my_sweep", params, compute)   # compute(params) -> (metrics, arrays)
+    run.metrics, run.params, run["power_w"]
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+
+import numpy as np
+
+import tread_kinematics as tk
+
+# =========================
+# SETTINGS
+# =========================
+STORE_DIR = "results_store"
+
+# Bump when stored quantities change meaning, so old runs are not returned
+STORE_VERSION = 1
+
+DEMO_PERIOD_N = (4, 6, 8, 12)
+DEMO_BLADE_HEIGHT_MM = (30.0, 40.0, 50.0, 60.0)
+DEMO_DEPTH_RATIO = (0.6, 0.9, 1.2)
+DEMO_FLOW_SPEEDS_M_S = (0.6, 0.9, 1.2, 1.5, 2.0)
+DEMO_MIN_POWER_W = 1.0
+# =========================
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    created REAL NOT NULL,
+    params TEXT NOT NULL,
+    arrays TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS params (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    key TEXT NOT NULL,
+    num REAL,
+    text TEXT
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    name TEXT NOT NULL,
+    at REAL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_kind ON runs(kind);
+CREATE INDEX IF NOT EXISTS params_num ON params(key, num, run_id);
+CREATE INDEX IF NOT EXISTS params_text ON params(key, text, run_id);
+CREATE INDEX IF NOT EXISTS metrics_value ON metrics(name, at, value, run_id);
+"""
+
+
+def content_hash(kind, params):
+    blob = json.dumps([STORE_VERSION, kind, params], sort_keys=True, separators=(",", ":"), default=_jsonable)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:24]
+
+
+def _jsonable(v):
+    if isinstance(v, np.ndarray):
+        return v.tolist()
+    if isinstance(v, np.generic):
+        return v.item()
+    return str(v)
+
+
+def flatten(params, prefix=""):
+    """Nested dict -> {"a.b": scalar}; lists and arrays are skipped."""
+    out = {}
+    for k, v in params.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(flatten(v, key + "."))
+        elif isinstance(v, (bool, int, float, str, np.generic)):
+            out[key] = v.item() if isinstance(v, np.generic) else v
+    return out
+
+
+def split_metric(name):
+    """"power_w@1.2" -> ("power_w", 1.2); "power_w" -> ("power_w", None)."""
+    base, sep, at = name.partition("@")
+    return base, (float(at) if sep else None)
+
+
+def geometry_params():
+    """Track geometry, gear and WING_MAP settings of tread_kinematics.py."""
+    return {
+        "gear_teeth": tk.GEAR_TEETH,
+        "period_n": tk.PERIOD_N,
+        "special_at": tk.SPECIAL_AT,
+        "link_pitch_mm": tk.LINK_PITCH,
+        "link_count": tk.LINK_COUNT,
+        "track_radius_mm": tk.TRACK_RADIUS,
+        "track_center_distance_mm": tk.TRACK_CENTER_DISTANCE,
+        "cam_angle_sign": tk.CAM_ANGLE_SIGN,
+        "wing_map_smoothstep": tk.WING_MAP_SMOOTHSTEP,
+        "wing_map": [list(p) for p in tk.WING_MAP],
+        "mech_ratios": [list(r) for r in tk.MECH_RATIOS],
+    }
+
+
+class Run:
+    """One stored run; arrays are opened memory-mapped on first access."""
+
+    def __init__(self, store, row_id, digest, kind, created, params, arrays):
+        self.store = store
+        self.id = row_id
+        self.hash = digest
+        self.kind = kind
+        self.created = created
+        self.params = params
+        self.array_names = arrays
+        self._arrays = {}
+        self._metrics = None
+
+    @property
+    def metrics(self):
+        if self._metrics is None:
+            rows = self.store.db.execute("SELECT name, at, value FROM metrics WHERE run_id = ?", (self.id,))
+            self._metrics = {(n if at is None else f"{n}@{at:g}"): v for n, at, v in rows}
+        return self._metrics
+
+    def __getitem__(self, name):
+        if name not in self._arrays:
+            if name not in self.array_names:
+                raise KeyError(f"run {self.hash} has no array {name!r}")
+            self._arrays[name] = np.load(os.path.join(self.store.array_dir(self.hash), name + ".npy"), mmap_mode="r")
+        return self._arrays[name]
+
+    def __repr__(self):
+        return f"Run({self.kind}, {self.hash}, arrays={self.array_names})"
+
+
+class ResultsStore:
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        os.makedirs(os.path.join(root, "arrays"), exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(root, "index.sqlite"), timeout=60.0)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def array_dir(self, digest):
+        return os.path.join(self.root, "arrays", digest)
+
+    def _run(self, row):
+        row_id, digest, kind, created, params, arrays = row
+        return Run(self, row_id, digest, kind, created, json.loads(params), json.loads(arrays))
+
+    def get(self, kind, params):
+        """Stored run for exactly these parameters, or None."""
+        row = self.db.execute("SELECT id, hash, kind, created, params, arrays FROM runs WHERE hash = ?",
+                              (content_hash(kind, params),)).fetchone()
+        return self._run(row) if row else None
+
+    def put(self, kind, params, metrics, arrays=None):
+        """
+        Store one run (no-op if the same hash is already stored). Returns the
+        Run. Metrics must be finite: SQLite keeps NaN as NULL, which the
+        metric index cannot hold, so they are rejected before anything is
+        written.
+        """
+        bad = sorted(k for k, v in metrics.items() if not np.isfinite(float(v)))
+        if bad:
+            raise ValueError(f"Non-finite metrics for {kind}: {', '.join(bad)}")
+        digest = content_hash(kind, params)
+        arrays = arrays or {}
+        final = self.array_dir(digest)
+        created = False
+        if arrays and not os.path.isdir(final):
+            tmp = f"{final}.{os.getpid()}.tmp"
+            os.makedirs(tmp, exist_ok=True)
+            for name, a in arrays.items():
+                np.save(os.path.join(tmp, name + ".npy"), np.asarray(a))
+            try:
+                os.rename(tmp, final)
+                created = True
+            except OSError:
+                shutil.rmtree(tmp, ignore_errors=True)      # another writer got there first
+
+        blob = json.dumps(params, sort_keys=True, default=_jsonable)
+        try:
+            with self.db:
+                cur = self.db.execute(
+                    "INSERT OR IGNORE INTO runs (hash, kind, created, params, arrays) VALUES (?, ?, ?, ?, ?)",
+                    (digest, kind, time.time(), blob, json.dumps(sorted(arrays))))
+                if cur.rowcount:
+                    run_id = cur.lastrowid
+                    self.db.executemany(
+                        "INSERT INTO params (run_id, key, num, text) VALUES (?, ?, ?, ?)",
+                        [(run_id, k, float(v), None) if not isinstance(v, str) else (run_id, k, None, v)
+                         for k, v in flatten(params).items()])
+                    self.db.executemany(
+                        "INSERT INTO metrics (run_id, name, at, value) VALUES (?, ?, ?, ?)",
+                        [(run_id, *split_metric(k), float(v)) for k, v in metrics.items()])
+        except Exception:
+            if created:
+                shutil.rmtree(final, ignore_errors=True)    # never leave arrays without an index row
+            raise
+        return self.get(kind, params)
+
+    def get_or_compute(self, kind, params, compute):
+        """
+        Stored run for params, or compute(params) -> (metrics, arrays) stored
+        and returned. The second return value tells whether it was computed.
+        """
+        run = self.get(kind, params)
+        if run is not None:
+            return run, False
+        metrics, arrays = compute(params)
+        return self.put(kind, params, metrics, arrays), True
+
+    def query(self, kind=None, params=None, metrics=None, order_by=None, limit=None):
+        """
+        Runs matching all conditions. params / metrics map a key to a value
+        (equality) or a (low, high) tuple with None for an open end; metric
+        keys may carry "@at". order_by is a metric key (prefix "-" for
+        descending).
+        """
+        sql = ["SELECT r.id, r.hash, r.kind, r.created, r.params, r.arrays FROM runs r"]
+        where, args = [], []
+        if kind is not None:
+            where.append("r.kind = ?")
+            args.append(kind)
+        for key, cond in (params or {}).items():
+            if isinstance(cond, str):
+                where.append("EXISTS (SELECT 1 FROM params p WHERE p.run_id = r.id AND p.key = ? AND p.text = ?)")
+                args += [key, cond]
+                continue
+            clause, vals = _range("p.num", cond)
+            where.append(f"EXISTS (SELECT 1 FROM params p WHERE p.run_id = r.id AND p.key = ? AND {clause})")
+            args += [key, *vals]
+        for key, cond in (metrics or {}).items():
+            name, at = split_metric(key)
+            clause, vals = _range("m.value", cond)
+            at_clause = "m.at IS NULL" if at is None else "m.at = ?"
+            where.append(f"EXISTS (SELECT 1 FROM metrics m WHERE m.run_id = r.id AND m.name = ? "
+                         f"AND {at_clause} AND {clause})")
+            args += [name] + ([] if at is None else [at]) + vals
+        if where:
+            sql.append("WHERE " + " AND ".join(where))
+        if order_by:
+            name, at = split_metric(order_by.lstrip("-"))
+            sql.append("ORDER BY (SELECT m.value FROM metrics m WHERE m.run_id = r.id AND m.name = ? AND "
+                       + ("m.at IS NULL" if at is None else "m.at = ?") + ")"
+                       + (" DESC" if order_by.startswith("-") else ""))
+            args += [name] + ([] if at is None else [at])
+        if limit:
+            sql.append(f"LIMIT {int(limit)}")
+        return [self._run(row) for row in self.db.execute(" ".join(sql), args)]
+
+    def count(self, kind=None):
+        if kind is None:
+            return self.db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        return self.db.execute("SELECT COUNT(*) FROM runs WHERE kind = ?", (kind,)).fetchone()[0]
+
+
+def _range(column, cond):
+    if isinstance(cond, tuple):
+        lo, hi = cond
+        parts, vals = [], []
+        if lo is not None:
+            parts.append(f"{column} >= ?")
+            vals.append(float(lo))
+        if hi is not None:
+            parts.append(f"{column} <= ?")
+            vals.append(float(hi))
+        return (" AND ".join(parts) or "1"), vals
+    return f"{column} = ?", [float(cond)]
+
+
+# ---------- demo sweep ----------
+def flat_plate_design(params):
+    """Power curve of one design with the power_surrogate.py reference model."""
+    import power_surrogate as ps
+
+    d = params["design"]
+    x = np.array([[d[name] for name in ps.NAMES]])
+    c = ps.reference_coefficients(x)
+    q, n_blades = ps.blade_scales(x)
+    U = np.asarray(params["flow_speeds_m_s"], dtype=np.float64)
+    power = q[0] * n_blades[0] * U ** 3 * c["c_p"][0]
+    force = q[0] * U ** 2 * c["c_f"][0]
+    metrics = {"c_p": c["c_p"][0], "best_lambda": c["lambda"][0]}
+    for u, p, f in zip(U, power, force):
+        metrics[f"power_w@{u:g}"] = p
+        metrics[f"peak_force_n@{u:g}"] = f
+    return metrics, {"flow_speed_m_s": U, "power_w": power, "peak_force_n": force}
+
+
+def demo_params():
+    for period_n in DEMO_PERIOD_N:
+        for height in DEMO_BLADE_HEIGHT_MM:
+            for depth in DEMO_DEPTH_RATIO:
+                yield {
+                    "geometry": geometry_params(),
+                    "design": {"period_n": float(period_n), "gear_teeth": float(tk.GEAR_TEETH),
+                               "blade_height_mm": height, "capture_angle": 270.0,
+                               "wing_phase": 0.0, "depth_ratio": depth},
+                    "flow_speeds_m_s": list(DEMO_FLOW_SPEEDS_M_S),
+                }
+
+
+def main():
+    store = ResultsStore(STORE_DIR)
+    for attempt in ("first pass", "second pass"):
+        t0 = time.perf_counter()
+        computed = reused = 0
+        for params in demo_params():
+            _, new = store.get_or_compute("flat_plate_cycle", params, flat_plate_design)
+            computed += new
+            reused += not new
+        dt = time.perf_counter() - t0
+        print(f"{attempt}: {computed} computed, {reused} from the store "
+              f"in {1e3 * dt:.0f} ms")
+
+    at = 1.2
+    t0 = time.perf_counter()
+    hits = store.query("flat_plate_cycle", params={"design.period_n": 6},
+                       metrics={f"power_w@{at:g}": (DEMO_MIN_POWER_W, None)}, order_by=f"-power_w@{at:g}")
+    dt = time.perf_counter() - t0
+    print(f"\nperiod_n = 6 and power > {DEMO_MIN_POWER_W:g} W at {at:g} m/s: {len(hits)} runs "
+          f"({1e3 * dt:.1f} ms)")
+    print(f"{'hash':<24} {'height mm':>9} {'depth':>6} {'power W':>8} {'c_p':>7}")
+    for r in hits:
+        d = r.params["design"]
+        print(f"{r.hash:<24} {d['blade_height_mm']:9.0f} {d['depth_ratio']:6.2f} "
+              f"{r.metrics[f'power_w@{at:g}']:8.2f} {r.metrics['c_p']:7.4f}")
+    if hits:
+        r = hits[0]
+        print(f"\nbest run arrays (lazy, memory-mapped): {r.array_names}")
+        print("power curve: " + ", ".join(f"{u:g} m/s {p:.2f} W" for u, p in zip(r["flow_speed_m_s"], r["power_w"])))
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Monte Carlo ROI and payback engine (NumPy)
+
+WHAT THIS SCRIPT DOES
+---------------------
+Turns the single-value profitability model of docs/profitability.md
+
+    E = P × H,   R = E × Cₑ,   Cₛ ≤ R × T
+
+into a probabilistic one. For every site it samples distributions for
+
+- flow velocity (effective, energy-weighted m/s at the capture region)
+- water-to-wire coefficient Cp (power-model sites only)
+- availability (fraction of the year the unit is producing)
+- electricity price Cₑ
+- total installed system cost Cₛ
+- annual output degradation
+
+and evaluates annual energy, revenue and payback time for millions of draws
+as NumPy arrays, CHUNK_SIZE draws at a time so memory stays bounded.
+
+Reported per site:
+- P10 / P50 / P90 of annual energy and revenue
+- P50 / P90 payback (years). P90 payback is the 90th percentile: nine draws
+  out of ten pay back within that time.
+- probability of paying back within LIFETIME_YEARS
+- sensitivity ranking (Spearman rank correlation of each input with payback,
+  computed on the first SENSITIVITY_SAMPLES draws)
+
+POWER MODEL
+-----------
+P = 0.5 × rho × A × v³ × Cp / 1000   (kW)
+
+Cp is the overall water-to-wire coefficient of the unit and A the capture
+area of one unit. Both are per-site inputs, so a site catalog can describe
+different unit sizes or several units (UNITS multiplies A and Cₛ).
+
+PAYBACK WITH DEGRADATION
+------------------------
+With first-year revenue R and degradation d per year, cumulative revenue after
+n years is R × (1 - (1 - d)^n) / d, so the (fractional) payback time is
+
+    n = ln(1 - Cₛ × d / R) / ln(1 - d)
+
+and the system never pays back when Cₛ × d / R ≥ 1 (reported as inf).
+
+MEASURED FLOW SERIES
+--------------------
+If a site dict carries "energy_kwh" (annual energy of all its units at full
+availability, e.g. computed from a measured flow series by
+analysis/portfolio.py), that value replaces the power model. The "flow"
+distribution is then a velocity scale factor around 1.0 for year-to-year
+variation, and energy = energy_kwh × flow³ × availability.
+
+HOW TO USE
+----------
+    python analysis/roi_monte_carlo.py
+
+Edit SITES (or call evaluate_site() from another script, e.g. a portfolio
+evaluator) to describe candidate sites. Distributions are tuples:
+
+    ("fixed", value)
+    ("uniform", low, high)
+    ("normal", mean, sd)              # truncated at 0 (negative draws are redrawn)
+    ("lognormal", median, sigma)
+    ("triangular", low, mode, high)
+    ("beta", mean, concentration)     # for fractions in [0, 1]
+"""
+
+import math
+import time
+import zlib
+
+import numpy as np
+
+# =========================
+# SETTINGS
+# =========================
+N_DRAWS = 2_000_000
+CHUNK_SIZE = 250_000
+SENSITIVITY_SAMPLES = 200_000
+SEED = 20240
+
+RHO_WATER = 1000.0          # kg/m³
+HOURS_PER_YEAR = 8760.0
+LIFETIME_YEARS = 25.0
+
+PERCENTILES = (10.0, 50.0, 90.0)
+
+# Sampled inputs, in the order used for the sensitivity ranking ("cp" only
+# for power-model sites)
+INPUT_NAMES = ("flow", "cp", "availability", "price", "cost", "degradation")
+MAX_TRUNCATED_REJECT = 0.99     # refuse normals with more than this share below 0
+
+SITES = [
+    {
+        "name": "example_river",
+        "capture_area_m2": 0.8,
+        "cp": ("triangular", 0.12, 0.18, 0.25),
+        "units": 1,
+        "flow": ("lognormal", 1.3, 0.15),
+        "availability": ("beta", 0.70, 40.0),
+        "price": ("triangular", 0.05, 0.15, 0.30),
+        "cost": ("normal", 10_000.0, 1_500.0),
+        "degradation": ("uniform", 0.0, 0.02),
+    },
+    {
+        "name": "example_channel",
+        "capture_area_m2": 0.8,
+        "cp": ("triangular", 0.12, 0.18, 0.25),
+        "units": 3,
+        "flow": ("lognormal", 1.8, 0.10),
+        "availability": ("beta", 0.85, 60.0),
+        "price": ("uniform", 0.10, 0.20),
+        "cost": ("normal", 9_000.0, 1_000.0),
+        "degradation": ("uniform", 0.0, 0.015),
+    },
+]
+# =========================
+
+
+def site_seed(name: str, seed: int = SEED) -> int:
+    """Stable per-site seed so results do not depend on catalog order."""
+    return (int(seed) * 1_000_003 + zlib.crc32(name.encode("utf-8"))) & 0xFFFFFFFF
+
+
+def sample(rng, spec, n):
+    """Draw n samples from a distribution tuple (see module docstring)."""
+    if isinstance(spec, (int, float)):
+        spec = ("fixed", spec)
+    kind = spec[0].lower()
+    args = [float(a) for a in spec[1:]]
+
+    if kind == "fixed":
+        return np.full(n, args[0])
+    if kind == "uniform":
+        return rng.uniform(args[0], args[1], n)
+    if kind == "normal":
+        return truncated_normal(rng, args[0], args[1], n)
+    if kind == "lognormal":
+        return args[0] * np.exp(rng.normal(0.0, args[1], n))
+    if kind == "triangular":
+        return rng.triangular(args[0], args[1], args[2], n)
+    if kind == "beta":
+        mean, conc = args
+        if not (0.0 < mean < 1.0):
+            raise ValueError(f"beta mean must be in (0, 1), got {mean}")
+        return rng.beta(mean * conc, (1.0 - mean) * conc, n)
+    raise ValueError(f"Unknown distribution: {spec[0]}")
+
+
+def truncated_normal(rng, mean, sd, n):
+    """Normal(mean, sd) conditioned on >= 0, by redrawing the negative samples."""
+    if sd <= 0.0:
+        return np.full(n, max(mean, 0.0))
+    if math.erfc(mean / (sd * math.sqrt(2.0))) / 2.0 > MAX_TRUNCATED_REJECT:
+        raise ValueError(f"normal({mean}, {sd}) is almost entirely below 0, use another distribution")
+    x = rng.normal(mean, sd, n)
+    bad = np.flatnonzero(x < 0.0)
+    while len(bad):
+        x[bad] = rng.normal(mean, sd, len(bad))
+        bad = bad[x[bad] < 0.0]
+    return x
+
+
+def mean_power_kw(flow, area_m2, cp):
+    """P = 0.5 × rho × A × v³ × Cp, in kW."""
+    return 0.5 * RHO_WATER * area_m2 * flow ** 3 * cp / 1000.0
+
+
+def payback_years(cost, revenue, degradation):
+    """Fractional payback time with geometric revenue degradation (inf = never)."""
+    cost = np.asarray(cost, dtype=np.float64)
+    revenue = np.asarray(revenue, dtype=np.float64)
+    d = np.asarray(degradation, dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        simple = np.where(revenue > 0.0, cost / revenue, np.inf)
+        x = cost * d / revenue
+        degraded = np.log1p(-x) / np.log1p(-d)
+        degraded = np.where((x < 1.0) & (revenue > 0.0), degraded, np.inf)
+    return np.where(d > 1e-12, degraded, simple)
+
+
+def evaluate_chunk(rng, site, n):
+    """Sample n draws for one site. Returns (inputs dict, energy, revenue, payback)."""
+    units = float(site.get("units", 1))
+
+    inputs = {
+        "flow": sample(rng, site["flow"], n),
+        "availability": np.clip(sample(rng, site["availability"], n), 0.0, 1.0),
+        "price": sample(rng, site["price"], n),
+        "cost": sample(rng, site["cost"], n) * units,
+        "degradation": np.clip(sample(rng, site.get("degradation", 0.0), n), 0.0, 0.999),
+    }
+    if "energy_kwh" in site:
+        energy = float(site["energy_kwh"]) * inputs["flow"] ** 3 * inputs["availability"]
+    else:
+        area = float(site["capture_area_m2"]) * units
+        inputs["cp"] = sample(rng, site.get("cp", 0.2), n)
+        power_kw = mean_power_kw(inputs["flow"], area, inputs["cp"])
+        energy = power_kw * HOURS_PER_YEAR * inputs["availability"]   # E = P × H
+    revenue = energy * inputs["price"]                                # R = E × Cₑ
+    payback = payback_years(inputs["cost"], revenue, inputs["degradation"])
+    return inputs, energy, revenue, payback
+
+
+def rank(x):
+    """Ordinal ranks (ties are rare for continuous samples)."""
+    r = np.empty(len(x), dtype=np.float64)
+    r[np.argsort(x, kind="stable")] = np.arange(len(x), dtype=np.float64)
+    return r
+
+
+def spearman_ranking(inputs, output):
+    """Spearman correlation of each input with output, sorted by |rho|."""
+    # inf paybacks rank above every finite value, which is what we want
+    ry = rank(output)
+    ry -= ry.mean()
+    ny = np.sqrt(np.dot(ry, ry))
+
+    out = []
+    for name in (k for k in INPUT_NAMES if k in inputs):
+        x = inputs[name]
+        if np.ptp(x) == 0.0:
+            out.append((name, 0.0))
+            continue
+        rx = rank(x)
+        rx -= rx.mean()
+        rho = float(np.dot(rx, ry) / (np.sqrt(np.dot(rx, rx)) * ny))
+        out.append((name, rho))
+    out.sort(key=lambda t: -abs(t[1]))
+    return out
+
+
+def evaluate_site(site, n_draws=N_DRAWS, chunk_size=CHUNK_SIZE, seed=SEED):
+    """Run the Monte Carlo for one site and return a summary dict."""
+    rng = np.random.default_rng(site_seed(site["name"], seed))
+
+    energy_all = np.empty(n_draws, dtype=np.float32)
+    revenue_all = np.empty(n_draws, dtype=np.float32)
+    payback_all = np.empty(n_draws, dtype=np.float32)
+
+    sens_inputs = {k: [] for k in INPUT_NAMES}
+    sens_payback = []
+    sens_left = min(SENSITIVITY_SAMPLES, n_draws)
+
+    done = 0
+    while done < n_draws:
+        n = min(chunk_size, n_draws - done)
+        inputs, energy, revenue, payback = evaluate_chunk(rng, site, n)
+
+        energy_all[done:done + n] = energy
+        revenue_all[done:done + n] = revenue
+        payback_all[done:done + n] = payback
+
+        if sens_left > 0:
+            k = min(sens_left, n)
+            for name in inputs:
+                sens_inputs[name].append(inputs[name][:k])
+            sens_payback.append(payback[:k])
+            sens_left -= k
+
+        done += n
+
+    # "higher" never interpolates between finite and inf paybacks
+    pct = np.asarray(PERCENTILES)
+    e_p = np.percentile(energy_all, pct)
+    r_p = np.percentile(revenue_all, pct)
+    pb_p = np.percentile(payback_all, [50.0, 90.0], method="higher")
+
+    sens = spearman_ranking(
+        {k: np.concatenate(v) for k, v in sens_inputs.items() if v},
+        np.concatenate(sens_payback),
+    )
+
+    return {
+        "name": site["name"],
+        "draws": int(n_draws),
+        "energy_kwh": {f"P{int(p)}": float(v) for p, v in zip(PERCENTILES, e_p)},
+        "revenue": {f"P{int(p)}": float(v) for p, v in zip(PERCENTILES, r_p)},
+        "payback_years": {"P50": float(pb_p[0]), "P90": float(pb_p[1])},
+        "prob_payback_within_lifetime": float(np.mean(payback_all <= LIFETIME_YEARS)),
+        "sensitivity": sens,
+    }
+
+
+def format_years(x: float) -> str:
+    return "never" if not math.isfinite(x) else f"{x:.1f}"
+
+
+def main():
+    for site in SITES:
+        t0 = time.perf_counter()
+        res = evaluate_site(site)
+        dt = time.perf_counter() - t0
+
+        e = res["energy_kwh"]
+        r = res["revenue"]
+        pb = res["payback_years"]
+        print(f"== {res['name']} ({res['draws']:,} draws, {dt:.2f} s)")
+        print(f"   energy  kWh/yr  P10={e['P10']:,.0f}  P50={e['P50']:,.0f}  P90={e['P90']:,.0f}")
+        print(f"   revenue  /yr    P10={r['P10']:,.0f}  P50={r['P50']:,.0f}  P90={r['P90']:,.0f}")
+        print(f"   payback  years  P50={format_years(pb['P50'])}  P90={format_years(pb['P90'])}"
+              f"  P(≤{LIFETIME_YEARS:g} y)={res['prob_payback_within_lifetime']:.1%}")
+        print("   sensitivity (Spearman vs payback): "
+              + ", ".join(f"{n}={rho:+.2f}" for n, rho in res["sensitivity"]))
+
+
+if __name__ == "__main__":
+    main()
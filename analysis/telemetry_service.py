@@ -0,0 +1,398 @@
+"""
+Async telemetry ingestion service with per-unit ring buffers
+
+WHAT THIS SCRIPT DOES
+---------------------
+Live view of every deployed tread:
+
+- Ingests binary telemetry packets (gear angle, tread speed, torque,
+  generator power) from many units over TCP (asyncio). A file replay source
+  stands in for real units during development.
+- Keeps a fixed-size NumPy ring buffer per unit (RING_SAMPLES), so memory is
+  bounded no matter how long the service runs.
+- Downsamples every DOWNSAMPLE samples into block means. Those go into a
+  longer history ring and, optionally, are appended to STORE_DIR/<unit>.bin.
+- On demand, reconstructs blade / wing poses of a unit from its latest gear
+  angle through the tread kinematics (analysis/tread_kinematics.py: gear
+  radius from GEAR_TEETH, PERIOD_N connector layout, prepared WING_MAP).
+
+PACKET FORMAT
+-------------
+Little-endian records of PACKET_DTYPE (28 bytes):
+
+    unit u4, t f8 (s), angle f4 (rad, may wrap), speed f4 (m/s),
+    torque f4 (N·m), power f4 (W)
+
+A connection may carry packets of several units. Partial records at the end
+of a read are kept for the next read.
+
+QUERIES
+-------
+A line protocol on QUERY_PORT answers one JSON line per request:
+
+    STATS            units (and units refused over MAX_UNITS), packets, rates, memory in use
+    LATEST <unit>    newest raw sample
+    POSE <unit>      blade positions (loop u/v, mm) and wing angles (deg)
+    HISTORY <unit>   downsampled history (oldest first)
+
+HOW TO USE
+----------
+    python analysis/telemetry_service.py
+
+With SIMULATE_UNITS > 0 the script also starts that many simulated units
+streaming at SIMULATE_RATE_HZ for SIMULATE_SECONDS and prints throughput.
+"""
+
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+
+import tread_kinematics as tk
+
+# =========================
+# SETTINGS
+# =========================
+HOST = "127.0.0.1"
+INGEST_PORT = 50210
+QUERY_PORT = 50211
+
+RING_SAMPLES = 4096             # raw samples kept per unit (~4 s at 1 kHz)
+DOWNSAMPLE = 100                # raw samples per stored block mean
+HISTORY_SAMPLES = 8640          # downsampled samples kept per unit (24 h at 10 s)
+MAX_UNITS = 1024
+READ_BYTES = 1 << 16
+
+STORE_DIR = None                # e.g. "telemetry_store" to append downsampled data to disk
+
+SIMULATE_UNITS = 200
+SIMULATE_RATE_HZ = 1000.0
+SIMULATE_SECONDS = 5.0
+SIMULATE_BATCH_S = 0.05
+# =========================
+
+PACKET_DTYPE = np.dtype([
+    ("unit", "<u4"),
+    ("t", "<f8"),
+    ("angle", "<f4"),
+    ("speed", "<f4"),
+    ("torque", "<f4"),
+    ("power", "<f4"),
+])
+FIELDS = ("t", "angle", "speed", "torque", "power")
+SAMPLE_DTYPE = np.dtype([(f, "<f8") for f in FIELDS])
+
+
+class Ring:
+    """Fixed-capacity ring of SAMPLE_DTYPE records with vectorized batch writes."""
+
+    def __init__(self, capacity):
+        self.buf = np.zeros(capacity, dtype=SAMPLE_DTYPE)
+        self.head = 0       # next write position
+        self.count = 0
+
+    def extend(self, rec):
+        n = len(rec)
+        cap = len(self.buf)
+        if n >= cap:
+            rec = rec[-cap:]
+            n = cap
+        end = self.head + n
+        if end <= cap:
+            self.buf[self.head:end] = rec
+        else:
+            k = cap - self.head
+            self.buf[self.head:] = rec[:k]
+            self.buf[:end - cap] = rec[k:]
+        self.head = end % cap
+        self.count = min(self.count + n, cap)
+
+    def latest(self):
+        return self.buf[(self.head - 1) % len(self.buf)] if self.count else None
+
+    def ordered(self):
+        """Contents oldest first (a copy)."""
+        if self.count < len(self.buf):
+            return self.buf[:self.count].copy()
+        return np.concatenate([self.buf[self.head:], self.buf[:self.head]])
+
+
+class UnitState:
+    """Raw ring, downsampling accumulator and history ring of one unit."""
+
+    def __init__(self, unit):
+        self.unit = unit
+        self.raw = Ring(RING_SAMPLES)
+        self.history = Ring(HISTORY_SAMPLES)
+        self.pending = np.zeros(DOWNSAMPLE, dtype=SAMPLE_DTYPE)
+        self.n_pending = 0
+        self.last_angle = None      # unwrapped angle of the previous sample
+        self.packets = 0
+
+    def unwrap(self, angle):
+        a = angle.astype(np.float64)
+        if self.last_angle is None:
+            a = np.unwrap(a)
+        else:
+            a = np.unwrap(np.concatenate(([self.last_angle], a)))[1:]
+        self.last_angle = float(a[-1])
+        return a
+
+    def ingest(self, pk):
+        rec = np.empty(len(pk), dtype=SAMPLE_DTYPE)
+        for f in FIELDS:
+            rec[f] = pk[f]
+        rec["angle"] = self.unwrap(pk["angle"])
+        self.raw.extend(rec)
+        self.packets += len(rec)
+        return self.downsample(rec)
+
+    def downsample(self, rec):
+        """Block means of DOWNSAMPLE samples; returns the new blocks (maybe empty)."""
+        total = self.n_pending + len(rec)
+        n_blocks = total // DOWNSAMPLE
+        if n_blocks == 0:
+            self.pending[self.n_pending:total] = rec
+            self.n_pending = total
+            return rec[:0]
+
+        joined = np.concatenate([self.pending[:self.n_pending], rec])
+        full = joined[:n_blocks * DOWNSAMPLE]
+        blocks = np.empty(n_blocks, dtype=SAMPLE_DTYPE)
+        for f in FIELDS:
+            blocks[f] = full[f].reshape(n_blocks, DOWNSAMPLE).mean(axis=1)
+
+        rest = joined[n_blocks * DOWNSAMPLE:]
+        self.pending[:len(rest)] = rest
+        self.n_pending = len(rest)
+        self.history.extend(blocks)
+        return blocks
+
+
+class TelemetryService:
+    def __init__(self):
+        self.units = {}
+        self.refused = {}               # unit -> packets dropped over MAX_UNITS
+        self.packets = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self.kin = self.build_kinematics()
+        if STORE_DIR:
+            os.makedirs(STORE_DIR, exist_ok=True)
+
+    # ---------- ingestion ----------
+    def unit_state(self, unit):
+        st = self.units.get(unit)
+        if st is None:
+            if len(self.units) >= MAX_UNITS:
+                return None
+            st = self.units[unit] = UnitState(unit)
+        return st
+
+    def ingest_packets(self, pk):
+        self.packets += len(pk)
+        units = pk["unit"]
+        if units[0] == units[-1] and np.all(units == units[0]):
+            groups = [(int(units[0]), pk)]
+        else:
+            order = np.argsort(units, kind="stable")
+            uniq, starts = np.unique(units[order], return_index=True)
+            bounds = list(starts[1:]) + [len(order)]
+            groups = [(int(u), pk[order[s:e]]) for u, s, e in zip(uniq, starts, bounds)]
+
+        for unit, rows in groups:
+            st = self.unit_state(unit)
+            if st is None:
+                if unit not in self.refused:
+                    print(f"Refusing unit {unit}: MAX_UNITS = {MAX_UNITS} units already tracked")
+                self.refused[unit] = self.refused.get(unit, 0) + len(rows)
+                continue
+            blocks = st.ingest(rows)
+            if STORE_DIR and len(blocks):
+                with open(os.path.join(STORE_DIR, f"{unit}.bin"), "ab") as fh:
+                    fh.write(blocks.tobytes())
+
+    async def handle_ingest(self, reader, writer):
+        leftover = b""
+        size = PACKET_DTYPE.itemsize
+        try:
+            while True:
+                data = await reader.read(READ_BYTES)
+                if not data:
+                    break
+                self.bytes += len(data)
+                data = leftover + data
+                n = len(data) // size
+                if n:
+                    self.ingest_packets(np.frombuffer(data, dtype=PACKET_DTYPE, count=n))
+                leftover = data[n * size:]
+        finally:
+            writer.close()
+
+    async def replay_file(self, path, rate_hz=None):
+        """Stand-in source: feed a recorded packet file, optionally paced at rate_hz."""
+        size = PACKET_DTYPE.itemsize
+        chunk = max(1, READ_BYTES // size)
+        with open(path, "rb") as fh:
+            while True:
+                buf = fh.read(chunk * size)
+                n = len(buf) // size
+                if n == 0:
+                    return
+                self.ingest_packets(np.frombuffer(buf, dtype=PACKET_DTYPE, count=n))
+                await asyncio.sleep(n / rate_hz if rate_hz else 0)
+
+    # ---------- kinematic reconstruction ----------
+    @staticmethod
+    def build_kinematics():
+        pts2, seglen, cum, total = tk.polyline_table(tk.two_gear_loop())
+        knots_t, knots_a = tk.prepare_wing_map(tk.WING_MAP)
+        return {
+            "table": (pts2, seglen, cum, total),
+            "count": tk.LINK_COUNT,
+            "blades": tk.blade_link_indices(tk.LINK_COUNT),
+            "gear_r": float(tk.gear_radius(tk.LINK_PITCH, tk.GEAR_TEETH)),
+            "knots": (knots_t, knots_a),
+        }
+
+    def pose(self, unit):
+        """Blade positions and wing angles from the unit's latest (unwrapped) gear angle."""
+        st = self.units.get(unit)
+        if st is None or st.raw.count == 0:
+            return None
+        latest = st.raw.latest()
+        kin = self.kin
+        pts2, seglen, cum, total = kin["table"]
+
+        traveled = float(latest["angle"]) * kin["gear_r"] * tk.CHAIN_SIGN
+        dist = kin["blades"] * tk.LINK_PITCH + traveled
+        pos = tk.eval_at_distance(pts2, seglen, cum, total, dist)
+        t = (dist % total) / total
+        ang = tk.wing_angle(t, *kin["knots"]) * tk.CAM_ANGLE_SIGN
+        return {
+            "unit": unit,
+            "t": float(latest["t"]),
+            "speed": float(latest["speed"]),
+            "blade_link": kin["blades"].tolist(),
+            "blade_uv": np.round(pos, 3).tolist(),
+            "wing_deg": np.round(ang % 360.0, 2).tolist(),
+        }
+
+    # ---------- queries ----------
+    def stats(self):
+        dt = max(time.perf_counter() - self.started, 1e-9)
+        mem = sum(st.raw.buf.nbytes + st.history.buf.nbytes + st.pending.nbytes
+                  for st in self.units.values())
+        return {
+            "units": len(self.units),
+            "refused_units": len(self.refused),
+            "refused_packets": sum(self.refused.values()),
+            "packets": self.packets,
+            "packets_per_s": self.packets / dt,
+            "mb_per_s": self.bytes / dt / 1e6,
+            "buffer_mb": mem / 1e6,
+        }
+
+    def query(self, line):
+        parts = line.split()
+        if not parts:
+            return {"error": "empty query"}
+        cmd = parts[0].upper()
+        if cmd == "STATS":
+            return self.stats()
+        if len(parts) < 2:
+            return {"error": f"{cmd} needs a unit id"}
+        try:
+            unit = int(parts[1])
+        except ValueError:
+            return {"error": f"bad unit id {parts[1]!r}, expected an integer"}
+        st = self.units.get(unit)
+        if st is None and unit in self.refused:
+            return {"error": f"unit {unit} refused, MAX_UNITS = {MAX_UNITS} reached"}
+        if st is None:
+            return {"error": f"unknown unit {unit}"}
+        if cmd == "LATEST":
+            rec = st.raw.latest()
+            return {f: float(rec[f]) for f in FIELDS}
+        if cmd == "POSE":
+            return self.pose(unit)
+        if cmd == "HISTORY":
+            h = st.history.ordered()
+            return {f: h[f].tolist() for f in FIELDS}
+        return {"error": f"unknown command {cmd}"}
+
+    async def handle_query(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write((json.dumps(self.query(line.decode(errors="replace").strip())) + "\n").encode())
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+async def simulated_unit(unit, rate_hz, seconds, batch_s):
+    """One fake tread: constant speed with noise, wrapped encoder angle."""
+    _, writer = await asyncio.open_connection(HOST, INGEST_PORT)
+    rng = np.random.default_rng(unit)
+    gear_r_m = float(tk.gear_radius()) / 1000.0
+    speed = rng.uniform(0.2, 0.5)
+    n = max(1, int(rate_hz * batch_s))
+    t = 0.0
+    angle = 0.0
+    pk = np.zeros(n, dtype=PACKET_DTYPE)
+    pk["unit"] = unit
+    try:
+        for _ in range(int(seconds / batch_s)):
+            ts = t + np.arange(n) / rate_hz
+            v = speed + 0.02 * rng.standard_normal(n)
+            ang = angle + np.cumsum(v / rate_hz) / gear_r_m
+            pk["t"] = ts
+            pk["speed"] = v
+            pk["angle"] = np.mod(ang, 2.0 * np.pi)
+            pk["torque"] = 2.0 + 0.1 * rng.standard_normal(n)
+            pk["power"] = pk["torque"] * v / gear_r_m
+            writer.write(pk.tobytes())
+            await writer.drain()
+            t = ts[-1] + 1.0 / rate_hz
+            angle = ang[-1]
+            await asyncio.sleep(batch_s)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run(simulate_units=SIMULATE_UNITS):
+    svc = TelemetryService()
+    ingest = await asyncio.start_server(svc.handle_ingest, HOST, INGEST_PORT)
+    query = await asyncio.start_server(svc.handle_query, HOST, QUERY_PORT)
+    print(f"Ingest on {HOST}:{INGEST_PORT}, queries on {HOST}:{QUERY_PORT}")
+
+    async with ingest, query:
+        if simulate_units <= 0:
+            await asyncio.gather(ingest.serve_forever(), query.serve_forever())
+            return
+
+        await asyncio.gather(*[
+            simulated_unit(u, SIMULATE_RATE_HZ, SIMULATE_SECONDS, SIMULATE_BATCH_S)
+            for u in range(simulate_units)
+        ])
+        await asyncio.sleep(0.2)
+
+        s = svc.stats()
+        print(f"{s['units']} units, {s['packets']:,} packets, {s['packets_per_s']:,.0f} packets/s, "
+              f"buffers {s['buffer_mb']:.1f} MB")
+        pose = svc.pose(0)
+        print(f"unit 0 pose: {len(pose['blade_link'])} blades, wing angles {pose['wing_deg'][:4]} ...")
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Manufacturing-tolerance Monte Carlo on link pitch and joint positions
+
+WHAT THIS SCRIPT DOES
+---------------------
+create_moving_parts.py bakes every link with the one pitch measured between
+J0 / J1 on Link_A. Printed or machined links scatter around it. This script
+samples N_CHAINS chains of LINK_COUNT links at once, each link with
+
+- a pitch deviation                  normal, PITCH_SIGMA_MM
+- joint hole offsets (along, across) normal, JOINT_SIGMA_MM, per hole
+- pin / hole clearance taken up      uniform [0, CLEARANCE_MM] (chain under tension)
+- a systematic Link_B pitch bias     LINK_B_BIAS_MM (the bake only warns about it)
+
+and evaluates, as (chains, links) arrays:
+
+- chain length error          sum of effective pitches - LINK_COUNT × pitch
+- tensioner travel            center distance change that takes it up (half the
+                              length error for two equal gears)
+- sprocket engagement error   worst accumulated pitch error over the
+                              GEAR_TEETH / 2 links wrapped on a gear, against
+                              the nominal tooth spacing
+- blade timing error          spacing error of the rig links (every PERIOD_N-th)
+                              after the best common phase, in mm and in gear
+                              degrees
+- wing angle error            max over the cycle of |WING_MAP(t + dt) - WING_MAP(t)|
+                              for each blade's timing error (table lookup)
+
+Results are reported as percentiles and pass rates against the LIMITS. The
+sensitivity table scales one tolerance at a time (others at their nominal
+value) to show which ones can be relaxed.
+
+HOW TO USE
+----------
+    python analysis/tolerance_monte_carlo.py
+"""
+
+import time
+
+import numpy as np
+
+import tread_kinematics as tk
+
+# =========================
+# SETTINGS
+# =========================
+N_CHAINS = 20000
+SEED = 43
+
+TOLERANCES = {
+    "pitch": 0.03,              # PITCH_SIGMA_MM, 1 sigma
+    "joint": 0.02,              # JOINT_SIGMA_MM, 1 sigma per hole and direction
+    "clearance": 0.05,          # CLEARANCE_MM, pin / hole
+    "link_b_bias": 0.0,         # LINK_B_BIAS_MM, systematic
+}
+
+LIMITS = {
+    "tensioner_mm": 2.0,        # available tensioner travel (either direction)
+    "engagement_mm": 1.0,       # accumulated error over the wrapped links
+    "wing_error_deg": 2.0,      # wing angle error anywhere in the cycle
+}
+
+SCALES = (0.5, 1.0, 2.0, 4.0)   # sensitivity: tolerance multipliers
+ZERO_TOL_BASE_MM = 0.05         # what a tolerance that is 0 gets scaled from
+WING_TABLE_SAMPLES = 2048
+PERCENTILES = (50, 95, 99, 99.9)
+# =========================
+
+
+def effective_pitches(rng, n, count=tk.LINK_COUNT, pitch=tk.LINK_PITCH, tol=TOLERANCES):
+    """(n, count) joint-to-joint distances of sampled chains."""
+    along = pitch + rng.normal(0.0, tol["pitch"], (n, count))
+    holes = rng.normal(0.0, tol["joint"], (n, count, 2, 2)) if tol["joint"] > 0.0 \
+        else np.zeros((n, count, 2, 2))
+    along += holes[..., 1, 0] - holes[..., 0, 0]
+    along += rng.uniform(0.0, tol["clearance"], (n, count))
+    along[:, tk.blade_link_indices(count)] += tol["link_b_bias"]
+    across = holes[..., 1, 1] - holes[..., 0, 1]
+    return np.sqrt(along ** 2 + across ** 2)
+
+
+def wing_error_table(samples=WING_TABLE_SAMPLES):
+    """(dt grid, max_t |wing(t + dt) - wing(t)|) for dt in [0, 0.5] loop fractions."""
+    kt, ka = tk.prepare_wing_map(tk.WING_MAP)
+    t = np.arange(samples) / samples
+    d = np.linspace(0.0, 0.5, samples // 4 + 1)
+    base = tk.wing_angle(t, kt, ka)
+    shifted = tk.wing_angle(t[None, :] + d[:, None], kt, ka)
+    diff = (shifted - base[None, :] + 180.0) % 360.0 - 180.0
+    return d, np.abs(diff).max(axis=1)
+
+
+def metrics(p, pitch=tk.LINK_PITCH, teeth=tk.GEAR_TEETH, table=None):
+    """Per-chain metric arrays for (n, count) effective pitches."""
+    n, count = p.shape
+    table = wing_error_table() if table is None else table
+    nominal_len = count * pitch
+
+    length_err = p.sum(axis=1) - nominal_len
+
+    wrap = teeth // 2
+    dev = p - pitch
+    c = np.concatenate([np.zeros((n, 1)), np.cumsum(np.concatenate([dev, dev[:, :wrap]], axis=1), axis=1)], axis=1)
+    engagement = np.abs(c[:, wrap:wrap + count] - c[:, :count]).max(axis=1)
+
+    blades = tk.blade_link_indices(count)
+    s = np.concatenate([np.zeros((n, 1)), np.cumsum(p, axis=1)[:, :-1]], axis=1)[:, blades]
+    spacing = s - blades[None, :] * p.mean(axis=1, keepdims=True)
+    offset = spacing - spacing.mean(axis=1, keepdims=True)
+    timing_mm = np.abs(offset).max(axis=1)
+    wing = np.interp(np.abs(offset) / nominal_len, *table).max(axis=1)
+
+    return {
+        "length_err_mm": length_err,
+        "tensioner_mm": 0.5 * length_err,
+        "engagement_mm": engagement,
+        "timing_mm": timing_mm,
+        "timing_gear_deg": np.degrees(timing_mm / tk.gear_radius(pitch, teeth)),
+        "wing_error_deg": wing,
+    }
+
+
+def pass_rate(res, limits=LIMITS):
+    ok = np.ones(len(next(iter(res.values()))), dtype=bool)
+    for k, lim in limits.items():
+        ok &= np.abs(res[k]) <= lim
+    return ok.mean()
+
+
+def run(tol=TOLERANCES, n=N_CHAINS, seed=SEED, table=None):
+    rng = np.random.default_rng(seed)
+    return metrics(effective_pitches(rng, n, tol=tol), table=table)
+
+
+def main():
+    table = wing_error_table()
+    t0 = time.perf_counter()
+    res = run(table=table)
+    dt = time.perf_counter() - t0
+
+    print(f"{N_CHAINS:,} chains x {tk.LINK_COUNT} links, pitch {tk.LINK_PITCH} mm, "
+          f"{len(tk.blade_link_indices(tk.LINK_COUNT))} blades, in {1e3 * dt:.0f} ms")
+    print("tolerances: " + ", ".join(f"{k} {v:g} mm" for k, v in TOLERANCES.items()) + "\n")
+    head = " ".join(f"{'P' + format(p, 'g'):>8}" for p in PERCENTILES)
+    print(f"{'metric':<17} {'mean':>8} {head} {'limit':>7} {'pass %':>7}")
+    for k, a in res.items():
+        q = np.percentile(a, PERCENTILES)
+        lim = LIMITS.get(k)
+        ok = f"{100 * (np.abs(a) <= lim).mean():7.2f}" if lim is not None else f"{'':>7}"
+        print(f"{k:<17} {a.mean():8.3f} " + " ".join(f"{v:8.3f}" for v in q) +
+              f" {lim if lim is not None else '':>7} {ok}")
+    print(f"\nall limits met: {100 * pass_rate(res):.2f} % of chains")
+
+    print("\nSensitivity: one tolerance scaled, others nominal (pass % of all limits)")
+    print(f"{'tolerance':<12} {'nominal':>8} " + " ".join(f"{'x' + format(s, 'g'):>8}" for s in SCALES))
+    for name, value in TOLERANCES.items():
+        rates = []
+        for s in SCALES:
+            tol = dict(TOLERANCES)
+            tol[name] = (value or ZERO_TOL_BASE_MM) * s
+            rates.append(100 * pass_rate(run(tol, table=table)))
+        label = f"{value:g}" if value else f"({ZERO_TOL_BASE_MM:g})"
+        print(f"{name:<12} {label:>8} " + " ".join(f"{r:8.2f}" for r in rates))
+
+
+if __name__ == "__main__":
+    main()
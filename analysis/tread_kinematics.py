@@ -0,0 +1,236 @@
+"""
+Tread kinematics shared by the analysis scripts (NumPy, no Blender)
+
+WHAT THIS MODULE DOES
+---------------------
+Vectorized ports of the pure-math parts of the Blender scripts, so analysis
+tools can evaluate the tread without bpy / mathutils:
+
+- prepare_wing_map / wing_angle      (create_moving_parts.py WING_MAP handling)
+- gear_radius                        (pitch / (2 sin(pi / GEAR_TEETH)))
+- chordal_travel                     (chain_travel() with CHAIN_TRAVEL_MODEL = 'CHORDAL')
+- two_gear_loop                      (create_trackpath.py, in loop-plane coords)
+- polyline_table / eval_at_distance  (eval_curve_polyline / eval_curve_at_distance_fast)
+- link_positions / blade_link_indices
+
+The SETTINGS below mirror models/prototype/create_moving_parts.py. The track
+geometry matches the baked prototype_moving_parts.glb (84 links around two
+gears, 208 mm apart, 19.34 mm path radius).
+
+COORDINATES
+-----------
+The loop lies in a plane with 2D coordinates (u, v):
+- u runs from gear 1 to gear 2 (along the flow axis)
+- v is perpendicular, +v is the upper run
+Like create_trackpath.py, distance 0 is the top of gear 1; the path then goes
+around gear 1 to the lower run (moving +u), around gear 2 and back along the
+upper run (moving -u).
+"""
+
+import math
+
+import numpy as np
+
+# =========================
+# SETTINGS (mirror create_moving_parts.py)
+# =========================
+GEAR_TEETH = 40
+PERIOD_N = 6
+SPECIAL_AT = 0
+
+LINK_PITCH = 6.4
+LINK_COUNT = 84
+
+TRACK_RADIUS = 19.34
+TRACK_CENTER_DISTANCE = 208.0
+ARC_SAMPLES = 96
+LINE_SAMPLES = 30
+
+PIN_OUTER_HALF_DIST = 72.0
+FOLLOWER_OUTER_HALF_DIST = 76.0
+
+MASTER_SPEED_RAD_PER_FRAME = 0.05
+MASTER_PHASE_RAD = 0.0
+CHAIN_SIGN = +1.0
+
+WING_MAP_SMOOTHSTEP = True
+WING_MAP_AUTO_FIX_LOOP = True
+CAM_ANGLE_SIGN = -1.0
+
+# (name, ratio to gear angle)
+MECH_RATIOS = [
+    ("Gear", 1.0),
+    ("Axle", 1.0),
+    ("Pinion", 5.0),
+    ("PinionAxle", 5.0),
+]
+
+WING_MAP = [
+    (0.00, 10.0),
+    (0.04, 0.0),
+    (0.06, 320.0),
+    (0.07, 300.0),
+    (0.08, 270.0),
+    (0.15, 270.0),
+    (0.23, 270.0),
+    (0.31, 270.0),
+    (0.38, 270.0),
+    (0.44, 270.0),
+    (0.46, 305.0),
+    (0.48, 0.0),
+    (0.54, 0.0),
+    (0.62, 0.0),
+    (0.69, 0.0),
+    (0.77, 0.0),
+    (0.85, 0.0),
+    (0.92, 0.0),
+    (0.96, 0.0),
+    (1.00, 10.0),
+]
+# =========================
+
+
+# ---------- wing map ----------
+def prepare_wing_map(points, auto_fix_loop=WING_MAP_AUTO_FIX_LOOP):
+    """Sort, unwrap and (optionally) close the loop. Returns (t, angle_deg) arrays."""
+    pts = sorted(points, key=lambda x: x[0])
+    if abs(pts[0][0] - 0.0) > 1e-6:
+        raise RuntimeError("WING_MAP must start at t=0.0")
+    if abs(pts[-1][0] - 1.0) > 1e-6:
+        raise RuntimeError("WING_MAP must end at t=1.0")
+
+    t = np.array([p[0] for p in pts], dtype=np.float64)
+    a = np.array([p[1] for p in pts], dtype=np.float64)
+
+    # same result as unwrap_angle_sequence(): each step lands in (-180, 180]
+    d = np.diff(a)
+    d = 180.0 - (180.0 - d) % 360.0
+    a = np.concatenate(([a[0]], a[0] + np.cumsum(d)))
+
+    if auto_fix_loop and len(a) >= 2:
+        k = round((a[-1] - a[0]) / 360.0)
+        a[-1] = a[0] + 360.0 * k
+    return t, a
+
+
+def segment_weights(t, knots_t, use_smooth=WING_MAP_SMOOTHSTEP):
+    """Segment index and blend weight of every t (wrapped to [0, 1)) in knots_t."""
+    t = np.asarray(t, dtype=np.float64) % 1.0
+    j = np.searchsorted(knots_t, t, side="right") - 1
+    j = np.clip(j, 0, len(knots_t) - 2)
+    t0 = knots_t[j]
+    dt = knots_t[j + 1] - t0
+    u = np.where(dt < 1e-12, 0.0, (t - t0) / np.where(dt < 1e-12, 1.0, dt))
+    u = np.clip(u, 0.0, 1.0)
+    if use_smooth:
+        u = 0.5 - 0.5 * np.cos(np.pi * u)
+    return j, u
+
+
+def wing_angle(t, knots_t, knots_a, use_smooth=WING_MAP_SMOOTHSTEP):
+    """
+    Vectorized map_angle_from_points().
+    knots_a may carry leading batch dimensions: (..., K) -> result (..., len(t)).
+    """
+    j, u = segment_weights(t, knots_t, use_smooth)
+    a = np.asarray(knots_a, dtype=np.float64)
+    a0 = a[..., j]
+    return a0 + (a[..., j + 1] - a0) * u
+
+
+# ---------- gears and track ----------
+def gear_radius(pitch=LINK_PITCH, teeth=GEAR_TEETH):
+    """Pitch radius used by create_moving_parts.py to turn gear angle into travel."""
+    return np.asarray(pitch) / (2.0 * np.sin(np.pi / np.asarray(teeth, dtype=np.float64)))
+
+
+def chordal_travel(theta, pitch=LINK_PITCH, teeth=GEAR_TEETH):
+    """
+    Chain travel for gear angle theta with discrete tooth engagement: one pitch
+    per tooth, and within a tooth the engaged pin moves R sin(phi) along the
+    span, phi in [-pi/teeth, pi/teeth). Broadcasts over all arguments.
+    """
+    theta = np.asarray(theta, dtype=np.float64)
+    half = np.pi / np.asarray(teeth, dtype=np.float64)
+    k = np.floor((theta + half) / (2.0 * half))
+    return k * pitch + gear_radius(pitch, teeth) * np.sin(theta - 2.0 * half * k)
+
+
+def two_gear_loop(center_distance=TRACK_CENTER_DISTANCE, radius=TRACK_RADIUS,
+                  arc_samples=ARC_SAMPLES, line_samples=LINE_SAMPLES):
+    """Closed loop around two equal gears as (N, 2) points in (u, v), no duplicate end point."""
+    c1 = np.array([-0.5 * center_distance, 0.0])
+    c2 = np.array([+0.5 * center_distance, 0.0])
+
+    def arc(center, a0, a1):
+        a = np.linspace(a0, a1, arc_samples + 1)
+        return center + radius * np.stack([np.cos(a), np.sin(a)], axis=1)
+
+    def line(p, q):
+        s = np.arange(1, line_samples)[:, None] / float(line_samples)
+        return p + (q - p) * s
+
+    arc1 = arc(c1, 0.5 * math.pi, 1.5 * math.pi)        # top -> bottom around gear 1
+    arc2 = arc(c2, -0.5 * math.pi, 0.5 * math.pi)       # bottom -> top around gear 2
+    return np.concatenate([
+        arc1,
+        line(arc1[-1], arc2[0]),
+        arc2,
+        line(arc2[-1], arc1[0]),
+    ])
+
+
+def polyline_table(pts):
+    """NumPy eval_curve_polyline(): returns (pts2, seglen, cum, total) for a closed loop."""
+    pts = np.asarray(pts, dtype=np.float64)
+    pts2 = np.concatenate([pts, pts[:1]])
+    seglen = np.linalg.norm(np.diff(pts2, axis=0), axis=1)
+    cum = np.concatenate([[0.0], np.cumsum(seglen)])
+    return pts2, seglen, cum, float(cum[-1])
+
+
+def locate(cum, seglen, total, dist):
+    """Segment index and in-segment fraction for arc-length distances (wraps)."""
+    target = np.asarray(dist, dtype=np.float64) % total
+    j = np.searchsorted(cum, target, side="right") - 1
+    j = np.clip(j, 0, len(seglen) - 1)
+    lseg = seglen[j]
+    seg_t = np.where(lseg < 1e-9, 0.0, (target - cum[j]) / np.where(lseg < 1e-9, 1.0, lseg))
+    return j, seg_t
+
+
+def eval_at_distance(pts2, seglen, cum, total, dist):
+    """Vectorized eval_curve_at_distance_fast() (without the object matrix)."""
+    j, seg_t = locate(cum, seglen, total, dist)
+    p0 = pts2[j]
+    return p0 + (pts2[j + 1] - p0) * seg_t[..., None]
+
+
+def tangent_at_distance(pts2, seglen, cum, total, dist):
+    """Unit tangent of the polyline segment containing each distance."""
+    j, _ = locate(cum, seglen, total, dist)
+    d = pts2[j + 1] - pts2[j]
+    n = np.linalg.norm(d, axis=-1, keepdims=True)
+    return d / np.where(n < 1e-12, 1.0, n)
+
+
+# ---------- chain ----------
+def master_theta(frames):
+    return np.asarray(frames, dtype=np.float64) * MASTER_SPEED_RAD_PER_FRAME + MASTER_PHASE_RAD
+
+
+def link_count(total, pitch=LINK_PITCH):
+    return max(2, int(round(total / pitch)))
+
+
+def blade_link_indices(count, period_n=PERIOD_N, special_at=SPECIAL_AT):
+    """Indices of the Link_B connectors that carry a cam pin / follower / wing rig."""
+    i = np.arange(count)
+    return i[(i % period_n) == special_at]
+
+
+def link_positions(traveled, count, pitch, pts2, seglen, cum, total, curve_dir=+1.0):
+    """Joint positions of all links for each travel value: (len(traveled), count, 2)."""
+    traveled = np.atleast_1d(np.asarray(traveled, dtype=np.float64))
+    dist = curve_dir * (np.arange(count) * pitch)[None, :] + traveled[:, None]
+    return eval_at_distance(pts2, seglen, cum, total, dist)
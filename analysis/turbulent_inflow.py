@@ -0,0 +1,234 @@
+"""
+Synthetic turbulent inflow over the capture region (FFT synthesis, streamed)
+
+WHAT THIS SCRIPT DOES
+---------------------
+Constant inflow hides the fluctuating loads that drive link and blade
+fatigue. This script generates spatially correlated velocity time series on
+a grid of points across the capture region:
+
+- Target one-sided spectrum per component: von Karman, with turbulence
+  intensity TURBULENCE_INTENSITY and integral length scale LENGTH_SCALE_M
+  (v / w scaled by SIGMA_RATIOS).
+- Spatial coherence between points: Davenport, exp(-COHERENCE_DECAY f dr / U).
+- Synthesis (Veers): per frequency, the Cholesky factor H(f) of the
+  cross-spectral matrix is applied to complex Gaussian noise and the series
+  is recovered with one inverse real FFT per block. H(f) is computed once
+  and reused for every block and seed.
+- Streaming: the record is produced in blocks of BLOCK_SAMPLES; consecutive
+  independent blocks are blended over OVERLAP_SAMPLES with cos / sin
+  weights, which keeps the variance constant through the joint. Only two
+  blocks are in memory at a time. Energy below 1 / (BLOCK_SAMPLES * DT_S)
+  is not represented, so the measured TI comes out a percent or two low.
+
+Points further downstream see the same field delayed by x / U (frozen
+turbulence), so a cross-section is enough.
+
+OUTPUT FORMAT
+-------------
+<OUTPUT_DIR>/inflow_seed<seed>.npy   float32 (n_samples, n_points, n_components),
+                                     velocity in m/s including the mean
+<OUTPUT_DIR>/inflow_seed<seed>.json  dt, mean speed, TI, points (y, z in m),
+                                     components, seed
+
+read_inflow(path) returns a memory-mapped array plus the metadata.
+
+HOW TO USE
+----------
+    python analysis/turbulent_inflow.py
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# =========================
+# SETTINGS
+# =========================
+MEAN_SPEED_M_S = 1.0
+TURBULENCE_INTENSITY = 0.10
+LENGTH_SCALE_M = 0.5            # longitudinal integral length scale
+COHERENCE_DECAY = 8.0           # Davenport decay constant
+COMPONENTS = ("u", "v", "w")
+SIGMA_RATIOS = {"u": 1.0, "v": 0.75, "w": 0.5}
+
+# cross-section of the capture run: blade width x blade height (parts/blade/README.md)
+POINTS_Y_M = np.linspace(-0.0795, 0.0795, 5)
+POINTS_Z_M = np.linspace(0.0, 0.040, 3)
+
+DT_S = 0.02
+DURATION_S = 3600.0
+BLOCK_SAMPLES = 8192
+OVERLAP_SAMPLES = 512
+
+SEEDS = range(4)
+N_WORKERS = 1                   # >1 generates seeds on a process pool
+OUTPUT_DIR = "inflow"
+# =========================
+
+
+# ---------- spectra ----------
+def von_karman(f, sigma, length, mean_speed, component):
+    """One-sided von Karman PSD ((m/s)^2 / Hz)."""
+    n = f * length / mean_speed
+    scale = 4.0 * sigma ** 2 * length / mean_speed
+    if component == "u":
+        return scale / (1.0 + 70.8 * n ** 2) ** (5.0 / 6.0)
+    return scale * (1.0 + 755.2 * n ** 2) / (1.0 + 283.2 * n ** 2) ** (11.0 / 6.0)
+
+
+def grid_points(y=POINTS_Y_M, z=POINTS_Z_M):
+    Y, Z = np.meshgrid(y, z, indexing="ij")
+    return np.stack([Y.ravel(), Z.ravel()], axis=1)
+
+
+def synthesis_factors(points, n=BLOCK_SAMPLES, dt=DT_S, mean_speed=MEAN_SPEED_M_S,
+                      ti=TURBULENCE_INTENSITY, length=LENGTH_SCALE_M, components=COMPONENTS):
+    """
+    Per-component Cholesky factors of the cross-spectral matrix, already scaled
+    for numpy.fft.irfft: {component: (n // 2 + 1, P, P) complex}.
+    """
+    f = np.fft.rfftfreq(n, dt)
+    df = f[1]
+    dist = np.linalg.norm(points[:, None, :] - points[None, :, :], axis=-1)
+    coh = np.exp(-COHERENCE_DECAY * f[:, None, None] * dist[None] / mean_speed)
+    coh += np.eye(len(points)) * 1e-9                 # full coherence at f = 0 is singular
+
+    out = {}
+    for c in components:
+        sigma = ti * mean_speed * SIGMA_RATIOS[c]
+        s = von_karman(f, sigma, length * SIGMA_RATIOS[c], mean_speed, c)
+        s[0] = 0.0                                     # the mean is added separately
+        H = np.linalg.cholesky(coh) * np.sqrt(s * df)[:, None, None]
+        out[c] = H * (n / np.sqrt(2.0))
+    return out
+
+
+def synth_block(factors, rng, n=BLOCK_SAMPLES):
+    """One independent (n, P, C) block of fluctuations."""
+    comps = []
+    for H in factors.values():
+        nf, p, _ = H.shape
+        xi = (rng.standard_normal((nf, p)) + 1j * rng.standard_normal((nf, p))) / np.sqrt(2.0)
+        X = np.einsum("fij,fj->fi", H, xi)
+        comps.append(np.fft.irfft(X, n=n, axis=0))
+    return np.stack(comps, axis=-1)
+
+
+def iter_inflow(factors, n_samples, seed, block=BLOCK_SAMPLES, overlap=OVERLAP_SAMPLES):
+    """
+    Yield consecutive float32 chunks (rows, P, C) of fluctuations until
+    n_samples rows have been produced. Neighbouring blocks are joined by
+    x = cos(w) a + sin(w) b, w: 0 -> pi/2 over the overlap.
+    """
+    rng = np.random.default_rng(seed)
+    w = 0.5 * np.pi * (np.arange(overlap) + 0.5) / overlap
+    fade_out, fade_in = np.cos(w)[:, None, None], np.sin(w)[:, None, None]
+
+    b = synth_block(factors, rng, block)
+    chunk, tail = b[:block - overlap], b[block - overlap:]
+    done = 0
+    while True:
+        chunk = chunk[:n_samples - done]
+        yield chunk.astype(np.float32)
+        done += len(chunk)
+        if done >= n_samples:
+            return
+        b = synth_block(factors, rng, block)
+        blend = fade_out * tail + fade_in * b[:overlap]
+        chunk = np.concatenate([blend, b[overlap:block - overlap]])
+        tail = b[block - overlap:]
+
+
+def generate(seed, out_dir=OUTPUT_DIR, duration_s=DURATION_S, dt=DT_S, factors=None, points=None):
+    """Write one seed to out_dir (streamed). Returns (npy path, seconds, measured TI per component)."""
+    points = grid_points() if points is None else points
+    factors = synthesis_factors(points) if factors is None else factors
+    n_samples = int(round(duration_s / dt))
+    n_c = len(factors)
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"inflow_seed{seed}.npy")
+
+    mean = np.zeros(n_c, dtype=np.float32)
+    if "u" in factors:
+        mean[list(factors).index("u")] = MEAN_SPEED_M_S
+    t0 = time.perf_counter()
+    arr = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32,
+                                    shape=(n_samples, len(points), n_c))
+    sq = np.zeros(n_c)
+    k = 0
+    for chunk in iter_inflow(factors, n_samples, seed):
+        arr[k:k + len(chunk)] = chunk + mean
+        sq += (chunk.astype(np.float64) ** 2).sum(axis=(0, 1))
+        k += len(chunk)
+    arr.flush()
+    del arr
+    dt_run = time.perf_counter() - t0
+
+    with open(path[:-4] + ".json", "w") as fh:
+        json.dump({
+            "dt": dt,
+            "n_samples": n_samples,
+            "mean_speed_m_s": MEAN_SPEED_M_S,
+            "turbulence_intensity": TURBULENCE_INTENSITY,
+            "length_scale_m": LENGTH_SCALE_M,
+            "coherence_decay": COHERENCE_DECAY,
+            "components": list(factors),
+            "points_yz_m": points.tolist(),
+            "seed": seed,
+        }, fh, indent=2)
+    ti = np.sqrt(sq / (n_samples * len(points))) / MEAN_SPEED_M_S
+    return path, dt_run, dict(zip(factors, ti))
+
+
+def read_inflow(path):
+    """(memory-mapped (n_samples, P, C) array, metadata dict) of a generated record."""
+    with open(path[:-4] + ".json") as fh:
+        meta = json.load(fh)
+    return np.load(path, mmap_mode="r"), meta
+
+
+_FACTORS = None
+
+
+def _init_worker(factors):
+    global _FACTORS
+    _FACTORS = factors
+
+
+def _generate_seed(seed):
+    return generate(seed, factors=_FACTORS)
+
+
+def main():
+    points = grid_points()
+    t0 = time.perf_counter()
+    factors = synthesis_factors(points)
+    t_fac = time.perf_counter() - t0
+    n_samples = int(round(DURATION_S / DT_S))
+    print(f"{len(points)} points x {len(COMPONENTS)} components, {n_samples:,} samples "
+          f"({DURATION_S / 3600.0:.2f} h at {1 / DT_S:.0f} Hz), "
+          f"cross-spectral factors in {1e3 * t_fac:.0f} ms")
+
+    seeds = list(SEEDS)
+    t0 = time.perf_counter()
+    if N_WORKERS > 1:
+        with ProcessPoolExecutor(N_WORKERS, initializer=_init_worker, initargs=(factors,)) as pool:
+            results = list(pool.map(_generate_seed, seeds))
+    else:
+        results = [generate(s, factors=factors, points=points) for s in seeds]
+    total = time.perf_counter() - t0
+
+    for seed, (path, dt_run, ti) in zip(seeds, results):
+        tis = "  ".join(f"TI_{c} {100 * v:5.2f} %" for c, v in ti.items())
+        print(f"seed {seed:3d}: {path}  {dt_run:6.2f} s   {tis}")
+    sim_h = len(seeds) * DURATION_S / 3600.0
+    print(f"{sim_h:.1f} h of inflow in {total:.1f} s "
+          f"(target TI_u {100 * TURBULENCE_INTENSITY:.1f} %)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+Kinematics and bake benchmark for create_moving_parts.py
+
+WHAT THIS SCRIPT DOES
+---------------------
+Times the stages of the chain / rig bake separately on synthetic treads, so a
+change to eval_curve_at_distance_fast, link_matrix_world_for_two_joints or
+the wing/cam code can be measured instead of guessed:
+
+- curve    eval_curve_at_distance_fast for every link on every frame
+- links    link_matrix_world_for_two_joints with the transported up vector
+- rigs     C0 / pin / follower positions, map_angle_from_points and
+           basis_from_cam_angle for every connector link
+- keys     keyframe_insert of location + rotation_quaternion
+           (only when running inside Blender, otherwise reported as skipped)
+
+The functions are taken from create_moving_parts.py itself (its imports,
+settings and function definitions are loaded without running main()), so
+the benchmark always measures the code that bakes the scene.
+
+SYNTHETIC TREADS
+----------------
+Two-gear loops like create_trackpath.py builds them, with the gear radius of
+the prototype (TRACK_RADIUS) and the straight length chosen so that the loop
+holds exactly the requested link count at the master link pitch. Cases are
+every combination of LINK_COUNTS × FRAME_COUNTS × ARC_SAMPLES_LIST whose
+links × frames stays below MAX_LINK_FRAMES; the others are listed as skipped.
+The loop goes through the bake's own track_tables(), so it is resampled to
+TRACK_RESAMPLE_TOL exactly as an evaluated TrackPath is.
+
+OUTPUT
+------
+- A table with time per stage and ns per operation for every case
+- Scaling exponents (log-log slope of stage time vs. work) per stage
+- Comparison against BASELINE_PATH: per case/stage ratio of ns/op, flagged
+  as a regression when slower than 1 + REGRESSION_TOL. Timings only compare
+  on one machine, so the baseline is not committed: save it locally before
+  the change to be measured. Without one, no comparison is made.
+
+HOW TO USE
+----------
+Inside Blender (all stages):
+    blender -b --python models/prototype/benchmark_bake.py
+
+Outside Blender (curve / links / rigs, needs the `mathutils` package):
+    python models/prototype/benchmark_bake.py
+
+Set SAVE_BASELINE = True (or pass --save-baseline after "--" in Blender) to
+store the current run as the new baseline.
+"""
+
+import ast
+import json
+import math
+import os
+import sys
+import time
+from types import ModuleType, SimpleNamespace
+
+from mathutils import Vector, Matrix
+import numpy as np
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+# =========================
+# SETTINGS
+# =========================
+BAKE_SCRIPT = "create_moving_parts.py"
+BASELINE_PATH = "benchmark_bake_baseline.json"
+RESULTS_PATH = "benchmark_bake_results.json"
+SAVE_BASELINE = False
+
+LINK_COUNTS = (24, 96, 384, 1536)
+FRAME_COUNTS = (10, 100, 1000)
+ARC_SAMPLES_LIST = (24, 96, 384)
+LINE_SAMPLES = 30
+MAX_LINK_FRAMES = 200_000
+
+TRACK_RADIUS = 19.34
+REPEATS = 5
+REGRESSION_TOL = 0.15
+
+STAGES = ("curve", "links", "rigs", "keys")
+# =========================
+
+
+def script_dir():
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def load_bake_functions(path):
+    """
+    Imports, settings and function definitions of the bake script, without
+    running main(). Outside Blender an empty `bpy` module stands in for the
+    script's `import bpy`; everything else is imported by the script itself.
+    """
+    with open(path, encoding="utf-8") as fh:
+        tree = ast.parse(fh.read(), filename=path)
+    keep = (ast.Import, ast.ImportFrom, ast.Try, ast.FunctionDef, ast.ClassDef, ast.Assign)
+    body = [n for n in tree.body if isinstance(n, keep)]
+    stub = "bpy" not in sys.modules
+    if stub:
+        sys.modules["bpy"] = ModuleType("bpy")
+    try:
+        ns = {"__name__": "bake_script", "__file__": path}
+        exec(compile(ast.Module(body=body, type_ignores=[]), path, "exec"), ns)
+    finally:
+        if stub:
+            del sys.modules["bpy"]
+    if stub:
+        ns["bpy"] = None
+    return SimpleNamespace(**ns)
+
+
+def synthetic_track(count, pitch, arc_samples, line_samples=LINE_SAMPLES, radius=TRACK_RADIUS):
+    """Two-gear loop in the YZ plane holding `count` links of `pitch`."""
+    length = count * pitch
+    straight = max(0.5 * (length - 2.0 * math.pi * radius), pitch)
+    c1 = Vector((0.0, -0.5 * straight, 0.0))
+    c2 = Vector((0.0, +0.5 * straight, 0.0))
+
+    def arc(center, a0, a1):
+        return [center + Vector((0.0, math.cos(a), math.sin(a))) * radius
+                for a in (a0 + (a1 - a0) * i / arc_samples for i in range(arc_samples + 1))]
+
+    def line(p, q):
+        return [p.lerp(q, i / line_samples) for i in range(1, line_samples)]
+
+    arc1 = arc(c1, 0.5 * math.pi, 1.5 * math.pi)
+    arc2 = arc(c2, -0.5 * math.pi, 0.5 * math.pi)
+    return arc1 + line(arc1[-1], arc2[0]) + arc2 + line(arc2[-1], arc1[0])
+
+
+def link_joints(m):
+    j0 = Vector((0, 0, 0))
+    j1 = m.EXPECTED_LOCAL_FORWARD.normalized() * m.LINK_PITCH_FALLBACK
+    return m.maybe_swap_joints(j0, j1)
+
+
+def stage_curve(m, table, count, frames, pitch, gear_r):
+    eval_obj = SimpleNamespace(matrix_world=Matrix.Identity(4))
+    pts2, seglen, cum, total = table
+    fast = m.eval_curve_at_distance_fast
+    out = []
+    t0 = time.perf_counter()
+    for f in range(frames):
+        traveled = m.master_theta(f) * gear_r
+        out.append([fast(eval_obj, pts2, seglen, cum, total, i * pitch + traveled)
+                    for i in range(count)])
+    return time.perf_counter() - t0, count * frames, out
+
+
+def stage_links(m, positions, j0_l, j1_l):
+    count = len(positions[0])
+    prev_up_per_link = [None] * count
+    link_fn = m.link_matrix_world_for_two_joints
+    out = []
+    t0 = time.perf_counter()
+    for ps in positions:
+        chain_prev_up = None
+        mats = [None] * count
+        for i in range(count):
+            up_hint = prev_up_per_link[i] if prev_up_per_link[i] is not None else chain_prev_up
+            Mw, new_up = link_fn(ps[i], ps[(i + 1) % count], j0_l, j1_l, up_hint)
+            prev_up_per_link[i] = new_up
+            chain_prev_up = new_up
+            mats[i] = Mw
+        out.append(mats)
+    return time.perf_counter() - t0, count * len(positions), out
+
+
+def stage_rigs(m, link_mats, pitch, gear_r, total_len):
+    """main()'s per-rig maths (rig_matrices); the right chain is the left one shifted along X."""
+    count = len(link_mats[0])
+    rig_ids = [i for i in range(count) if (i % m.PERIOD_N) == m.SPECIAL_AT]
+    cfg = {
+        "c0_local": Vector((0.0, 0.0, 0.0)),
+        "pin_h0_off_M": None,
+        "fol_h0_off_M": None,
+        "pitch": pitch,
+        "dirL": 1.0,
+        "total_len": total_len,
+        "wing_map": m.prepare_wing_map(m.WING_MAP),
+        "cam_sign": m.CAM_ANGLE_SIGN,
+        "pin_half_dist": m.PIN_OUTER_HALF_DIST,
+        "fol_half_dist": m.FOLLOWER_OUTER_HALF_DIST,
+    }
+    shift = Matrix.Translation((2.0 * m.PIN_OUTER_HALF_DIST - 8.0, 0.0, 0.0))
+    rig_fn = m.rig_matrices
+    n_ops = 0
+    t0 = time.perf_counter()
+    for f, mats in enumerate(link_mats):
+        traveled = m.master_theta(f) * gear_r
+        for i in rig_ids:
+            rig_fn(cfg, i, mats[i], shift @ mats[i], traveled)
+            n_ops += 1
+    return time.perf_counter() - t0, n_ops
+
+
+def stage_keys(link_mats):
+    """keyframe_insert for every link on every frame, on throwaway objects."""
+    if bpy is None:
+        return None, 0
+    col = bpy.data.collections.new("BenchmarkKeys")
+    bpy.context.scene.collection.children.link(col)
+    objs = []
+    for i in range(len(link_mats[0])):
+        o = bpy.data.objects.new(f"BenchKey_{i:05d}", None)
+        o.rotation_mode = 'QUATERNION'
+        col.objects.link(o)
+        objs.append(o)
+    try:
+        t0 = time.perf_counter()
+        for f, mats in enumerate(link_mats):
+            for o, Mw in zip(objs, mats):
+                o.matrix_world = Mw
+                o.keyframe_insert("location", frame=f)
+                o.keyframe_insert("rotation_quaternion", frame=f)
+        dt = time.perf_counter() - t0
+    finally:
+        for o in objs:
+            bpy.data.objects.remove(o, do_unlink=True)
+        bpy.data.collections.remove(col)
+    return dt, len(objs) * len(link_mats)
+
+
+def run_case(m, count, frames, arc_samples):
+    j0_l, j1_l = link_joints(m)
+    pitch = (j1_l - j0_l).length
+    gear_r = pitch / (2.0 * math.sin(math.pi / float(m.GEAR_TEETH)))
+    table = m.track_tables(synthetic_track(count, pitch, arc_samples))
+
+    best = {}
+    for _ in range(REPEATS):
+        dt_c, n_c, positions = stage_curve(m, table, count, frames, pitch, gear_r)
+        dt_l, n_l, link_mats = stage_links(m, positions, j0_l, j1_l)
+        dt_r, n_r = stage_rigs(m, link_mats, pitch, gear_r, table[3])
+        dt_k, n_k = stage_keys(link_mats)
+        for name, dt, n in (("curve", dt_c, n_c), ("links", dt_l, n_l),
+                            ("rigs", dt_r, n_r), ("keys", dt_k, n_k)):
+            if dt is None:
+                continue
+            if name not in best or dt < best[name]["s"]:
+                best[name] = {"s": dt, "ops": n, "ns_per_op": 1e9 * dt / max(n, 1)}
+        del positions, link_mats
+    return best
+
+
+def case_key(count, frames, arc_samples):
+    return f"links{count}_frames{frames}_arc{arc_samples}"
+
+
+def scaling_exponents(results):
+    """log-log slope of stage time vs. number of operations, per stage."""
+    out = {}
+    for stage in STAGES:
+        pts = [(r[stage]["ops"], r[stage]["s"]) for r in results.values()
+               if stage in r and r[stage]["s"] > 0]
+        if len(pts) < 2:
+            continue
+        x = np.log([p[0] for p in pts])
+        y = np.log([p[1] for p in pts])
+        if np.ptp(x) > 0:
+            out[stage] = float(np.polyfit(x, y, 1)[0])
+    return out
+
+
+def compare_to_baseline(results, baseline):
+    regressions = []
+    for key, stages in results.items():
+        for stage, r in stages.items():
+            b = baseline.get(key, {}).get(stage)
+            if not b:
+                continue
+            ratio = r["ns_per_op"] / max(b["ns_per_op"], 1e-12)
+            r["vs_baseline"] = ratio
+            if ratio > 1.0 + REGRESSION_TOL:
+                regressions.append((key, stage, ratio))
+    return regressions
+
+
+def main(argv):
+    here = script_dir()
+    m = load_bake_functions(os.path.join(here, BAKE_SCRIPT))
+    save = SAVE_BASELINE or "--save-baseline" in argv
+
+    results, skipped = {}, []
+    for count in LINK_COUNTS:
+        for frames in FRAME_COUNTS:
+            if count * frames > MAX_LINK_FRAMES:
+                skipped += [case_key(count, frames, arc) for arc in ARC_SAMPLES_LIST]
+                continue
+            for arc in ARC_SAMPLES_LIST:
+                key = case_key(count, frames, arc)
+                results[key] = run_case(m, count, frames, arc)
+                row = "  ".join(
+                    f"{s}={results[key][s]['s'] * 1e3:8.1f} ms ({results[key][s]['ns_per_op']:7.0f} ns/op)"
+                    if s in results[key] else f"{s}=  skipped"
+                    for s in STAGES)
+                print(f"{key:<28} {row}")
+
+    if skipped:
+        print(f"Skipped {len(skipped)} cases over MAX_LINK_FRAMES = {MAX_LINK_FRAMES:,} links × frames: "
+              + ", ".join(skipped))
+
+    slopes = scaling_exponents(results)
+    print("Scaling exponent (time ~ ops^k): " + ", ".join(f"{s} k={k:.2f}" for s, k in slopes.items()))
+
+    baseline_path = os.path.join(here, BASELINE_PATH)
+    regressions = []
+    if os.path.exists(baseline_path) and not save:
+        with open(baseline_path) as fh:
+            regressions = compare_to_baseline(results, json.load(fh)["results"])
+        for key, stage, ratio in regressions:
+            print(f"⚠️ REGRESSION {key} {stage}: {ratio:.2f}× baseline ns/op")
+        if not regressions:
+            print(f"✅ No regressions against {BASELINE_PATH} (tolerance {REGRESSION_TOL:.0%}).")
+    elif not save:
+        print(f"No local baseline ({BASELINE_PATH}); run with --save-baseline to record one on this machine.")
+
+    report = {
+        "in_blender": bpy is not None,
+        "python": sys.version.split()[0],
+        "results": results,
+        "skipped": skipped,
+        "scaling": slopes,
+    }
+    with open(os.path.join(here, RESULTS_PATH), "w") as fh:
+        json.dump(report, fh, indent=1)
+    if save:
+        with open(baseline_path, "w") as fh:
+            json.dump(report, fh, indent=1)
+        print(f"Saved baseline to {BASELINE_PATH}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    code = main(argv)
+    if bpy is None or bpy.app.background:
+        sys.exit(code)
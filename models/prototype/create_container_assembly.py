@@ -0,0 +1,373 @@
+"""
+Container assembly from one shared bake (Blender)
+
+WHAT THIS SCRIPT DOES
+---------------------
+Lays out the tread modules of a production container (N modules at given
+offsets, rotations and phases) from the single left/right pair that
+create_moving_parts.py baked, without baking any module again:
+
+- every module is a set of linked duplicates of the baked objects: the copies
+  share mesh data AND the baked Action with the source objects, only the
+  object itself (transform, NLA strip) is per module
+- each copy plays the shared Action through one NLA strip whose action range
+  is shifted by the module phase, so module k shows bake frame f + phase_k
+  at scene frame f
+- the copies are parented to a "Module_###" empty at the module offset; the
+  bake is keyed in world space on unparented objects, so the empty moves the
+  whole module rigidly
+- the source collections are hidden and stay the template: re-run
+  create_moving_parts.py to change the motion, then re-run this script
+
+Memory and time therefore grow with the number of OBJECTS only (a few
+hundred bytes each); meshes, F-curves and keyframes are stored once, and the
+bake runs once whatever the module count.
+
+PHASES
+------
+'TRIM'   the scene / export range is shortened to
+         FRAME_END - max(phase), so every module stays inside the baked range.
+         Works with any bake.
+'CYCLIC' the shared F-curves get a Cycles modifier and phases wrap around the
+         bake length. Only correct when every baked object ends where it
+         started (the chain has done a whole loop and gears / pinions whole
+         turns); the script checks this and falls back to 'TRIM' otherwise.
+'AUTO'   'CYCLIC' if the bake is periodic, else 'TRIM'.
+
+OUTPUT
+------
+- collection COL_ASSEMBLY with the module empties and their objects
+- EXPORT_GLB_PATH: the whole container as GLB. glTF has no per-instance time
+  offset, so every module's animation is sampled into the file and its size
+  grows with N (requires the Blender 4.x glTF exporter for 'SCENE' sampling).
+- EXPORT_ASSEMBLY_PATH: a small JSON with the module offsets / rotations /
+  phases and the path of the pose descriptor (EXPORT_DESCRIPTOR_PATH of
+  create_moving_parts.py). A client that evaluates poses itself
+  (analysis/pose_descriptor.py) draws the container from these two files,
+  whose size does not depend on N.
+
+
+HOW TO USE
+----------
+1. Bake with create_moving_parts.py (PREVIEW_MODE = False).
+2. Set MODULES (or MODULE_COUNT / MODULE_PITCH / PHASE_STEP_FRAMES) below.
+3. Run this script in the same .blend (Alt + P), or
+       blender -b prototype_moving_parts.blend --python create_container_assembly.py
+"""
+
+import bpy
+import json
+import math
+import time
+from mathutils import Vector, Matrix, Quaternion
+
+COL_CHAIN_L = "BakedChain_L"
+COL_CHAIN_R = "BakedChain_R"
+COL_RIGS    = "BakedCamAndWings"
+
+# Objects outside the baked collections that belong to one module are found
+# from their bake Action (every gear / axle / pinion of MECH_ROT that
+# bake_mechanics keyed), so the list follows the bake script on its own.
+# Object types listed here are never treated as module parts.
+MODULE_EXTRA_SKIP_TYPES = {"CAMERA", "LIGHT"}
+
+COL_ASSEMBLY = "ContainerAssembly"
+
+# Hide the source collections (viewport + render) once the modules exist.
+HIDE_SOURCE = True
+
+FRAME_START = 0
+FRAME_END   = 57
+
+# Explicit layout: list of (offset mm, rotation about Z in degrees, phase in
+# frames). None = MODULE_COUNT modules, MODULE_PITCH apart, phase k * PHASE_STEP_FRAMES.
+MODULES = None
+
+MODULE_COUNT = 4
+MODULE_PITCH = Vector((200.0, 0.0, 0.0))   # blade width 159 mm + clearance
+# One blade period is PERIOD_N links of chain travel (~18.8 frames at the
+# default master speed); a third of it staggers the blade entries.
+PHASE_STEP_FRAMES = 6.25
+
+PHASE_MODE = 'AUTO'          # 'TRIM', 'CYCLIC' or 'AUTO'
+PERIODIC_TOL_LOC = 1e-3      # mm
+PERIODIC_TOL_ROT = 1e-4      # 1 - |q0 . q1|
+
+# '' = off, '//' = relative to the .blend
+EXPORT_GLB_PATH = ""
+EXPORT_ASSEMBLY_PATH = ""
+DESCRIPTOR_PATH = ""         # the pose descriptor written by create_moving_parts.py
+
+
+# -------------------------
+# HELPERS
+# -------------------------
+def ensure_collection(name):
+    col = bpy.data.collections.get(name)
+    if not col:
+        col = bpy.data.collections.new(name)
+        bpy.context.scene.collection.children.link(col)
+    return col
+
+def clear_collection(col):
+    """Remove the objects of a previous run (their data is shared and stays)."""
+    for o in list(col.objects):
+        bpy.data.objects.remove(o, do_unlink=True)
+
+def module_layout():
+    if MODULES is not None:
+        return [(Vector(off), float(rot), float(ph)) for off, rot, ph in MODULES]
+    return [(MODULE_PITCH * k, 0.0, PHASE_STEP_FRAMES * k) for k in range(MODULE_COUNT)]
+
+def source_objects():
+    objs = []
+    for name in (COL_CHAIN_L, COL_CHAIN_R, COL_RIGS):
+        col = bpy.data.collections.get(name)
+        if not col:
+            raise RuntimeError(f"Missing collection: {name} (bake with create_moving_parts.py first)")
+        objs.extend(col.objects)
+
+    return objs + module_extra_objects(objs)
+
+def module_extra_objects(baked):
+    """Animated objects outside the baked collections (bake_mechanics parts)."""
+    seen = {o.name for o in baked}
+    asm = bpy.data.collections.get(COL_ASSEMBLY)
+    if asm:
+        seen.update(o.name for o in asm.all_objects)
+    return [o for o in bpy.data.objects
+            if o.name not in seen
+            and o.type not in MODULE_EXTRA_SKIP_TYPES
+            and object_action(o) is not None]
+
+def object_action(obj):
+    ad = obj.animation_data
+    return ad.action if ad else None
+
+def action_range(objs):
+    lo, hi = math.inf, -math.inf
+    for act in {object_action(o) for o in objs} - {None}:
+        a0, a1 = act.frame_range
+        lo, hi = min(lo, a0), max(hi, a1)
+    if lo > hi:
+        raise RuntimeError("No baked animation on the source objects")
+    return lo, hi
+
+
+# -------------------------
+# PERIODICITY
+# -------------------------
+def eval_channels(act, path, n, frame):
+    out = []
+    for i in range(n):
+        fc = act.fcurves.find(path, index=i)
+        out.append(fc.evaluate(frame) if fc else None)
+    return out
+
+def periodic_error(objs, a0, a1):
+    """Largest (location mm, rotation 1-|dot|) jump between bake start and end over all objects."""
+    worst_loc, worst_rot = 0.0, 0.0
+    for act in {object_action(o) for o in objs} - {None}:
+        l0 = eval_channels(act, "location", 3, a0)
+        l1 = eval_channels(act, "location", 3, a1)
+        d = [b - a for a, b in zip(l0, l1) if a is not None]
+        if d:
+            worst_loc = max(worst_loc, math.sqrt(sum(x * x for x in d)))
+
+        q0 = eval_channels(act, "rotation_quaternion", 4, a0)
+        q1 = eval_channels(act, "rotation_quaternion", 4, a1)
+        if None not in q0 and None not in q1:
+            q0 = Quaternion(q0).normalized()
+            q1 = Quaternion(q1).normalized()
+            worst_rot = max(worst_rot, 1.0 - abs(q0.dot(q1)))
+    return worst_loc, worst_rot
+
+def make_cyclic(objs):
+    n = 0
+    for act in {object_action(o) for o in objs} - {None}:
+        for fc in act.fcurves:
+            if not any(m.type == 'CYCLES' for m in fc.modifiers):
+                fc.modifiers.new('CYCLES')
+                n += 1
+    return n
+
+
+# -------------------------
+# MODULES
+# -------------------------
+def play_shifted(obj, act, a0, a1, phase, frame_start):
+    """Drive obj by the shared `act` through one NLA strip showing action frame f + phase at frame f."""
+    obj.animation_data_clear()
+    if act is None:
+        return
+    ad = obj.animation_data_create()
+    ad.action = None
+    track = ad.nla_tracks.new()
+    track.name = "ModulePhase"
+    strip = track.strips.new(act.name, int(frame_start), act)
+    strip.use_sync_length = False
+    strip.extrapolation = 'HOLD'
+    strip.blend_type = 'REPLACE'
+    # the setters clamp against each other: widen first, then narrow
+    if phase >= 0.0:
+        strip.action_frame_end = a1 + phase
+        strip.action_frame_start = a0 + phase
+    else:
+        strip.action_frame_start = a0 + phase
+        strip.action_frame_end = a1 + phase
+
+def build_module(k, offset, rot_deg, phase, src, a0, a1, col):
+    root = bpy.data.objects.new(f"Module_{k:03d}", None)
+    root.empty_display_type = 'ARROWS'
+    root.matrix_world = Matrix.Translation(offset) @ Matrix.Rotation(math.radians(rot_deg), 4, 'Z')
+    col.objects.link(root)
+
+    dup_of = {}
+    for s in src:
+        d = s.copy()              # shares s.data
+        d.name = f"M{k:03d}_{s.name}"
+        col.objects.link(d)
+        dup_of[s] = d
+
+    for s, d in dup_of.items():
+        play_shifted(d, object_action(s), a0, a1, phase, FRAME_START)
+        if s.parent in dup_of:
+            d.parent = dup_of[s.parent]
+            d.matrix_parent_inverse = s.matrix_parent_inverse
+        else:
+            # keys are in the frame of s.parent (static) or world; the module empty goes on top
+            base = s.parent.matrix_world @ s.matrix_parent_inverse if s.parent else Matrix.Identity(4)
+            d.parent = root
+            d.matrix_parent_inverse = base
+    return root, list(dup_of.values())
+
+
+# -------------------------
+# EXPORT
+# -------------------------
+def export_glb(path, objs, frame_start, frame_end):
+    bpy.ops.object.select_all(action='DESELECT')
+    for o in objs:
+        o.select_set(True)
+    try:
+        bpy.ops.export_scene.gltf(
+            filepath=bpy.path.abspath(path),
+            export_format='GLB',
+            use_selection=True,
+            export_animations=True,
+            export_animation_mode='SCENE',   # samples NLA-driven objects per object
+            export_force_sampling=True,
+            export_frame_range=True,
+        )
+    except TypeError as e:
+        raise RuntimeError(f"glTF export needs the Blender 4.x exporter ('SCENE' animation mode): {e}")
+    print(f"GLB: {bpy.path.abspath(path)} (frames {frame_start}..{frame_end})")
+
+def export_assembly(path, layout, roots, mode, frame_start, frame_end, a0):
+    data = {
+        "format": "tread-container",
+        "version": 1,
+        "descriptor": DESCRIPTOR_PATH,
+        "phase_mode": mode,
+        "frame_start": frame_start,
+        "frame_end": frame_end,
+        "bake_frame_start": a0,
+        "modules": [
+            {
+                "name": root.name,
+                "offset": [round(c, 5) for c in off],
+                "rotation_z_deg": rot,
+                "phase_frames": ph,
+            }
+            for root, (off, rot, ph) in zip(roots, layout)
+        ],
+    }
+    with open(bpy.path.abspath(path), "w") as fh:
+        json.dump(data, fh, indent=2)
+    print(f"Assembly: {bpy.path.abspath(path)}")
+
+
+def data_counts():
+    acts = list(bpy.data.actions)
+    keys = sum(len(fc.keyframe_points) for a in acts for fc in a.fcurves)
+    return len(bpy.data.objects), len(bpy.data.meshes), len(acts), keys
+
+
+def main():
+    t0 = time.perf_counter()
+    scene = bpy.context.scene
+    col = ensure_collection(COL_ASSEMBLY)
+    clear_collection(col)
+
+    before = data_counts()
+    src = source_objects()
+    a0, a1 = action_range(src)
+    length = a1 - a0
+
+    layout = module_layout()
+    if not layout:
+        raise RuntimeError("No modules")
+
+    err_loc, err_rot = periodic_error(src, a0, a1)
+    periodic = err_loc <= PERIODIC_TOL_LOC and err_rot <= PERIODIC_TOL_ROT
+    mode = PHASE_MODE
+    if mode == 'AUTO':
+        mode = 'CYCLIC' if periodic else 'TRIM'
+    elif mode == 'CYCLIC' and not periodic:
+        print(f"⚠️ Bake is not periodic (jump {err_loc:.3g} mm / {err_rot:.2g}), using 'TRIM'")
+        mode = 'TRIM'
+
+    if mode == 'CYCLIC':
+        make_cyclic(src)
+        layout = [(off, rot, ph % length) for off, rot, ph in layout]
+        frame_start, frame_end = FRAME_START, FRAME_END
+    else:
+        ph_min = min(ph for _, _, ph in layout)
+        layout = [(off, rot, ph - ph_min) for off, rot, ph in layout]
+        ph_max = max(ph for _, _, ph in layout)
+        if ph_max >= length:
+            raise RuntimeError(f"Phase spread {ph_max:g} frames >= bake length {length:g}: "
+                               f"bake longer or use PHASE_MODE = 'CYCLIC' with a periodic bake")
+        frame_start, frame_end = FRAME_START, int(math.floor(FRAME_END - ph_max))
+
+    roots, objs = [], []
+    for k, (off, rot, ph) in enumerate(layout):
+        root, dups = build_module(k, off, rot, ph, src, a0, a1, col)
+        roots.append(root)
+        objs.extend(dups)
+
+    if HIDE_SOURCE:
+        for name in (COL_CHAIN_L, COL_CHAIN_R, COL_RIGS):
+            c = bpy.data.collections[name]
+            c.hide_viewport = True
+            c.hide_render = True
+        baked = {o.name for name in (COL_CHAIN_L, COL_CHAIN_R, COL_RIGS)
+                 for o in bpy.data.collections[name].objects}
+        for o in src:
+            if o.name not in baked:
+                o.hide_set(True)
+                o.hide_render = True
+
+    scene.frame_start, scene.frame_end = frame_start, frame_end
+    bpy.context.view_layer.update()
+    t_build = time.perf_counter() - t0
+
+    after = data_counts()
+    print(f"Modules: {len(layout)} × {len(src)} objects, phase mode {mode}, "
+          f"frames {frame_start}..{frame_end} (bake {a0:g}..{a1:g}, "
+          f"end jump {err_loc:.3g} mm / {err_rot:.2g})")
+    for root, (off, rot, ph) in zip(roots, layout):
+        print(f"  {root.name}  offset ({off.x:8.1f}, {off.y:8.1f}, {off.z:8.1f})  "
+              f"rot {rot:6.1f}°  phase {ph:7.2f} frames")
+    print(f"Data: objects {before[0]} → {after[0]}, meshes {before[1]} → {after[1]}, "
+          f"actions {before[2]} → {after[2]}, keyframes {before[3]} → {after[3]} "
+          f"| built in {t_build:.2f}s")
+
+    if EXPORT_GLB_PATH:
+        export_glb(EXPORT_GLB_PATH, roots + objs, frame_start, frame_end)
+    if EXPORT_ASSEMBLY_PATH:
+        export_assembly(EXPORT_ASSEMBLY_PATH, layout, roots, mode, frame_start, frame_end, a0)
+
+    print(f"✅ Container assembly: {len(layout)} modules from one bake in {time.perf_counter() - t0:.2f}s")
+
+main()
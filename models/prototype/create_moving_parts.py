@@ -1,7 +1,19 @@
 import bpy
+import json
 import math
+import sys
+import threading
+import time
 from bisect import bisect_right
+from collections import Counter
+from itertools import islice
 from mathutils import Vector, Matrix
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 CURVE_L_NAME = "TrackPath_L"
 CURVE_R_NAME = "TrackPath_R"
@@ -18,6 +30,25 @@ COL_CHAIN_L = "BakedChain_L"
 COL_CHAIN_R = "BakedChain_R"
 COL_RIGS    = "BakedCamAndWings"
 
+# Live preview: instead of baking, register a frame-change handler that poses
+# the links / rigs / gears for the current frame only. Scene custom properties
+# named WING_MAP (JSON list of [t, deg]), CAM_ANGLE_SIGN, PIN_OUTER_HALF_DIST
+# or FOLLOWER_OUTER_HALF_DIST override the script values while scrubbing.
+# Run again with PREVIEW_MODE = False to bake for export.
+PREVIEW_MODE = False
+
+# Procedural pose descriptor: track, pitch, link pattern, marker offsets,
+# prepared WING_MAP, gear ratios and travel, so a client can compute every
+# pose itself (reference evaluator: analysis/pose_descriptor.py).
+# '' = off, '//' = relative to the .blend.
+EXPORT_DESCRIPTOR_PATH = ""
+DESCRIPTOR_DECIMALS = 5
+DESCRIPTOR_UP_CONST_TOL = 1e-4  # link ups with both plane coefficients above this are stored per frame
+
+# Re-bake in place: reuse baked objects by name (only their keys are reset),
+# create / remove only the difference. False = clear collections and purge.
+REUSE_BAKED_OBJECTS = True
+
 PERIOD_N   = 6
 SPECIAL_AT = 0
 
@@ -60,6 +91,29 @@ USE_MASTER_THETA = True
 MASTER_SPEED_RAD_PER_FRAME = 0.05
 MASTER_PHASE_RAD = 0.0
 
+# Where the gear angle per frame comes from:
+#   'MASTER'    = constant speed master_theta(frame)
+#   'TELEMETRY' = replay a recorded log (gear angle or tread speed) from a deployed unit
+TRAVEL_SOURCE = 'MASTER'
+# 'SMOOTH'  : chain travel = gear angle * gear_r
+# 'CHORDAL' : polygonal sprocket action, one pitch per tooth with the chordal
+#             speed ripple (analysis/chordal_action.py). Logged tread speed is
+#             already real travel and is used as is.
+CHAIN_TRAVEL_MODEL = 'SMOOTH'
+
+TELEMETRY_PATH = "//telemetry/unit_log.csv"   # '//' = relative to the .blend
+TELEMETRY_FORMAT = 'CSV'          # 'CSV' or 'BIN' (little-endian float64 pairs: time, value)
+TELEMETRY_KIND = 'GEAR_ANGLE'     # 'GEAR_ANGLE' or 'TREAD_SPEED'
+TELEMETRY_CSV_HEADER_ROWS = 1
+TELEMETRY_CSV_DELIMITER = ","
+TELEMETRY_TIME_COL = 0
+TELEMETRY_VALUE_COL = 1
+TELEMETRY_TIME_SCALE = 1.0        # log time units -> seconds (1e-3 for ms)
+TELEMETRY_ANGLE_UNITS = 'DEG'     # 'DEG' or 'RAD' (GEAR_ANGLE logs)
+TELEMETRY_SPEED_TO_SCENE = 1000.0 # log speed units per second -> scene units (m/s -> mm)
+TELEMETRY_START_S = 0.0           # log time shown at FRAME_START
+TELEMETRY_CHUNK_ROWS = 200000
+
 # Chain travel direction ONLY (do not touch gear visual direction)
 CHAIN_SIGN = +1.0  # flip if chain moves wrong way: +1 / -1
 
@@ -92,6 +146,21 @@ WING_MAP_AUTO_FIX_LOOP = True
 # If cam feels reversed, flip:
 CAM_ANGLE_SIGN = -1.0
 
+# Bake instrumentation: per-stage wall/CPU time, counters, peak memory.
+# Timers run once per stage per frame, so leaving this on costs well under 1%.
+PROFILE_ENABLE = False
+PROFILE_REPORT_PATH = "//bake_profile.json"   # '' = summary line only
+PROFILE_SAMPLER = False                       # sample the Python stack (top functions)
+PROFILE_SAMPLE_INTERVAL_S = 0.005
+PROFILE_SAMPLER_TOP = 25
+
+# Reduce the evaluated TrackPath to the vertices needed to keep the position error
+# (at equal arc length) within TRACK_RESAMPLE_TOL scene units. Kept
+# vertices keep their original arc length, so total length, link count and
+# pitch are unchanged; straights collapse to their end points.
+TRACK_RESAMPLE = True
+TRACK_RESAMPLE_TOL = 0.005
+
 WING_MAP = [
     (0.00, 10.0),
     (0.04, 0.0),
@@ -118,6 +187,110 @@ WING_MAP = [
 
 
 # ---------- helpers ----------
+class BakeProfiler:
+    """
+    Lap timers, counters and an optional stack sampler for the bake.
+    lap(stage) books the time since the previous mark() / lap() to `stage`,
+    so each instrumented phase costs two clock reads. Disabled = no-ops.
+    """
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.wall = Counter()
+        self.cpu = Counter()
+        self.counts = Counter()
+        self.samples = Counter()
+        self._w = self._c = 0.0
+        self._t_start = None
+        self._sampler = None
+        self._stop = threading.Event()
+
+    def mark(self):
+        if self.enabled:
+            self._w = time.perf_counter()
+            self._c = time.process_time()
+
+    def lap(self, stage):
+        if self.enabled:
+            w = time.perf_counter()
+            c = time.process_time()
+            self.wall[stage] += w - self._w
+            self.cpu[stage] += c - self._c
+            self._w = w
+            self._c = c
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counts[name] += n
+
+    def start(self):
+        if not self.enabled:
+            return
+        self._t_start = (time.perf_counter(), time.process_time())
+        if PROFILE_SAMPLER:
+            target = threading.get_ident()
+            self._sampler = threading.Thread(target=self._sample_loop, args=(target,), daemon=True)
+            self._sampler.start()
+        self.mark()
+
+    def _sample_loop(self, target):
+        while not self._stop.wait(PROFILE_SAMPLE_INTERVAL_S):
+            frame = sys._current_frames().get(target)
+            if frame is not None:
+                code = frame.f_code
+                self.samples[f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})"] += 1
+
+    @staticmethod
+    def peak_rss_mb():
+        if resource is None:
+            return None
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+
+    def finish(self):
+        if not self.enabled:
+            return None
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+
+        total_wall = time.perf_counter() - self._t_start[0]
+        total_cpu = time.process_time() - self._t_start[1]
+        report = {
+            "total_wall_s": total_wall,
+            "total_cpu_s": total_cpu,
+            "stages": {k: {"wall_s": self.wall[k], "cpu_s": self.cpu[k]}
+                       for k in sorted(self.wall, key=self.wall.get, reverse=True)},
+            "counters": dict(self.counts),
+            "peak_rss_mb": self.peak_rss_mb(),
+        }
+        if self.samples:
+            n = sum(self.samples.values())
+            report["sampler"] = {
+                "interval_s": PROFILE_SAMPLE_INTERVAL_S,
+                "samples": n,
+                "top": [(name, c, c / n) for name, c in self.samples.most_common(PROFILE_SAMPLER_TOP)],
+            }
+
+        if PROFILE_REPORT_PATH:
+            with open(bpy.path.abspath(PROFILE_REPORT_PATH), "w") as fh:
+                json.dump(report, fh, indent=2)
+
+        stages = ", ".join(f"{k} {v['wall_s']:.2f}s" for k, v in report["stages"].items())
+        counts = " ".join(f"{k}={v}" for k, v in report["counters"].items())
+        peak = report["peak_rss_mb"]
+        print(f"⏱ bake {total_wall:.2f}s wall / {total_cpu:.2f}s cpu | {stages} | {counts}"
+              + (f" | peak {peak:.0f} MB" if peak is not None else ""))
+        return report
+
+PROF = BakeProfiler(False)
+
+def key_matrix_world(obj, M, frame):
+    obj.matrix_world = M
+    obj.scale = (1,1,1)
+    obj.keyframe_insert("location", frame=frame)
+    obj.keyframe_insert("rotation_quaternion", frame=frame)
+
 def get_obj(name, type_=None):
     o = bpy.data.objects.get(name)
     if not o:
@@ -152,6 +325,42 @@ def duplicate_object(src_obj, name, collection):
     strip_animation(obj)
     return obj
 
+def reset_animation(obj):
+    ad = obj.animation_data
+    if not ad:
+        return
+    act = ad.action
+    if act is not None and act.users == 1 and hasattr(act, "fcurves"):
+        act.fcurves.clear()  # keyframe_insert() refills the same action
+        return
+    obj.animation_data_clear()
+    if act is not None and act.users == 0:
+        bpy.data.actions.remove(act)
+
+def collect_pool(collections):
+    return {o.name: o for col in collections for o in col.objects}
+
+def pooled_object(pool, src_obj, name, collection):
+    """
+    Take `name` from the pool if it is still the same part (same data block,
+    or an empty when src_obj is None) in the same collection; otherwise
+    create it. Pass an empty pool to always create.
+    """
+    obj = pool.pop(name, None)
+    if obj is not None:
+        same = (obj.type == 'EMPTY') if src_obj is None else (obj.data == src_obj.data)
+        if same and collection.objects.get(name) is obj:
+            reset_animation(obj)
+            obj.rotation_mode = 'QUATERNION'
+            obj.scale = (1, 1, 1)
+            PROF.count("objects_reused")
+            return obj
+        bpy.data.objects.remove(obj, do_unlink=True)
+    PROF.count("objects_created")
+    if src_obj is None:
+        return new_empty(name, collection)
+    return duplicate_object(src_obj, name, collection)
+
 def new_empty(name, collection, empty_type='PLAIN_AXES'):
     obj = bpy.data.objects.new(name, None)
     obj.empty_display_type = empty_type
@@ -207,6 +416,16 @@ def eval_curve_polyline(curve_obj):
     if len(pts) < 2:
         raise RuntimeError("Not enough evaluated points on curve")
 
+    return (eval_obj,) + track_tables(pts)
+
+def track_tables(pts):
+    """Lookup tables of the evaluated track as the bake uses them (resampled when TRACK_RESAMPLE)."""
+    pts2, seglen, cum, total = polyline_tables(pts)
+    if TRACK_RESAMPLE:
+        pts2, seglen, cum = resample_polyline(pts2, cum, TRACK_RESAMPLE_TOL)
+    return pts2, seglen, cum, total
+
+def polyline_tables(pts):
     pts2 = pts + [pts[0]]
 
     total = 0.0
@@ -218,7 +437,44 @@ def eval_curve_polyline(curve_obj):
         total += l
         cum.append(total)
 
-    return eval_obj, pts2, seglen, cum, total
+    return pts2, seglen, cum, total
+
+def resample_polyline(pts2, cum, tol):
+    """
+    Error-bounded simplification of a closed polyline table (Douglas-Peucker
+    split). A span i..j is kept when every skipped vertex k lies within tol
+    of the point the lookup returns at cum[k] (lerp by arc-length fraction),
+    which bounds the chord error as well; otherwise it is split at the
+    vertex with the largest error. seglen / cum stay in original arc length,
+    so eval_curve_at_distance_fast() needs no changes.
+    """
+    n = len(pts2) - 1
+    if n < 2:
+        return pts2, [cum[m + 1] - cum[m] for m in range(n)], cum
+    P = np.array([tuple(p) for p in pts2], dtype=np.float64)
+    C = np.asarray(cum, dtype=np.float64)
+    tol2 = tol * tol
+    keep = np.zeros(n + 1, dtype=bool)
+    keep[0] = keep[n] = True
+    stack = [(0, n)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        span = C[j] - C[i]
+        s = (C[i + 1:j] - C[i]) / span if span > 1e-12 else np.zeros(j - i - 1)
+        d2 = ((P[i + 1:j] - (P[i] + s[:, None] * (P[j] - P[i]))) ** 2).sum(axis=1)
+        k = int(np.argmax(d2))
+        if d2[k] > tol2:
+            k += i + 1
+            keep[k] = True
+            stack += [(i, k), (k, j)]
+
+    idx = np.flatnonzero(keep)
+    pts2 = [pts2[k] for k in idx]
+    cum = [cum[k] for k in idx]
+    seglen = [cum[m + 1] - cum[m] for m in range(len(cum) - 1)]
+    return pts2, seglen, cum
 
 def eval_curve_at_distance_fast(eval_obj, pts2, seglen, cum, total, dist):
     mw = eval_obj.matrix_world
@@ -238,6 +494,108 @@ def eval_curve_at_distance_fast(eval_obj, pts2, seglen, cum, total, dist):
 def master_theta(frame: int) -> float:
     return (float(frame) * float(MASTER_SPEED_RAD_PER_FRAME)) + float(MASTER_PHASE_RAD)
 
+def iter_telemetry_chunks(path):
+    """Yield (time_s, value) float64 arrays, TELEMETRY_CHUNK_ROWS samples at a time."""
+    if TELEMETRY_FORMAT == 'BIN':
+        rec = np.dtype([("t", "<f8"), ("v", "<f8")])
+        with open(path, "rb") as fh:
+            while True:
+                buf = fh.read(TELEMETRY_CHUNK_ROWS * rec.itemsize)
+                n = len(buf) // rec.itemsize
+                if n == 0:
+                    return
+                a = np.frombuffer(buf, dtype=rec, count=n)
+                yield a["t"] * TELEMETRY_TIME_SCALE, a["v"].astype(np.float64)
+    else:
+        cols = (TELEMETRY_TIME_COL, TELEMETRY_VALUE_COL)
+        with open(path, newline="") as fh:
+            for _ in range(TELEMETRY_CSV_HEADER_ROWS):
+                fh.readline()
+            while True:
+                lines = list(islice(fh, TELEMETRY_CHUNK_ROWS))
+                if not lines:
+                    return
+                a = np.loadtxt(lines, delimiter=TELEMETRY_CSV_DELIMITER, usecols=cols, ndmin=2)
+                if len(a):
+                    yield a[:, 0] * TELEMETRY_TIME_SCALE, a[:, 1]
+
+def telemetry_frame_theta(frame_start, frame_end, fps, gear_r):
+    """
+    Gear angle (rad) for every frame, resampled from the telemetry log.
+    The log is streamed chunk by chunk and only frame-rate values are kept, so
+    hours of kHz data never sit in memory. Angles are unwrapped across chunk
+    boundaries; tread speed is integrated (trapezoid) and divided by gear_r.
+    """
+    path = bpy.path.abspath(TELEMETRY_PATH)
+    n_frames = frame_end - frame_start + 1
+    frame_t = TELEMETRY_START_S + np.arange(n_frames) / float(fps)
+    out = np.empty(n_frames)
+
+    ang_scale = math.pi / 180.0 if TELEMETRY_ANGLE_UNITS == 'DEG' else 1.0
+    last = None   # (time, raw value, continuous theta) of the previous sample
+    k = 0
+
+    for t, v in iter_telemetry_chunks(path):
+        if TELEMETRY_KIND == 'GEAR_ANGLE':
+            raw = v * ang_scale
+            if last is None:
+                cont = np.unwrap(raw)
+            else:
+                u = np.unwrap(np.concatenate(([last[1]], raw)))
+                cont = u[1:] - u[0] + last[2]
+        else:
+            raw = v * (TELEMETRY_SPEED_TO_SCENE / gear_r)
+            if last is None:
+                t0, r0, c0 = t[0], raw[0], 0.0
+            else:
+                t0, r0, c0 = last
+            tt = np.concatenate(([t0], t))
+            rr = np.concatenate(([r0], raw))
+            cont = c0 + np.cumsum(0.5 * (rr[1:] + rr[:-1]) * np.diff(tt))
+
+        if last is None:
+            xp, fp = t, cont
+        else:
+            xp = np.concatenate(([last[0]], t))
+            fp = np.concatenate(([last[2]], cont))
+
+        k_end = int(np.searchsorted(frame_t, xp[-1], side="right"))
+        if k_end > k:
+            out[k:k_end] = np.interp(frame_t[k:k_end], xp, fp)
+            k = k_end
+
+        last = (t[-1], raw[-1], cont[-1])
+        if k >= n_frames:
+            break
+
+    if last is None:
+        raise RuntimeError(f"No telemetry samples in {path}")
+    if k < n_frames:
+        print(f"⚠️ Telemetry ends at {last[0]:.3f} s; holding the last value for {n_frames - k} frames.")
+        out[k:] = last[2]
+
+    return out.tolist()
+
+def chordal_travel_active():
+    return CHAIN_TRAVEL_MODEL == 'CHORDAL' and not (TRAVEL_SOURCE == 'TELEMETRY' and TELEMETRY_KIND == 'TREAD_SPEED')
+
+def chain_travel(theta, pitch, gear_r):
+    """Distance the chain has moved for gear angle theta (rad), see CHAIN_TRAVEL_MODEL."""
+    if not chordal_travel_active():
+        return theta * gear_r
+    half = math.pi / float(GEAR_TEETH)
+    k = math.floor((theta + half) / (2.0 * half))
+    return k * pitch + gear_r * math.sin(theta - 2.0 * half * k)
+
+def frame_theta_list(scene, gear_r):
+    """Gear angle (rad) for FRAME_START..FRAME_END from TRAVEL_SOURCE."""
+    if TRAVEL_SOURCE == 'TELEMETRY':
+        fps = scene.render.fps / scene.render.fps_base
+        return telemetry_frame_theta(FRAME_START, FRAME_END, fps, gear_r)
+    if USE_MASTER_THETA:
+        return [master_theta(f) for f in range(FRAME_START, FRAME_END + 1)]
+    return [0.0] * (FRAME_END - FRAME_START + 1)
+
 def axis_vec_from_letter(letter: str) -> Vector:
     l = letter.upper()
     if l == 'X': return Vector((1,0,0))
@@ -257,7 +615,7 @@ def clear_anim_on(obj):
     if obj and obj.animation_data:
         obj.animation_data_clear()
 
-def bake_mechanics(scene):
+def bake_mechanics(scene, frame_theta):
     if not BAKE_MECHANICS:
         return
 
@@ -267,25 +625,21 @@ def bake_mechanics(scene):
             if o:
                 clear_anim_on(o)
 
-    axis_cache = {}
+    PROF.mark()
 
     for f in range(FRAME_START, FRAME_END + 1):
         scene.frame_set(f)
+        PROF.lap("frame_set")
         bpy.context.view_layer.update()
+        PROF.lap("view_update")
 
-        th = master_theta(f)
-
-        for (name, ratio, sign, ax_letter) in MECH_ROT:
-            obj = bpy.data.objects.get(name)
-            if not obj:
-                continue
-
-            if ax_letter not in axis_cache:
-                axis_cache[ax_letter] = axis_vec_from_letter(ax_letter)
+        th = frame_theta[f - FRAME_START]
 
-            axis = axis_cache[ax_letter]
-            q = quat_from_axis_angle(axis, th * float(ratio) * float(sign))
+        for obj, q in mech_quats(th):
             set_obj_quat(obj, q, f)
+            PROF.count("keys_inserted")
+
+        PROF.lap("mechanics_keys")
 
 def stable_basis_from_forward(forward, prev_up=None):
     y = forward.normalized()
@@ -461,10 +815,389 @@ def basis_from_cam_angle(x_axis_world: Vector, angle_deg: float, base_y_world: V
     return R
 
 
+# -------------------------
+# PER-FRAME POSES (shared by the bake and the live preview)
+# -------------------------
+def chain_matrices(eval_data, n_links, curve_dir_sign, traveled, pitch, joints, prev_up_per_link):
+    """World matrices of all links at one travel value; prev_up_per_link is updated in place."""
+    eval_obj, pts2, seglen, cum, total_len = eval_data
+    a_j0, a_j1, b_j0, b_j1 = joints
+
+    ps = [None] * n_links
+    for i in range(n_links):
+        dist = curve_dir_sign * (i * pitch) + traveled
+        ps[i] = eval_curve_at_distance_fast(eval_obj, pts2, seglen, cum, total_len, dist)
+    PROF.lap("curve_lookup")
+
+    mats = [None] * n_links
+    chain_prev_up = None
+    for i in range(n_links):
+        p0 = ps[i]
+        p1 = ps[(i + 1) % n_links]
+        is_special = ((i % PERIOD_N) == SPECIAL_AT)
+        j0_l, j1_l = (b_j0, b_j1) if is_special else (a_j0, a_j1)
+
+        up_hint = prev_up_per_link[i] if prev_up_per_link[i] is not None else chain_prev_up
+        Mw, new_up = link_matrix_world_for_two_joints(p0, p1, j0_l, j1_l, up_hint)
+
+        prev_up_per_link[i] = new_up
+        chain_prev_up = new_up
+        mats[i] = Mw
+    PROF.lap("link_matrices")
+    return mats
+
+def rig_matrices(cfg, i, mwL, mwR, traveled):
+    """
+    (pin L, pin R, follower L, follower R, wing) world matrices of the rig on
+    link i, from the world matrices of that link on both chains. cfg holds
+    the per-bake constants (see main()); the wing pivot shares the wing matrix.
+    """
+    C0L_w = (mwL @ cfg["c0_local"])
+    C0R_w = (mwR @ cfg["c0_local"])
+
+    x_vec = (C0R_w - C0L_w)
+    if x_vec.length < 1e-9:
+        x_dir = Vector((1, 0, 0))
+        half_sep = 0.0
+    else:
+        x_dir = x_vec.normalized()
+        half_sep = 0.5 * x_vec.length
+
+    pin_extra = (cfg["pin_half_dist"] - half_sep)
+    fol_extra = (cfg["fol_half_dist"] - half_sep)
+
+    PIN_L_w = C0L_w - x_dir * pin_extra
+    PIN_R_w = C0R_w + x_dir * pin_extra
+
+    FOL_L_w = C0L_w - x_dir * fol_extra
+    FOL_R_w = C0R_w + x_dir * fol_extra
+
+    qL_M = mwL.to_quaternion().to_matrix().to_4x4()
+    qR_M = mwR.to_quaternion().to_matrix().to_4x4()
+
+    pin_off = cfg["pin_h0_off_M"]
+    if pin_off is None:
+        pinL_M = Matrix.Translation(PIN_L_w) @ qL_M
+        pinR_M = Matrix.Translation(PIN_R_w) @ qR_M
+    else:
+        pinL_M = Matrix.Translation(PIN_L_w) @ qL_M @ pin_off
+        pinR_M = Matrix.Translation(PIN_R_w) @ qR_M @ pin_off
+
+    mid = (C0L_w + C0R_w) * 0.5
+    if FORCE_WING_WORLD_X_ZERO:
+        mid.x = 0.0
+
+    if WING_CAM_ENABLE:
+        distL = cfg["dirL"] * (i * cfg["pitch"]) + traveled
+        t = (distL % cfg["total_len"]) / cfg["total_len"]
+
+        ang = map_angle_from_points(t, cfg["wing_map"], use_smooth=WING_MAP_SMOOTHSTEP)
+        ang *= cfg["cam_sign"]
+
+        base_y = (mwL.to_3x3() @ Vector((0, 1, 0)))
+        R = basis_from_cam_angle(x_vec, ang, base_y)
+    else:
+        x = x_vec
+        if x.length < 1e-9:
+            x = Vector((1, 0, 0))
+        x.normalize()
+
+        y = (mwL.to_3x3() @ Vector((0, 1, 0)))
+        if y.length < 1e-9:
+            y = Vector((0, 1, 0))
+        y.normalize()
+
+        z = x.cross(y)
+        if z.length < 1e-8:
+            z = WORLD_UP.copy()
+        z.normalize()
+
+        y = z.cross(x)
+        if y.length < 1e-8:
+            y = Vector((0, 1, 0))
+        y.normalize()
+
+        R = Matrix((x, y, z)).transposed()
+
+    R4 = R.to_4x4()
+
+    fol_off = cfg["fol_h0_off_M"]
+    if fol_off is None:
+        folL_M = Matrix.Translation(FOL_L_w) @ R4
+        folR_M = Matrix.Translation(FOL_R_w) @ R4
+    else:
+        folL_M = Matrix.Translation(FOL_L_w) @ R4 @ fol_off
+        folR_M = Matrix.Translation(FOL_R_w) @ R4 @ fol_off
+
+    wing_M = Matrix.Translation(mid) @ R4
+    return pinL_M, pinR_M, folL_M, folR_M, wing_M
+
+def mech_quats(th):
+    """(obj, quaternion) for every MECH_ROT object present, at gear angle th."""
+    out = []
+    for (name, ratio, sign, ax_letter) in MECH_ROT:
+        obj = bpy.data.objects.get(name)
+        if obj:
+            axis = axis_vec_from_letter(ax_letter)
+            out.append((obj, quat_from_axis_angle(axis, th * float(ratio) * float(sign))))
+    return out
+
+
+# -------------------------
+# LIVE PREVIEW
+# -------------------------
+PREVIEW_OVERRIDES = ("WING_MAP", "CAM_ANGLE_SIGN", "PIN_OUTER_HALF_DIST", "FOLLOWER_OUTER_HALF_DIST")
+
+class LivePreview:
+    """
+    Frame-change handler state. pose(frame) computes the matrices for that
+    frame only and memoizes them; the cache is dropped whenever one of the
+    PREVIEW_OVERRIDES scene properties changes.
+    """
+
+    def __init__(self, cfg, evalL0, evalR0, dirL, dirR, joints, linksL, linksR, rigs, frame_theta, gear_r):
+        self.cfg = cfg
+        self.evalL0, self.evalR0 = evalL0, evalR0
+        self.dirL, self.dirR = dirL, dirR
+        self.joints = joints
+        self.linksL, self.linksR = linksL, linksR
+        self.rigs = rigs
+        self.frame_theta = frame_theta
+        self.gear_r = gear_r
+        self.cache = {}
+        self.ups = {}           # frame -> per-link up vectors after posing it, (L, R)
+        self.signature = None
+
+    def refresh_params(self, scene):
+        values = tuple(str(scene.get(name, "")) for name in PREVIEW_OVERRIDES)
+        if values == self.signature:
+            return
+        self.signature = values
+        self.cache.clear()
+
+        wing_map = WING_MAP
+        if scene.get("WING_MAP"):
+            wing_map = [tuple(p) for p in json.loads(scene["WING_MAP"])]
+        self.cfg["wing_map"] = prepare_wing_map(wing_map)
+        self.cfg["cam_sign"] = float(scene.get("CAM_ANGLE_SIGN", CAM_ANGLE_SIGN))
+        self.cfg["pin_half_dist"] = float(scene.get("PIN_OUTER_HALF_DIST", PIN_OUTER_HALF_DIST))
+        self.cfg["fol_half_dist"] = float(scene.get("FOLLOWER_OUTER_HALF_DIST", FOLLOWER_OUTER_HALF_DIST))
+
+    def theta_at(self, frame):
+        k = frame - FRAME_START
+        if 0 <= k < len(self.frame_theta):
+            return self.frame_theta[k]
+        if TRAVEL_SOURCE == 'MASTER' and USE_MASTER_THETA:
+            return master_theta(frame)
+        return self.frame_theta[0 if k < 0 else -1]
+
+    def traveled_at(self, frame):
+        th = self.theta_at(frame)
+        return chain_travel((th - self.frame_theta[0]) * CHAIN_SIGN, self.cfg["pitch"], self.gear_r)
+
+    def up_hints(self, frame):
+        """
+        Per-link up vectors the bake uses as hints at `frame`: transported
+        frame by frame from FRAME_START like bake_chain_from_eval() does, so
+        the links do not roll over once they have gone round a gear.
+        """
+        last = max(frame, FRAME_START) - 1
+        k = max((j for j in self.ups if j <= last), default=FRAME_START - 1)
+        if k in self.ups:
+            upsL, upsR = (list(u) for u in self.ups[k])
+        else:
+            upsL, upsR = [None] * len(self.linksL), [None] * len(self.linksR)
+        for j in range(k + 1, last + 1):
+            traveled = self.traveled_at(j)
+            chain_matrices(self.evalL0, len(upsL), self.dirL, traveled, self.cfg["pitch"], self.joints, upsL)
+            chain_matrices(self.evalR0, len(upsR), self.dirR, traveled, self.cfg["pitch"], self.joints, upsR)
+            self.ups[j] = (list(upsL), list(upsR))
+        return upsL, upsR
+
+    def pose(self, frame):
+        hit = self.cache.get(frame)
+        if hit is not None:
+            return hit
+
+        th = self.theta_at(frame)
+        traveled = self.traveled_at(frame)
+        nL, nR = len(self.linksL), len(self.linksR)
+        upsL, upsR = self.up_hints(frame)
+        matsL = chain_matrices(self.evalL0, nL, self.dirL, traveled, self.cfg["pitch"], self.joints, upsL)
+        matsR = chain_matrices(self.evalR0, nR, self.dirR, traveled, self.cfg["pitch"], self.joints, upsR)
+        if frame >= FRAME_START:
+            self.ups[frame] = (list(upsL), list(upsR))
+
+        writes = list(zip(self.linksL, matsL)) + list(zip(self.linksR, matsR))
+        for (i, pinL, folL, pinR, folR, wingPivot, wing) in self.rigs:
+            mPL, mPR, mFL, mFR, mW = rig_matrices(self.cfg, i, matsL[i], matsR[i], traveled)
+            writes += [(pinL, mPL), (pinR, mPR), (folL, mFL), (folR, mFR), (wingPivot, mW), (wing, mW)]
+
+        quats = mech_quats(th) if BAKE_MECHANICS else []
+        self.cache[frame] = (writes, quats)
+        return writes, quats
+
+    def apply(self, scene):
+        self.refresh_params(scene)
+        writes, quats = self.pose(scene.frame_current)
+        for obj, M in writes:
+            obj.matrix_world = M
+            obj.scale = (1, 1, 1)
+        for obj, q in quats:
+            obj.rotation_mode = 'QUATERNION'
+            obj.rotation_quaternion = q
+
+def tread_live_preview(scene, depsgraph=None):
+    if _PREVIEW is not None:
+        _PREVIEW.apply(scene)
+
+_PREVIEW = None
+
+def start_live_preview(scene, preview):
+    """Replace any previously registered preview handler and pose the current frame."""
+    global _PREVIEW
+    handlers = bpy.app.handlers.frame_change_post
+    for h in list(handlers):
+        if getattr(h, "__name__", "") == "tread_live_preview":
+            handlers.remove(h)
+    _PREVIEW = preview
+    if preview is not None:
+        handlers.append(tread_live_preview)
+        preview.apply(scene)
+
+
+# -------------------------
+# POSE DESCRIPTOR EXPORT
+# -------------------------
+def link_up_reference(eval_data, count, curve_dir, pitch, joints, frame_theta, gear_r):
+    """
+    Track plane normal N and the links' transported up vectors as
+    coefficients (a, b) of up = a N + b (N x forward), which is exact on a
+    planar track (up is perpendicular to forward). Each frame's transport
+    rejects the previous up against the new forward, which scales b by the
+    cosine of the turn and renormalizes, so (a, b) only stays fixed when
+    a = 0 or b = 0 (track plane containing / perpendicular to WORLD_UP).
+    Returns (normal, coef at FRAME_START, per-frame coefs or None when the
+    FRAME_START values hold for every frame).
+    """
+    eval_obj, pts2, seglen, cum, total = eval_data
+    mw = eval_obj.matrix_world
+    P = np.array([tuple(mw @ p) for p in pts2[:-1]])
+    normal = Vector(np.linalg.svd(P - P.mean(axis=0))[2][-1])
+    if normal[max(range(3), key=lambda k: abs(normal[k]))] < 0.0:
+        normal = -normal
+
+    ups = [None] * count
+    frames = []
+    for th in frame_theta:
+        traveled = chain_travel((th - frame_theta[0]) * CHAIN_SIGN, pitch, gear_r)
+        chain_matrices(eval_data, count, curve_dir, traveled, pitch, joints, ups)
+        ps = [eval_curve_at_distance_fast(eval_obj, pts2, seglen, cum, total, curve_dir * (i * pitch) + traveled)
+              for i in range(count)]
+        coef = []
+        for i in range(count):
+            side = normal.cross(ps[(i + 1) % count] - ps[i])
+            side = side.normalized() if side.length > 1e-9 else Vector((0, 0, 0))
+            coef.append((ups[i].dot(normal), ups[i].dot(side)))
+        frames.append(coef)
+        if len(frames) == 1 and all(min(abs(a), abs(b)) < DESCRIPTOR_UP_CONST_TOL for a, b in coef):
+            return normal, coef, None
+    return normal, frames[0], frames
+
+def export_pose_descriptor(path, cfg, evalL0, evalR0, dirR, joints, count, frame_theta, gear_r,
+                           pin_h0_local, fol_h0_local):
+    """Write the procedural description of the bake to `path` (JSON). Returns its size in bytes."""
+    def r(x):
+        return round(float(x), DESCRIPTOR_DECIMALS)
+
+    def vec(v):
+        return [r(c) for c in v]
+
+    def mat(M):
+        return [vec(row) for row in M]
+
+    def track(eval_data, curve_dir):
+        eval_obj, pts2, seglen, cum, total = eval_data
+        normal, coef, per_frame = link_up_reference(eval_data, count, curve_dir, cfg["pitch"], joints,
+                                                    frame_theta, gear_r)
+        up_ref = {"plane_normal": vec(normal), "coef": [[r(a), r(b)] for a, b in coef]}
+        if per_frame is not None:
+            up_ref["coef_frames"] = [[[r(a), r(b)] for a, b in c] for c in per_frame]
+        return {
+            "matrix_world": mat(eval_obj.matrix_world),
+            "points": [vec(p) for p in pts2[:-1]],
+            "cum": [r(c) for c in cum],
+            "total": r(total),
+            "curve_dir": curve_dir,
+            "up_ref": up_ref,
+        }
+
+    if TRAVEL_SOURCE == 'MASTER' and USE_MASTER_THETA:
+        travel = {"mode": "master", "speed_rad_per_frame": MASTER_SPEED_RAD_PER_FRAME,
+                  "phase_rad": MASTER_PHASE_RAD}
+    else:
+        travel = {"mode": "sampled", "theta": [r(th) for th in frame_theta]}
+    travel.update({"chain_sign": CHAIN_SIGN, "gear_r": r(gear_r),
+                   "model": "chordal" if chordal_travel_active() else "smooth", "teeth": GEAR_TEETH})
+
+    a_j0, a_j1, b_j0, b_j1 = joints
+    scene = bpy.context.scene
+    desc = {
+        "format": "tread-pose-descriptor",
+        "version": 2,
+        "fps": scene.render.fps / scene.render.fps_base,
+        "frame_start": FRAME_START,
+        "frame_end": FRAME_END,
+        "world_up": vec(WORLD_UP),
+        "travel": travel,
+        "tracks": {"L": track(evalL0, cfg["dirL"]), "R": track(evalR0, dirR)},
+        "chain": {
+            "count": count,
+            "pitch": r(cfg["pitch"]),
+            "period_n": PERIOD_N,
+            "special_at": SPECIAL_AT,
+            "joints": {"A": [vec(a_j0), vec(a_j1)], "B": [vec(b_j0), vec(b_j1)]},
+            "names": {"L": "L_ChainLink_{:04d}", "R": "R_ChainLink_{:04d}"},
+        },
+        "rig": {
+            "c0_local": vec(cfg["c0_local"]),
+            "pin_h0_local": None if cfg["pin_h0_off_M"] is None else vec(pin_h0_local),
+            "follower_h0_local": None if cfg["fol_h0_off_M"] is None else vec(fol_h0_local),
+            "pin_outer_half_dist": cfg["pin_half_dist"],
+            "follower_outer_half_dist": cfg["fol_half_dist"],
+            "force_wing_world_x_zero": FORCE_WING_WORLD_X_ZERO,
+            "wing_flip_around_hinge_x": WING_FLIP_AROUND_HINGE_X,
+            "names": {"pin_L": "Pin_L_{:04d}", "pin_R": "Pin_R_{:04d}",
+                      "follower_L": "Follower_L_{:04d}", "follower_R": "Follower_R_{:04d}",
+                      "wing_pivot": "WingPivot_{:04d}", "wing": "Wing_{:04d}"},
+        },
+        "wing_map": {
+            "enabled": WING_CAM_ENABLE,
+            "knots": [[r(t), r(a)] for t, a in cfg["wing_map"]],
+            "smoothstep": WING_MAP_SMOOTHSTEP,
+            "cam_angle_sign": cfg["cam_sign"],
+        },
+        "mechanics": [
+            {"name": name, "ratio": ratio, "sign": sign, "axis": ax}
+            for (name, ratio, sign, ax) in MECH_ROT if bpy.data.objects.get(name)
+        ],
+    }
+
+    text = json.dumps(desc, separators=(",", ":"))
+    with open(bpy.path.abspath(path), "w") as fh:
+        fh.write(text)
+    return len(text)
+
+
 def main():
+    global PROF
+    PROF = BakeProfiler(PROFILE_ENABLE)
+    PROF.start()
+
     wing_map_prepared = prepare_wing_map(WING_MAP)
 
     scene = bpy.context.scene
+    start_live_preview(scene, None)
     scene.frame_set(FRAME_START)
     bpy.context.view_layer.update()
 
@@ -475,11 +1208,6 @@ def main():
 
     gear = get_obj(GEAR_NAME)
 
-    if USE_MASTER_THETA and BAKE_MECHANICS:
-        bake_mechanics(scene)
-        scene.frame_set(FRAME_START)
-        bpy.context.view_layer.update()
-
     c0_local = get_child_local(linkB, CAM0_NAME)
     if c0_local is None:
         raise RuntimeError("Link_B missing C0 marker (child empty named C0).")
@@ -499,11 +1227,26 @@ def main():
 
     gear_r = pitch / (2.0 * math.sin(math.pi / float(GEAR_TEETH)))
 
+    PROF.mark()
+    frame_theta = frame_theta_list(scene, gear_r)
+    PROF.lap("travel_source")
+    animate_travel = USE_MASTER_THETA or TRAVEL_SOURCE == 'TELEMETRY'
+
+    if PREVIEW_MODE:
+        for (name, _, _, _) in MECH_ROT:
+            clear_anim_on(bpy.data.objects.get(name))
+    elif animate_travel and BAKE_MECHANICS:
+        bake_mechanics(scene, frame_theta)
+        scene.frame_set(FRAME_START)
+        bpy.context.view_layer.update()
+
+    PROF.mark()
     evalL0 = eval_curve_polyline(curveL)
     totalLenL = evalL0[4]
     count = max(2, int(round(totalLenL / pitch)))
 
     evalR0 = eval_curve_polyline(curveR)
+    PROF.lap("curve_eval")
 
     dirL = CURVE_DIR_L
     dirR = CURVE_DIR_R
@@ -517,8 +1260,15 @@ def main():
     colL = ensure_collection(COL_CHAIN_L)
     colR = ensure_collection(COL_CHAIN_R)
     colRig = ensure_collection(COL_RIGS)
-    clear_collection(colL); clear_collection(colR); clear_collection(colRig)
-    bpy.ops.outliner.orphans_purge(do_recursive=True)
+    PROF.mark()
+    if REUSE_BAKED_OBJECTS:
+        pool = collect_pool((colL, colR, colRig))
+    else:
+        pool = {}
+        clear_collection(colL); clear_collection(colR); clear_collection(colRig)
+        PROF.lap("clear_collections")
+        bpy.ops.outliner.orphans_purge(do_recursive=True)
+        PROF.lap("orphans_purge")
 
     pin_master = get_obj(PIN_MASTER_NAME) if not USE_EMPTY_FOR_PIN else None
     fol_master = get_obj(FOLLOWER_MASTER_NAME) if not USE_EMPTY_FOR_FOLLOWER else None
@@ -542,192 +1292,127 @@ def main():
     pin_h0_off_M = Matrix.Translation(-pin_h0_local) if not USE_EMPTY_FOR_PIN else None
     fol_h0_off_M = Matrix.Translation(-fol_h0_local) if not USE_EMPTY_FOR_FOLLOWER else None
 
+    PROF.mark()
     linksL = [
-        duplicate_object(linkB if ((i % PERIOD_N) == SPECIAL_AT) else linkA,
-                         f"L_ChainLink_{i:04d}", colL)
+        pooled_object(pool, linkB if ((i % PERIOD_N) == SPECIAL_AT) else linkA,
+                      f"L_ChainLink_{i:04d}", colL)
         for i in range(count)
     ]
     linksR = [
-        duplicate_object(linkB if ((i % PERIOD_N) == SPECIAL_AT) else linkA,
-                         f"R_ChainLink_{i:04d}", colR)
+        pooled_object(pool, linkB if ((i % PERIOD_N) == SPECIAL_AT) else linkA,
+                      f"R_ChainLink_{i:04d}", colR)
         for i in range(count)
     ]
 
-    def bake_chain_from_eval(eval_data, links, curve_dir_sign):
-        eval_obj, pts2, seglen, cum, total_len = eval_data
+    PROF.lap("create_objects")
 
+    joints = (a_j0, a_j1, b_j0, b_j1)
+    frame_set = scene.frame_set
+    view_update = bpy.context.view_layer.update
+    t0 = frame_theta[0]
+
+    def bake_chain_from_eval(eval_data, links, curve_dir_sign):
         n_links = len(links)
         prev_up_per_link = [None] * n_links
-
-        frame_set = scene.frame_set
-        view_update = bpy.context.view_layer.update
-
-        t0 = master_theta(FRAME_START) if USE_MASTER_THETA else 0.0
+        PROF.mark()
 
         for f in range(FRAME_START, FRAME_END + 1):
             frame_set(f)
+            PROF.lap("frame_set")
             view_update()
+            PROF.lap("view_update")
 
-            if USE_MASTER_THETA:
-                theta = (master_theta(f) - t0) * CHAIN_SIGN
-            else:
-                theta = 0.0
-
-            traveled = theta * gear_r
-
-            ps = [None] * n_links
-            for i in range(n_links):
-                dist = curve_dir_sign * (i * pitch) + traveled
-                ps[i] = eval_curve_at_distance_fast(eval_obj, pts2, seglen, cum, total_len, dist)
+            theta = (frame_theta[f - FRAME_START] - t0) * CHAIN_SIGN
 
-            chain_prev_up = None
-            for i, obj in enumerate(links):
-                p0 = ps[i]
-                p1 = ps[(i + 1) % n_links]
-                is_special = ((i % PERIOD_N) == SPECIAL_AT)
-                j0_l, j1_l = (b_j0, b_j1) if is_special else (a_j0, a_j1)
+            traveled = chain_travel(theta, pitch, gear_r)
 
-                up_hint = prev_up_per_link[i] if prev_up_per_link[i] is not None else chain_prev_up
-                Mw, new_up = link_matrix_world_for_two_joints(p0, p1, j0_l, j1_l, up_hint)
+            mats = chain_matrices(eval_data, n_links, curve_dir_sign, traveled, pitch, joints, prev_up_per_link)
 
-                prev_up_per_link[i] = new_up
-                chain_prev_up = new_up
+            for obj, Mw in zip(links, mats):
+                key_matrix_world(obj, Mw, f)
+            PROF.lap("keyframe_insert")
 
-                obj.matrix_world = Mw
-                obj.scale = (1,1,1)
-                obj.keyframe_insert("location", frame=f)
-                obj.keyframe_insert("rotation_quaternion", frame=f)
+            PROF.count("frames_evaluated")
+            PROF.count("curve_queries", n_links)
+            PROF.count("keys_inserted", 2 * n_links)
 
-    bake_chain_from_eval(evalL0, linksL, dirL)
-    bake_chain_from_eval(evalR0, linksR, dirR)
+    if not PREVIEW_MODE:
+        bake_chain_from_eval(evalL0, linksL, dirL)
+        bake_chain_from_eval(evalR0, linksR, dirR)
 
+    PROF.mark()
     rigs = []
     for i in range(count):
         if (i % PERIOD_N) != SPECIAL_AT:
             continue
 
-        pinL = new_empty(f"Pin_L_{i:04d}", colRig) if USE_EMPTY_FOR_PIN else duplicate_object(pin_master, f"Pin_L_{i:04d}", colRig)
-        pinR = new_empty(f"Pin_R_{i:04d}", colRig) if USE_EMPTY_FOR_PIN else duplicate_object(pin_master, f"Pin_R_{i:04d}", colRig)
+        pinL = pooled_object(pool, pin_master, f"Pin_L_{i:04d}", colRig)
+        pinR = pooled_object(pool, pin_master, f"Pin_R_{i:04d}", colRig)
 
-        folL = new_empty(f"Follower_L_{i:04d}", colRig) if USE_EMPTY_FOR_FOLLOWER else duplicate_object(fol_master, f"Follower_L_{i:04d}", colRig)
-        folR = new_empty(f"Follower_R_{i:04d}", colRig) if USE_EMPTY_FOR_FOLLOWER else duplicate_object(fol_master, f"Follower_R_{i:04d}", colRig)
+        folL = pooled_object(pool, fol_master, f"Follower_L_{i:04d}", colRig)
+        folR = pooled_object(pool, fol_master, f"Follower_R_{i:04d}", colRig)
 
-        wingPivot = new_empty(f"WingPivot_{i:04d}", colRig)
-        wing = new_empty(f"Wing_{i:04d}", colRig) if USE_EMPTY_FOR_WING else duplicate_object(wing_master, f"Wing_{i:04d}", colRig)
+        wingPivot = pooled_object(pool, None, f"WingPivot_{i:04d}", colRig)
+        wing = pooled_object(pool, wing_master, f"Wing_{i:04d}", colRig)
 
         rigs.append((i, pinL, folL, pinR, folR, wingPivot, wing))
 
-    frame_set = scene.frame_set
-    view_update = bpy.context.view_layer.update
+    for obj in pool.values():
+        bpy.data.objects.remove(obj, do_unlink=True)
+    PROF.count("objects_removed", len(pool))
+    pool.clear()
+    PROF.lap("create_objects")
+
+    cfg = {
+        "c0_local": c0_local,
+        "pin_h0_off_M": pin_h0_off_M,
+        "fol_h0_off_M": fol_h0_off_M,
+        "pitch": pitch,
+        "dirL": dirL,
+        "total_len": totalLenL,
+        "wing_map": wing_map_prepared,
+        "cam_sign": CAM_ANGLE_SIGN,
+        "pin_half_dist": PIN_OUTER_HALF_DIST,
+        "fol_half_dist": FOLLOWER_OUTER_HALF_DIST,
+    }
+
+    if EXPORT_DESCRIPTOR_PATH:
+        n = export_pose_descriptor(EXPORT_DESCRIPTOR_PATH, cfg, evalL0, evalR0, dirR, joints, count,
+                                   frame_theta, gear_r, pin_h0_local, fol_h0_local)
+        print(f"Pose descriptor: {bpy.path.abspath(EXPORT_DESCRIPTOR_PATH)} ({n / 1024.0:.1f} KiB)")
+
+    if PREVIEW_MODE:
+        start_live_preview(scene, LivePreview(cfg, evalL0, evalR0, dirL, dirR, joints,
+                                              linksL, linksR, rigs, frame_theta, gear_r))
+        PROF.finish()
+        return
 
-    t0 = master_theta(FRAME_START) if USE_MASTER_THETA else 0.0
+    writes = []
+    PROF.mark()
 
     for f in range(FRAME_START, FRAME_END + 1):
         frame_set(f)
+        PROF.lap("frame_set")
         view_update()
+        PROF.lap("view_update")
 
-        theta = (master_theta(f) - t0) * CHAIN_SIGN if USE_MASTER_THETA else 0.0
-        traveled = theta * gear_r
+        theta = (frame_theta[f - FRAME_START] - t0) * CHAIN_SIGN
+        traveled = chain_travel(theta, pitch, gear_r)
+        writes.clear()
 
         for (i, pinL, folL, pinR, folR, wingPivot, wing) in rigs:
-            linkL = linksL[i]
-            linkR = linksR[i]
+            mPL, mPR, mFL, mFR, mW = rig_matrices(cfg, i, linksL[i].matrix_world, linksR[i].matrix_world, traveled)
+            writes += [(pinL, mPL), (pinR, mPR), (folL, mFL), (folR, mFR), (wingPivot, mW), (wing, mW)]
 
-            C0L_w = (linkL.matrix_world @ c0_local)
-            C0R_w = (linkR.matrix_world @ c0_local)
+        PROF.lap("rig_matrices")
 
-            x_vec = (C0R_w - C0L_w)
-            if x_vec.length < 1e-9:
-                x_dir = Vector((1, 0, 0))
-                half_sep = 0.0
-            else:
-                x_dir = x_vec.normalized()
-                half_sep = 0.5 * x_vec.length
-
-            pin_extra = (PIN_OUTER_HALF_DIST - half_sep)
-            fol_extra = (FOLLOWER_OUTER_HALF_DIST - half_sep)
-
-            PIN_L_w = C0L_w - x_dir * pin_extra
-            PIN_R_w = C0R_w + x_dir * pin_extra
+        for obj, M in writes:
+            key_matrix_world(obj, M, f)
+        PROF.lap("keyframe_insert")
 
-            FOL_L_w = C0L_w - x_dir * fol_extra
-            FOL_R_w = C0R_w + x_dir * fol_extra
-
-            qL = linkL.matrix_world.to_quaternion()
-            qR = linkR.matrix_world.to_quaternion()
-            qL_M = qL.to_matrix().to_4x4()
-            qR_M = qR.to_matrix().to_4x4()
-
-            if USE_EMPTY_FOR_PIN:
-                pinL.matrix_world = Matrix.Translation(PIN_L_w) @ qL_M
-                pinR.matrix_world = Matrix.Translation(PIN_R_w) @ qR_M
-            else:
-                pinL.matrix_world = Matrix.Translation(PIN_L_w) @ qL_M @ pin_h0_off_M
-                pinR.matrix_world = Matrix.Translation(PIN_R_w) @ qR_M @ pin_h0_off_M
+        PROF.count("frames_evaluated")
+        PROF.count("keys_inserted", 2 * len(writes))
 
-            pinL.scale = (1,1,1); pinR.scale = (1,1,1)
-            pinL.keyframe_insert("location", frame=f); pinL.keyframe_insert("rotation_quaternion", frame=f)
-            pinR.keyframe_insert("location", frame=f); pinR.keyframe_insert("rotation_quaternion", frame=f)
-
-            mid = (C0L_w + C0R_w) * 0.5
-            if FORCE_WING_WORLD_X_ZERO:
-                mid.x = 0.0
-
-            if WING_CAM_ENABLE:
-                distL = dirL * (i * pitch) + traveled
-                t = (distL % totalLenL) / totalLenL
-
-                ang = map_angle_from_points(t, wing_map_prepared, use_smooth=WING_MAP_SMOOTHSTEP)
-                ang *= CAM_ANGLE_SIGN
-
-                base_y = (linkL.matrix_world.to_3x3() @ Vector((0, 1, 0)))
-                R = basis_from_cam_angle(x_vec, ang, base_y)
-            else:
-                x = x_vec
-                if x.length < 1e-9:
-                    x = Vector((1, 0, 0))
-                x.normalize()
-
-                y = (linkL.matrix_world.to_3x3() @ Vector((0, 1, 0)))
-                if y.length < 1e-9:
-                    y = Vector((0, 1, 0))
-                y.normalize()
-
-                z = x.cross(y)
-                if z.length < 1e-8:
-                    z = WORLD_UP.copy()
-                z.normalize()
-
-                y = z.cross(x)
-                if y.length < 1e-8:
-                    y = Vector((0, 1, 0))
-                y.normalize()
-
-                R = Matrix((x, y, z)).transposed()
-
-            R4 = R.to_4x4()
-
-            def bake_one_follower_worldbasis(fol_obj, hinge_world):
-                if USE_EMPTY_FOR_FOLLOWER:
-                    fol_obj.matrix_world = Matrix.Translation(hinge_world) @ R4
-                else:
-                    fol_obj.matrix_world = Matrix.Translation(hinge_world) @ R4 @ fol_h0_off_M
-
-                fol_obj.scale = (1,1,1)
-                fol_obj.keyframe_insert("location", frame=f)
-                fol_obj.keyframe_insert("rotation_quaternion", frame=f)
-
-            bake_one_follower_worldbasis(folL, FOL_L_w)
-            bake_one_follower_worldbasis(folR, FOL_R_w)
-
-            wingPivot.matrix_world = Matrix.Translation(mid) @ R4
-            wingPivot.scale = (1,1,1)
-            wingPivot.keyframe_insert("location", frame=f)
-            wingPivot.keyframe_insert("rotation_quaternion", frame=f)
-
-            wing.matrix_world = wingPivot.matrix_world.copy()
-            wing.scale = (1,1,1)
-            wing.keyframe_insert("location", frame=f)
-            wing.keyframe_insert("rotation_quaternion", frame=f)
+    PROF.finish()
 
 main()